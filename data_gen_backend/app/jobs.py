@@ -0,0 +1,134 @@
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobConflict(Exception):
+    pass
+
+
+#Tracks one generation job: status, progress and the cancellation flag checked by the worker
+class Job:
+    def __init__(self, rows_total, output_file):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"  # queued -> running -> completed | failed | cancelled
+        self.rows_total = rows_total
+        self.rows_done = 0
+        self.output_file = output_file
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    def advance(self, rows):
+        #Called by the worker after every chunk; raises JobCancelled once the job was cancelled
+        self.rows_done += rows
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def rows_per_sec(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.rows_done / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "rows_per_sec": round(self.rows_per_sec(), 1),
+            "output_file": self.output_file.split('/')[-1],
+            "error": self.error,
+        }
+
+
+#Runs generation jobs on a bounded thread pool so they never block the event loop
+class JobManager:
+    def __init__(self, max_workers=2, max_pending=16, max_finished=100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation-job")
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, work, rows_total, output_file):
+        #work(job) does the generation and calls job.advance(rows) as it goes
+        with self.lock:
+            active = sum(1 for job in self.jobs.values() if job.status in ("queued", "running"))
+            if active >= self.max_pending:
+                raise JobQueueFull()
+            if self.writing(output_file):
+                raise JobConflict()
+            self._forget_finished()
+            job = Job(rows_total, output_file)
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        with self.lock:
+            if job.status != "queued":  #cancelled before a worker picked it up
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            work(job)
+            job.status = "completed"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _forget_finished(self):
+        #Keep only the most recent finished jobs so the registry stays bounded
+        finished = [job for job in self.jobs.values() if job.finished_at is not None]
+        finished.sort(key=lambda job: job.finished_at)
+        for job in itertools.islice(finished, max(0, len(finished) - self.max_finished)):
+            del self.jobs[job.id]
+
+    def writing(self, output_file):
+        #True while a queued or running job owns output_file
+        return any(job.output_file == output_file and job.finished_at is None for job in list(self.jobs.values()))
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def count(self, status):
+        return sum(1 for job in list(self.jobs.values()) if job.status == status)
+
+    def cancel(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.finished_at is None:
+                self._cancel(job)
+        return job
+
+    def _cancel(self, job):
+        #A running job stops at its next advance(); a queued one is finished now, which frees its output file
+        job.cancel_event.set()
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.finished_at = time.time()
+
+    def shutdown(self):
+        with self.lock:
+            for job in list(self.jobs.values()):
+                if job.finished_at is None:
+                    self._cancel(job)
+        self.executor.shutdown(wait=True, cancel_futures=True)
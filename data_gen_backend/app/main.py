@@ -1,17 +1,64 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import csv
-import random
+import io
+import zlib
 import json
-from faker import Faker
-import time
+import multiprocessing
 import os
-from threading import Thread
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from team6_package import metrics
+from team6_package.core import is_field_spec
+from team6_package.nested import compile_nested, flatten_schema, iter_nested_records
+from team6_package.parallel import (BLOCK_SIZE, generation_lock, iter_range_records, new_seed, render_shard,
+                                    run_reference_time, shard_ranges)
+from .jobs import JobCancelled, JobConflict, JobManager, JobQueueFull
+from .streams import StreamConflict, StreamLimitReached, StreamManager
 
-fake = Faker()
+#Server concurrency limits for batch generation jobs
+MAX_JOB_WORKERS = int(os.environ.get("MAX_JOB_WORKERS", 2))  #jobs generating at the same time
+MAX_PENDING_JOBS = int(os.environ.get("MAX_PENDING_JOBS", 16))  #running + queued jobs before new ones are refused
+JOB_CHUNK_ROWS = 8 * BLOCK_SIZE  #rows a job generates per task; progress is reported (and cancellation checked) after each
+MAX_STREAMS = int(os.environ.get("MAX_STREAMS", 4))  #stream workers running at the same time
+DOWNLOAD_CHUNK_ROWS = 1000  #rows CSV-encoded per chunk of a generate-on-the-fly download
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"  #generation metrics, served at /metrics
 
-app = FastAPI()
+if METRICS_ENABLED:
+    metrics.enable()
+
+jobs = JobManager(max_workers=MAX_JOB_WORKERS, max_pending=MAX_PENDING_JOBS)
+streams = StreamManager(max_streams=MAX_STREAMS)
+#Held while a job or stream checks the other kind's output files and registers its own,
+#so no two writers (and no cancelled job's cleanup) ever share a file
+output_files_lock = threading.Lock()
+
+#Batch jobs generate their rows in worker processes: random and Faker are process-wide, so job threads
+#generating in this process would take turns under the package's generation lock
+generation_processes = None
+generation_processes_lock = threading.Lock()
+
+def generation_pool():
+    global generation_processes
+    with generation_processes_lock:
+        if generation_processes is None:
+            generation_processes = ProcessPoolExecutor(max_workers=MAX_JOB_WORKERS,
+                                                       mp_context=multiprocessing.get_context("spawn"))
+        return generation_processes
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    #Stop every worker so nothing is left running after the server exits
+    streams.shutdown()
+    jobs.shutdown()
+    if generation_processes is not None:
+        generation_processes.shutdown(cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
 
 #CORS (Cross origin resource sharing) middleware to allow requests from the react app
 app.add_middleware(
@@ -22,66 +69,133 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-fake_functions = {
-    'int': lambda: random.randint(1000, 9999),
-    'datetime': lambda: fake.date_time_between(start_date='-2y', end_date='now'),
-    'nullable_datetime': lambda: fake.date_time_between(start_date='-2y', end_date='now') if random.choice([True, False]) else None,
-    'version': lambda: random.randint(1, 100),
-    'status': lambda: fake.word(ext_word_list=["active", "inactive", "pending"]),
-    'name': lambda: fake.name(),
-    'email': lambda: fake.email(),
-    'word': lambda: fake.word(),
-    'address': lambda: fake.address(),
-    'phone': lambda: fake.phone_number()
-}
-
-#Function used to generate data based on the JSON schema
-def generate_data(schema, num_records):
-    data = []
-    for _ in range(num_records):
-        row = generate_record(schema)
-        data.append(row)
-    return data
-
-def generate_record(schema):
-    row = {}
-    for column, field_type in schema.items():
-        if isinstance(field_type, str):
-            if field_type in fake_functions:
-                row[column] = fake_functions[field_type]()
-            else:
-                raise ValueError(f"Unknown field type '{field_type}' in schema for column '{column}'")
-        elif isinstance(field_type, dict):
-            row[column] = generate_record(field_type)  # Recursive call for nested dictionary
-        elif isinstance(field_type, list):
-            row[column] = [generate_record(field_type[0]) for _ in range(random.randint(1, 3))]
-        else:
-            raise ValueError(f"Unsupported field type for column '{column}': {field_type}")
-    return row
-
-def save_to_csv(data, output_file):
-    if data:
-        fieldnames = data[0].keys()
-        with open(output_file, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+#Schemas (nested dicts and lists included) are validated and compiled once by team6_package;
+#rows are then generated from the plan as flat records with dotted column names.
+#$ref fields may only use tables registered in this process, never files on the server
+def compile_schema(schema):
+    return compile_nested(schema, strict=True, table_files=False)
+
+#The backend's 'datetime' is a random datetime within the last two years, where the package's is the
+#current time; uploaded schemas use the package's past_datetime type for it
+BACKEND_TYPES = {'datetime': 'past_datetime'}
+
+#Maps the field types of a schema (nested records, lists and field specs included) through BACKEND_TYPES
+def backend_schema(node):
+    if isinstance(node, str):
+        return BACKEND_TYPES.get(node.lower(), node)
+    if isinstance(node, list):
+        return [backend_schema(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if not is_field_spec(node):
+        return {key: child if key == '$length' else backend_schema(child) for key, child in node.items()}
+    spec = dict(node)
+    if isinstance(spec.get('$type'), str):
+        spec['$type'] = backend_schema(spec['$type'])
+    if isinstance(spec.get('$cases'), dict):
+        spec['$cases'] = {key: backend_schema(case) for key, case in spec['$cases'].items()}
+    if '$default' in spec:
+        spec['$default'] = backend_schema(spec['$default'])
+    return spec
+
+#Lazily yields records from a compiled plan so large datasets never sit in memory all at once.
+#Blocks are generated under the package's generation lock so seeded jobs on other threads keep their exact rows
+def iter_records(plan, num_records):
+    for start in range(0, num_records, BLOCK_SIZE):
+        with generation_lock:
+            block = list(iter_nested_records(plan, min(BLOCK_SIZE, num_records - start)))
+        yield from block
+
+#Seeded generation: record i depends only on (seed, schema, i), so any range of rows can be regenerated.
+#Returns a generate(plan, num_records) like iter_records that continues where the previous call stopped
+def seeded_records(schema, seed, start_index):
+    position = start_index
+    def generate(plan, num_records):
+        nonlocal position
+        records = iter_range_records(schema, seed, position, num_records)
+        position += num_records
+        return records
+    return generate
+
+#Checks the seed/start_index form fields; returns an error message or None
+def check_seed(seed, start_index):
+    if start_index < 0:
+        return "start_index must not be negative."
+    if start_index and seed is None:
+        return "start_index needs a seed."
+    return None
+
+#Yields the CSV encoding of the records in chunks of chunk_rows rows, so only one chunk is in memory
+def iter_csv_chunks(records, chunk_rows=DOWNLOAD_CHUNK_ROWS):
+    buffer = io.StringIO()
+    writer = None
+    rows = 0
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=record.keys())
             writer.writeheader()
-            writer.writerows(data)
-    else:
-        raise ValueError("No data to save.")
+        writer.writerow(record)
+        rows += 1
+        if rows == chunk_rows:
+            chunk = buffer.getvalue().encode('utf-8')
+            metrics.record_rows("download", rows)
+            metrics.record_bytes("download", len(chunk))
+            yield chunk
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        chunk = buffer.getvalue().encode('utf-8')
+        metrics.record_rows("download", rows)
+        metrics.record_bytes("download", len(chunk))
+        yield chunk
 
-def continuous_generation(schema, num_records, interval, output_file):
-    while True:
-        data = generate_data(schema, num_records)
-        save_to_csv(data, output_file)
-        time.sleep(interval)
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  #31 = gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+#Generates rows start_index.. of the seed (a fresh one when None) into output_file, one JOB_CHUNK_ROWS task at a time
+#on the generation processes; the rows are the same as seeded_records would give for that seed
+def run_batch_job(job, schema, seed, start_index, num_records, output_file):
+    if num_records <= 0:
+        raise ValueError("No data to save.")
+    reference_time = run_reference_time(seed)
+    if seed is None:
+        seed = new_seed()
+    try:
+        with open(output_file, 'w', newline='') as file:
+            csv.writer(file).writerow(flatten_schema(schema))
+            for _, start, count in shard_ranges(num_records, JOB_CHUNK_ROWS, start_index):
+                task = (schema, seed, start, count, JOB_CHUNK_ROWS, None, reference_time)
+                file.write(generation_pool().submit(render_shard, task).result())
+                metrics.record_rows("backend_batch", count)
+                job.advance(count)
+        metrics.record_files("backend_batch", [output_file])
+    except JobCancelled:
+        if os.path.exists(output_file):
+            os.remove(output_file)  #don't leave a partial file behind
+        raise
 
 @app.post("/generate-csv")
-async def generate_csv(file: UploadFile = File(...), num_records: int = Form(...), interval: float = Form(...), mode: str = Form(...),custom_filename: str = Form(default="output")):
+async def generate_csv(file: UploadFile = File(...), num_records: int = Form(...), interval: float = Form(...), mode: str = Form(...),custom_filename: str = Form(default="output"), stream_output: str = Form(default="rotate"), seed: Optional[int] = Form(default=None), start_index: int = Form(default=0)):
     schema_data = await file.read()
     try:
-        schema = json.loads(schema_data)
+        schema = backend_schema(json.loads(schema_data))
     except json.JSONDecodeError:
         return {"error": "Invalid JSON file."}
+    try:
+        plan = compile_schema(schema)
+    except ValueError as e:
+        return {"error": str(e)}
+    seed_error = check_seed(seed, start_index)
+    if seed_error:
+        return JSONResponse(status_code=400, content={"error": seed_error})
+    #With a seed, batch rows are rows start_index.. of that seed and each stream interval continues after the last
+    generate = seeded_records(schema, seed, start_index) if seed is not None else iter_records
 
     #Check thatdirectory exists
     os.makedirs('generated_files', exist_ok=True)
@@ -92,24 +206,119 @@ async def generate_csv(file: UploadFile = File(...), num_records: int = Form(...
     interval_seconds = interval * 60  #minutes to seconds
 
     if mode == "stream":
-        # Start continuous generation in a background thread
-        thread = Thread(target=continuous_generation, args=(schema, num_records, interval_seconds, output_file))
-        thread.start()
+        #stream_output "rotate" writes each interval to a new part file, "append" appends to output_file
+        if stream_output not in ("rotate", "append"):
+            return JSONResponse(status_code=400, content={"error": "Invalid stream_output. Use 'rotate' or 'append'."})
+        try:
+            with output_files_lock:
+                if jobs.writing(output_file):
+                    raise StreamConflict()
+                stream = streams.start(generate, plan, num_records, interval_seconds, output_file, rotate=stream_output == "rotate")
+        except StreamLimitReached:
+            return JSONResponse(status_code=429, content={"error": f"At most {MAX_STREAMS} streams can run at once. Stop one first."})
+        except StreamConflict:
+            return JSONResponse(status_code=409, content={"error": "A stream or job is already writing to this file."})
         return {
             "message": "CSV generation started in streaming mode!",
+            "stream_id": stream.id,
             "output_file": output_file.split('/')[-1]  # Only send the filename
         }
     elif mode == "batch":
-        data = generate_data(schema, num_records)  # Generate data immediately
-        save_to_csv(data, output_file)
+        #Generation runs on the job pool; poll /jobs/{job_id} until it is completed
+        try:
+            with output_files_lock:
+                if streams.writing(output_file):
+                    raise JobConflict()
+                job = jobs.submit(lambda job: run_batch_job(job, schema, seed, start_index, num_records, output_file), num_records, output_file)
+        except JobQueueFull:
+            return JSONResponse(status_code=429, content={"error": "Too many generation jobs in progress. Try again later."})
+        except JobConflict:
+            return JSONResponse(status_code=409, content={"error": "A job or stream is already writing to this file. Use another custom_filename."})
         return {
-            "message": "CSV generated successfully!",
+            "message": "CSV generation started!",
+            "job_id": job.id,
             "output_file": output_file.split('/')[-1]  # Only send the filename
         }
     else:
         return {"error": "Invalid mode. Use 'batch' or 'stream'."}
 
 
+#Generates and CSV-encodes rows while the client reads them: nothing is written to disk
+@app.post("/generate-download")
+async def generate_download(request: Request, file: UploadFile = File(...), num_records: int = Form(...), custom_filename: str = Form(default="output"), compress: bool = Form(default=True), seed: Optional[int] = Form(default=None), start_index: int = Form(default=0)):
+    schema_data = await file.read()
+    try:
+        schema = backend_schema(json.loads(schema_data))
+    except json.JSONDecodeError:
+        return JSONResponse(status_code=400, content={"error": "Invalid JSON file."})
+    try:
+        plan = compile_schema(schema)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    seed_error = check_seed(seed, start_index)
+    if seed_error:
+        return JSONResponse(status_code=400, content={"error": seed_error})
+
+    generate = seeded_records(schema, seed, start_index) if seed is not None else iter_records
+    chunks = iter_csv_chunks(generate(plan, num_records))
+    headers = {"Content-Disposition": f'attachment; filename="{custom_filename}.csv"'}
+    if compress and "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type='text/csv', headers=headers)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found."})
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found."})
+    return job.to_dict()
+
+
+@app.get("/streams")
+async def list_streams():
+    return {"streams": streams.list()}
+
+
+@app.get("/streams/{stream_id}")
+async def get_stream(stream_id: str):
+    stream = streams.get(stream_id)
+    if stream is None:
+        return JSONResponse(status_code=404, content={"error": "Stream not found."})
+    return stream.to_dict()
+
+
+@app.delete("/streams/{stream_id}")
+async def stop_stream(stream_id: str):
+    stream = streams.stop(stream_id, timeout=0)
+    if stream is None:
+        return JSONResponse(status_code=404, content={"error": "Stream not found."})
+    return stream.to_dict()
+
+
+#Prometheus text format; gauges for the job and stream workers are filled in on every scrape
+@app.get("/metrics")
+async def get_metrics():
+    registry = metrics.active()
+    if registry is None:
+        return JSONResponse(status_code=404, content={"error": "Metrics are disabled (METRICS_ENABLED=0)."})
+    registry.gauge("backend_jobs", "Generation jobs by status", status="running").set(jobs.count("running"))
+    registry.gauge("backend_jobs", "Generation jobs by status", status="queued").set(jobs.count("queued"))
+    registry.gauge("backend_streams_running", "Stream workers running").set(
+        sum(1 for stream in streams.list() if stream["status"] == "running"))
+    return PlainTextResponse(metrics.prometheus_text(registry), media_type="text/plain; version=0.0.4")
+
+
+#FileResponse answers Range requests (206 Partial Content), so interrupted downloads can resume
 @app.get("/download_csv/")
 async def download_csv(filename: str):
     file_path = f"generated_files/{filename}" 
@@ -0,0 +1,145 @@
+import csv
+import os
+import threading
+import time
+import uuid
+from team6_package import metrics
+
+
+class StreamLimitReached(Exception):
+    pass
+
+
+class StreamConflict(Exception):
+    pass
+
+
+def part_file(output_file, part):
+    base, extension = os.path.splitext(output_file)
+    return f"{base}.part-{part:05d}{extension}"
+
+
+#One stoppable stream worker: every `interval` seconds it writes `num_records` new rows from generate(plan, n),
+#either appended to output_file or rotated into a new part file
+class Stream:
+    def __init__(self, generate, plan, num_records, interval, output_file, rotate):
+        self.id = uuid.uuid4().hex
+        self.generate = generate
+        self.plan = plan
+        self.num_records = num_records
+        self.interval = interval
+        self.output_file = output_file
+        self.rotate = rotate
+        self.status = "running"  # running -> stopping -> stopped, or failed
+        self.error = None
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.intervals = 0
+        self.lag_seconds = 0.0
+        self.latest_file = None
+        self.started_at = time.time()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"stream-{self.id[:8]}", daemon=True)
+
+    def _run(self):
+        next_tick = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                #How far behind schedule this tick starts
+                self.lag_seconds = max(0.0, time.monotonic() - next_tick)
+                self._write_interval()
+                next_tick += self.interval
+                self.stop_event.wait(max(0.0, next_tick - time.monotonic()))
+            self.status = "stopped"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+
+    def _write_interval(self):
+        path = part_file(self.output_file, self.intervals) if self.rotate else self.output_file
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        rows = 0
+        with open(path, 'w' if self.rotate else 'a', newline='', buffering=1 << 20) as csvfile:
+            start = csvfile.tell()
+            writer = None
+            for record in self.generate(self.plan, self.num_records):
+                if writer is None:
+                    writer = csv.DictWriter(csvfile, fieldnames=record.keys())
+                    if self.rotate or new_file:
+                        writer.writeheader()
+                writer.writerow(record)
+                rows += 1
+            csvfile.flush()
+            written = csvfile.tell() - start
+            self.bytes_written += written
+        self.rows_written += rows
+        metrics.record_rows("backend_stream", rows)
+        metrics.record_bytes("backend_stream", written)
+        self.intervals += 1
+        self.latest_file = path
+
+    def stop(self):
+        if self.status == "running":
+            self.status = "stopping"
+        self.stop_event.set()
+
+    def to_dict(self):
+        return {
+            "stream_id": self.id,
+            "status": self.status,
+            "output_file": self.output_file.split('/')[-1],
+            "latest_file": self.latest_file.split('/')[-1] if self.latest_file else None,
+            "rotate": self.rotate,
+            "interval_seconds": self.interval,
+            "records_per_interval": self.num_records,
+            "intervals": self.intervals,
+            "rows_written": self.rows_written,
+            "bytes_written": self.bytes_written,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "error": self.error,
+        }
+
+
+#Registry of stream workers with a cap on how many run at once
+class StreamManager:
+    def __init__(self, max_streams=4):
+        self.max_streams = max_streams
+        self.streams = {}
+        self.lock = threading.Lock()
+
+    def start(self, generate, plan, num_records, interval, output_file, rotate=True):
+        with self.lock:
+            active = [stream for stream in self.streams.values() if stream.thread.is_alive()]
+            if len(active) >= self.max_streams:
+                raise StreamLimitReached()
+            if self.writing(output_file):
+                raise StreamConflict()
+            #Stopped streams are forgotten once a new one starts
+            self.streams = {stream.id: stream for stream in active}
+            stream = Stream(generate, plan, num_records, interval, output_file, rotate)
+            self.streams[stream.id] = stream
+        stream.thread.start()
+        return stream
+
+    def writing(self, output_file):
+        #True while a running stream writes to output_file (or its part files)
+        return any(stream.output_file == output_file and stream.thread.is_alive() for stream in list(self.streams.values()))
+
+    def get(self, stream_id):
+        return self.streams.get(stream_id)
+
+    def list(self):
+        return [stream.to_dict() for stream in self.streams.values()]
+
+    def stop(self, stream_id, timeout=None):
+        stream = self.streams.get(stream_id)
+        if stream is not None:
+            stream.stop()
+            stream.thread.join(timeout)
+        return stream
+
+    def shutdown(self, timeout=10.0):
+        for stream in list(self.streams.values()):
+            stream.stop()
+        for stream in list(self.streams.values()):
+            stream.thread.join(timeout)
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+CONTENT = b"id,latency\n" + b"".join(b"%d,%d\n" % (i, i * 7) for i in range(100))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "generated_files").mkdir()
+    (tmp_path / "generated_files" / "data.csv").write_bytes(CONTENT)
+    return TestClient(app)
+
+
+def test_download_whole_file(client):
+    response = client.get("/download_csv/", params={"filename": "data.csv"})
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("requested, start, end", [
+    ("bytes=10-19", 10, 19),
+    ("bytes=200-", 200, len(CONTENT) - 1),
+    ("bytes=-25", len(CONTENT) - 25, len(CONTENT) - 1),
+])
+def test_download_range(client, requested, start, end):
+    response = client.get("/download_csv/", params={"filename": "data.csv"}, headers={"Range": requested})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.content == CONTENT[start:end + 1]
+
+
+def test_download_range_past_end(client):
+    response = client.get("/download_csv/", params={"filename": "data.csv"},
+                          headers={"Range": f"bytes={len(CONTENT) + 10}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
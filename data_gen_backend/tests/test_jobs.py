@@ -0,0 +1,37 @@
+import threading
+
+from app.jobs import JobManager
+
+
+def blocking_jobs():
+    #A manager with one worker, busy with a job that runs until `release` is set
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+    running = manager.submit(lambda job: release.wait(5), 1, "generated_files/running.csv")
+    return manager, release, running
+
+
+def test_cancelling_queued_job_finishes_it():
+    manager, release, running = blocking_jobs()
+    queued = manager.submit(lambda job: None, 1, "generated_files/queued.csv")
+    manager.cancel(queued.id)
+    assert queued.status == "cancelled"
+    assert queued.finished_at is not None
+    assert not manager.writing("generated_files/queued.csv")
+    #The file is free again at once, even though the worker is still busy
+    again = manager.submit(lambda job: None, 1, "generated_files/queued.csv")
+    release.set()
+    manager.executor.shutdown(wait=True)
+    assert queued.status == "cancelled"
+    assert running.status == "completed"
+    assert again.status == "completed"
+
+
+def test_shutdown_cancels_queued_jobs():
+    manager, release, running = blocking_jobs()
+    queued = manager.submit(lambda job: None, 1, "generated_files/queued.csv")
+    threading.Timer(0.1, release.set).start()
+    manager.shutdown()
+    assert queued.status == "cancelled"
+    assert queued.finished_at is not None
+    assert manager.count("queued") == 0
@@ -9,12 +9,14 @@ export default function FileUpload() {
   const [interval, setIntervalTime] = useState(1); // Default value for interval (in minutes)
   const [message, setMessage] = useState("");
   const [filename, setFilename] = useState(""); // To store the output filename
+  const [streamId, setStreamId] = useState(""); // Active stream, polled for its latest part file
 
   
   const [mode, setMode] = useState("batch"); // Default is batch
   const [csvContent, setCsvContent] = useState([]); // CSV data for display
   const [customFilename, setCustomFilename] = useState(""); // Custom filename
   const lastAppendedRef = useRef(""); // To store the last appended content for deduplication
+  const streamIdRef = useRef(""); // Same as streamId, for stopping the stream when the component unmounts
 
   const handleFileChange = (e) => {
     const selectedFile = e.target.files[0];
@@ -27,7 +29,30 @@ export default function FileUpload() {
     reader.readAsText(selectedFile);
   };
 
+  // Stops the active stream on the server (DELETE /streams/{id}) so it no longer writes files
+  const stopStream = async () => {
+    const id = streamIdRef.current;
+    if (!id) {
+      return;
+    }
+    streamIdRef.current = "";
+    setStreamId("");
+    try {
+      await axios.delete(`http://localhost:8000/streams/${id}`);
+      setMessage("Stream stopped.");
+    } catch (error) {
+      // 404: the stream already stopped on its own
+      if (error.response?.status !== 404) {
+        setMessage("Error stopping stream");
+        console.error(error);
+      }
+    }
+  };
+
   const handleFileUploadAndDownload = async () => {
+    // Only one stream at a time: stop the previous one before starting anything new
+    await stopStream();
+
     const formData = new FormData();
 
     if (typedSchema) {
@@ -57,8 +82,24 @@ export default function FileUpload() {
         }
       );
       setMessage(response.data.message);
+
+      // Batch generation runs as a background job; wait for it before downloading
+      if (response.data.job_id) {
+        const job = await waitForJob(response.data.job_id);
+        if (job.status !== "completed") {
+          setMessage(`Generation ${job.status}${job.error ? `: ${job.error}` : ""}`);
+          return;
+        }
+        setMessage("CSV generated successfully!");
+      }
       setFilename(response.data.output_file);
 
+      // Streams write each interval to a new part file; the polling effect downloads them
+      if (response.data.stream_id) {
+        streamIdRef.current = response.data.stream_id;
+        setStreamId(response.data.stream_id);
+        return;
+      }
       await handleDownloadCSV(response.data.output_file);
     } catch (error) {
       setMessage("Error uploading file");
@@ -66,6 +107,21 @@ export default function FileUpload() {
     }
   };
 
+  const waitForJob = async (jobId) => {
+    while (true) {
+      const { data: job } = await axios.get(
+        `http://localhost:8000/jobs/${jobId}`
+      );
+      if (!["queued", "running"].includes(job.status)) {
+        return job;
+      }
+      setMessage(
+        `Generating... ${job.rows_done} / ${job.rows_total} rows (${Math.round(job.rows_per_sec)} rows/sec)`
+      );
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleDownloadCSV = async (filename) => {
     if (!filename) {
       setMessage("No file available for download.");
@@ -132,14 +188,34 @@ export default function FileUpload() {
 
   //useEffect to call the backend API to get new CSV content and append it to the existing CSV content
   useEffect(() => {
-    if (mode === "stream" && filename) {
-      const intervalId = setInterval(() => {
-        handleDownloadCSV(filename);
-      }, interval * 60 * 1000); // Interval in milliseconds
+    if (mode === "stream" && streamId) {
+      let lastFile = "";
+      const poll = async () => {
+        const { data: stream } = await axios.get(
+          `http://localhost:8000/streams/${streamId}`
+        );
+        if (stream.latest_file && stream.latest_file !== lastFile) {
+          lastFile = stream.latest_file;
+          await handleDownloadCSV(stream.latest_file);
+        }
+      };
+      poll();
+      const intervalId = setInterval(poll, interval * 60 * 1000); // Interval in milliseconds
 
       return () => clearInterval(intervalId); // Cleanup the interval on unmount
     }
-  }, [mode, interval, filename]);
+  }, [mode, interval, streamId]);
+
+  //Stop the stream when the component unmounts, so it does not keep writing files nobody reads
+  useEffect(() => {
+    return () => {
+      if (streamIdRef.current) {
+        axios
+          .delete(`http://localhost:8000/streams/${streamIdRef.current}`)
+          .catch(() => {});
+      }
+    };
+  }, []);
 
   return (
     <div className="container mx-auto p-6">
@@ -225,6 +301,15 @@ export default function FileUpload() {
         Generate
       </button>
 
+      {streamId && (
+        <button
+          onClick={stopStream}
+          className="ml-2 bg-red-500 text-white rounded-lg px-4 py-2 hover:bg-red-600"
+        >
+          Stop Stream
+        </button>
+      )}
+
       <p className="mt-4 text-red-500">{message}</p>
       {/* section to display the generated csv */}
 
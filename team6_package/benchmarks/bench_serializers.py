@@ -0,0 +1,45 @@
+"""
+Compare message size and encode/decode throughput of each Kafka payload format.
+
+Usage: python benchmarks/bench_serializers.py [schema.json] [--num-records N]
+"""
+import argparse
+import time
+
+from team6_package.core import generate_data, load_schema
+from team6_package.serializers import get_serializer, serializer_factories
+
+from schemas import TELEMETRY_SCHEMA
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Kafka payload serializers")
+    parser.add_argument('schema', nargs='?', help='Path to a JSON schema (defaults to a telemetry schema)')
+    parser.add_argument('-n', '--num-records', type=int, default=20000, help='Number of messages per run')
+    args = parser.parse_args()
+
+    schema = load_schema(args.schema) if args.schema else TELEMETRY_SCHEMA
+    records = generate_data(schema, args.num_records)
+
+    print(f"{'format':<10}{'bytes/msg':>12}{'encode msgs/sec':>18}{'decode msgs/sec':>18}")
+    for name in serializer_factories:
+        try:
+            serializer = get_serializer(name, schema)
+        except ImportError as e:
+            print(f"{name:<10}skipped ({e})")
+            continue
+
+        start = time.perf_counter()
+        payloads = [serializer.encode(record) for record in records]
+        encode_rate = len(records) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for payload in payloads:
+            serializer.decode(payload)
+        decode_rate = len(records) / (time.perf_counter() - start)
+
+        size = sum(len(payload) for payload in payloads) / len(payloads)
+        print(f"{name:<10}{size:>12.1f}{encode_rate:>18,.0f}{decode_rate:>18,.0f}")
+
+if __name__ == "__main__":
+    main()
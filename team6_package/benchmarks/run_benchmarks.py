@@ -0,0 +1,284 @@
+"""
+Benchmark suite: per-type generator throughput, end-to-end CSV output, Kafka
+sends against the in-memory producer, CLI cold start, and peak RSS (per case
+on Linux, for the whole run everywhere).
+
+Results are printed as a table and written as JSON. Pass a previous results
+file as --baseline to fail (exit status 1) when any throughput drops more than
+--tolerance below it.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance 0.2
+    python benchmarks/run_benchmarks.py --only end_to_end --profile cprofile --profile-dir profiles
+    python benchmarks/run_benchmarks.py --only startup --startup-runs 20
+"""
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+import team6_package
+from team6_package.columnar import compile_columns
+from team6_package.core import compile_schema, fake_functions, generate_data, save_to_csv
+from team6_package.parallel import write_csv_parallel
+from team6_package.serializers import get_serializer
+from team6_package.streaming import InMemoryProducer, stream_records
+
+from schemas import SCHEMAS
+
+SUITES = ['types', 'end_to_end', 'kafka', 'startup']
+THROUGHPUT_METRICS = ['rows_per_sec', 'mb_per_sec', 'msgs_per_sec', 'starts_per_sec']
+
+# README performance requirement: 1 GB within 30 minutes
+TARGET_MB_PER_SEC = 1024 / (30 * 60)
+
+
+# Peak RSS before the last reset by case_peak_rss_mb, which resets ru_maxrss too
+earlier_peak_mb = 0.0
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, earlier_peak_mb)
+
+def case_peak_rss_mb(function):
+    """
+    Run function() and return (its result, the peak RSS in MB while it ran).
+
+    ru_maxrss only ever grows, so every case after the largest one would
+    report the largest one's peak. On Linux the peak (VmHWM) is reset through
+    /proc/self/clear_refs before the case; elsewhere the peak is None.
+    """
+    global earlier_peak_mb
+    earlier_peak_mb = peak_rss_mb()
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        return function(), None
+    result = function()
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmHWM:'):
+                return result, int(line.split()[1]) / 1024
+    return result, None
+
+class Profiler:
+    """Profile named sections with cProfile or pyinstrument and dump the hot paths to a directory."""
+
+    def __init__(self, kind, directory):
+        self.kind = kind
+        self.directory = directory
+        if kind:
+            os.makedirs(directory, exist_ok=True)
+
+    def run(self, name, function):
+        if self.kind == 'cprofile':
+            profile = cProfile.Profile()
+            result = profile.runcall(function)
+            path = os.path.join(self.directory, f"{name}.prof")
+            profile.dump_stats(path)
+            with open(os.path.join(self.directory, f"{name}.txt"), 'w') as file:
+                pstats.Stats(profile, stream=file).sort_stats('cumulative').print_stats(30)
+            return result
+        if self.kind == 'pyinstrument':
+            from pyinstrument import Profiler as Instrument
+            profiler = Instrument()
+            profiler.start()
+            try:
+                return function()
+            finally:
+                profiler.stop()
+                with open(os.path.join(self.directory, f"{name}.html"), 'w') as file:
+                    file.write(profiler.output_html())
+        return function()
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def bench_types(num_records):
+    """Rows/sec of every fake_functions type, row-wise and through the columnar engine."""
+    results = {}
+    rng = np.random.default_rng()
+    for field_type in fake_functions:
+        schema = {field_type: field_type}
+        (_, generator, _), = compile_schema(schema)
+        (_, column_generator, _), = compile_columns(schema)
+        row_seconds, _ = timed(lambda: [generator() for _ in range(num_records)])
+        column_seconds, _ = timed(lambda: column_generator(num_records, rng, None))
+        results[f"types/{field_type}/row"] = {'rows_per_sec': num_records / row_seconds}
+        results[f"types/{field_type}/columnar"] = {'rows_per_sec': num_records / column_seconds}
+    return results
+
+def bench_end_to_end(num_records, profiler):
+    """Rows/sec and MB/sec of generate_data + save_to_csv, and of the columnar batch writer."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, schema in SCHEMAS.items():
+            output_file = os.path.join(directory, f"{name}.csv")
+            cases = {
+                'generate_data+save_to_csv': lambda: save_to_csv(generate_data(schema, num_records), output_file),
+                'write_csv_parallel': lambda: write_csv_parallel(schema, num_records, output_file),
+            }
+            for case, function in cases.items():
+                (seconds, _), peak = case_peak_rss_mb(lambda: timed(lambda: profiler.run(f"{name}-{case}", function)))
+                megabytes = os.path.getsize(output_file) / (1024 * 1024)
+                results[f"end_to_end/{name}/{case}"] = {
+                    'rows_per_sec': num_records / seconds,
+                    'mb_per_sec': megabytes / seconds,
+                    'seconds': seconds,
+                    'megabytes': megabytes,
+                    'meets_1gb_in_30min': megabytes / seconds >= TARGET_MB_PER_SEC,
+                    'peak_rss_mb': peak,
+                }
+    return results
+
+def bench_kafka(seconds, serializer, profiler):
+    """Messages/sec of stream_records sending to the in-memory producer as fast as it can."""
+    results = {}
+    for name, schema in SCHEMAS.items():
+        producer = InMemoryProducer(value_serializer=get_serializer(serializer, schema).encode, keep=False)
+        sent, peak = case_peak_rss_mb(lambda: profiler.run(f"kafka-{name}", lambda: stream_records(
+            producer, 'benchmark', schema, rate=None, duration=seconds, stats_interval=0)))
+        results[f"kafka/{name}/{serializer}"] = {
+            'msgs_per_sec': sent / seconds,
+            'mb_per_sec': producer.bytes_sent / (1024 * 1024) / seconds,
+            'peak_rss_mb': peak,
+        }
+    return results
+
+def run_python(arguments, **options):
+    """Run a fresh interpreter that imports team6_package from the same place as this process."""
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(team6_package.__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+    return subprocess.run([sys.executable, '-W', 'ignore', *arguments], env=env, check=True,
+                          stdout=subprocess.DEVNULL, **options)
+
+def top_level_imports(arguments):
+    """Names of the top-level packages a command imports, from python -X importtime."""
+    stderr = run_python(['-X', 'importtime', *arguments], stderr=subprocess.PIPE, text=True).stderr
+    return {line.split('|')[-1].strip().split('.')[0] for line in stderr.splitlines() if line.startswith('import time:')}
+
+def bench_startup(runs):
+    """Wall time of a fresh interpreter importing the package, and of a small --mode batch CLI run."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        commands = {'import': ['-c', 'import team6_package']}
+        for name, schema in SCHEMAS.items():
+            schema_file = os.path.join(directory, f"{name}.json")
+            with open(schema_file, 'w') as file:
+                json.dump(schema, file)
+            commands[f"batch_cli/{name}"] = ['-m', 'team6_package.core', schema_file,
+                                             os.path.join(directory, f"{name}.csv"), '--mode', 'batch', '-n', '100']
+        for name, arguments in commands.items():
+            run_python(arguments)  # Warm the OS file cache
+            times = []
+            for _ in range(runs):
+                seconds, _ = timed(lambda: run_python(arguments))
+                times.append(seconds)
+            median = statistics.median(times)
+            imports = top_level_imports(arguments)
+            results[f"startup/{name}"] = {
+                'starts_per_sec': 1 / median,
+                'median_seconds': median,
+                'min_seconds': min(times),
+                'imports_faker': 'faker' in imports,
+                'imports_kafka': 'kafka' in imports,
+                'imports_numpy': 'numpy' in imports,
+            }
+    return results
+
+def compare(results, baseline, tolerance):
+    """Return a line per throughput metric more than `tolerance` (a fraction) below the baseline."""
+    regressions = []
+    for key, metrics in baseline['results'].items():
+        for metric in THROUGHPUT_METRICS:
+            if metric not in metrics or metric not in results.get(key, {}):
+                continue
+            before, after = metrics[metric], results[key][metric]
+            if after < before * (1 - tolerance):
+                regressions.append(f"{key} {metric}: {after:,.1f} vs baseline {before:,.1f} "
+                                   f"({(after / before - 1) * 100:+.1f}%)")
+    return regressions
+
+def print_table(results):
+    print(f"{'benchmark':<58}{'rows/sec':>14}{'msgs/sec':>14}{'MB/sec':>10}{'start ms':>10}")
+    for key, metrics in results.items():
+        rows = f"{metrics['rows_per_sec']:,.0f}" if 'rows_per_sec' in metrics else ''
+        msgs = f"{metrics['msgs_per_sec']:,.0f}" if 'msgs_per_sec' in metrics else ''
+        megabytes = f"{metrics['mb_per_sec']:.2f}" if 'mb_per_sec' in metrics else ''
+        start = f"{metrics['median_seconds'] * 1000:.0f}" if 'median_seconds' in metrics else ''
+        print(f"{key:<58}{rows:>14}{msgs:>14}{megabytes:>10}{start:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the team6_package benchmark suite")
+    parser.add_argument('--only', nargs='+', choices=SUITES, default=SUITES, help='Suites to run')
+    parser.add_argument('--type-records', type=int, default=20000, help='Values per generator type')
+    parser.add_argument('-n', '--num-records', type=int, default=100000, help='Rows per end-to-end run')
+    parser.add_argument('--kafka-seconds', type=float, default=3.0, help='Seconds of sending per Kafka run')
+    parser.add_argument('--serializer', default='json', help='Kafka payload format')
+    parser.add_argument('--startup-runs', type=int, default=10, help='Fresh interpreters started per startup case')
+    parser.add_argument('-o', '--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Results JSON to compare against; regressions exit with status 1')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed fractional drop below the baseline')
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help='Profile the end-to-end and Kafka runs')
+    parser.add_argument('--profile-dir', default='profiles', help='Where profiles are written')
+    args = parser.parse_args()
+
+    profiler = Profiler(args.profile, args.profile_dir)
+    results = {}
+    if 'types' in args.only:
+        results.update(bench_types(args.type_records))
+    if 'end_to_end' in args.only:
+        results.update(bench_end_to_end(args.num_records, profiler))
+    if 'kafka' in args.only:
+        results.update(bench_kafka(args.kafka_seconds, args.serializer, profiler))
+    if 'startup' in args.only:
+        results.update(bench_startup(args.startup_runs))
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'num_records': args.num_records,
+            'profiled': args.profile,
+        },
+        'peak_rss_mb': peak_rss_mb(),
+        'results': results,
+    }
+    print_table(results)
+    print(f"peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS ({len(regressions)}) beyond {args.tolerance:.0%} of the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline.")
+
+if __name__ == "__main__":
+    main()
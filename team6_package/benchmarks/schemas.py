@@ -0,0 +1,71 @@
+"""Representative schemas shared by the benchmark scripts."""
+
+TELEMETRY_SCHEMA = {
+    "application_type": "application_type",
+    "signal_strength": "signal_strength",
+    "latency": "latency",
+    "required_bandwidth": "required_bandwidth",
+    "allocated_bandwidth": "allocated_bandwidth",
+    "sent_bytes": "sent_bytes",
+    "received_bytes": "received_bytes",
+    "cpu_percent": "cpu_percent",
+    "mem_used_bytes": "mem_used_bytes",
+    "mem_total": "mem_total",
+    "devices_registered": "devices_registered",
+    "devices_connected": "devices_connected",
+    "status": "status",
+    "health": "health",
+}
+
+# TELEMETRY_SCHEMA with its columns tied together (see team6_package.dependencies)
+CORRELATED_TELEMETRY_SCHEMA = {
+    **TELEMETRY_SCHEMA,
+    "received_bytes": {"$expr": "int(sent_bytes * uniform(2, 10))"},
+    "cpu_percent": {"$expr": "round(uniform(0.2, 0.9) * devices_connected / devices_registered, 2)", "$max": 1},
+    "mem_used_bytes": {"$expr": "int(mem_total * (0.4 + cpu_percent / 2))", "$lt": "mem_total"},
+    "devices_connected": {"$type": "devices_connected", "$max": "devices_registered"},
+    "status": {"$given": "health", "$cases": {"BAD": {"$value": "inactive"}}, "$default": "status"},
+}
+
+SAS_CONFIG_SCHEMA = {
+    "serial_number": "serial_number",
+    "cbsd_category": "cbsd_category",
+    "plmn_id": "plmn_id",
+    "frequency_selection_logic": "frequency_selection_logic",
+    "software_version": "software_version",
+    "runtime_status": "runtime_status",
+    "tac": "tac",
+    "max_ue": "max_ue",
+    "aes_integrity_level": "aes_integrity_level",
+    "security_for_ciphering": "security_for_ciphering",
+    "request_status": "request_status",
+    "eci_auto_assign": "eci_auto_assign",
+    "signature": "signature",
+    "install_certification_time": "install_certification_time",
+    "location_name": "location_name",
+    "location_latitude": "location_latitude",
+    "location_longitude": "location_longitude",
+}
+
+# Shape of the repository's schema.json, with a list of devices added
+NESTED_SCHEMA = {
+    "employee": {
+        "name": "name",
+        "id": "int",
+        "department": {
+            "name": "word",
+            "location": "word",
+        },
+        "devices": {
+            "$list": {"id": "uuid", "status": "status"},
+            "$length": {"distribution": "uniform", "min": 1, "max": 3},
+        },
+    }
+}
+
+SCHEMAS = {
+    'telemetry': TELEMETRY_SCHEMA,
+    'telemetry_correlated': CORRELATED_TELEMETRY_SCHEMA,
+    'sas_config': SAS_CONFIG_SCHEMA,
+    'nested': NESTED_SCHEMA,
+}
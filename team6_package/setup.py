@@ -6,7 +6,12 @@ setup(
     description='Generate CSV data from a JSON schema.',
     author='Team 6',
     packages=find_packages(),
-    install_requires=['faker', 'kafka-python'],
+    install_requires=['faker', 'kafka-python', 'numpy'],
+    extras_require={
+        'msgpack': ['msgpack'],
+        'orjson': ['orjson'],
+        'parquet': ['pyarrow'],
+    },
     entry_points={
         'console_scripts': [
             'team6_package=team6_package.core:main'
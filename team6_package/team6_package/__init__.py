@@ -1 +1,29 @@
-from .core import generate_data, save_to_csv, load_schema, generate_single_record, fake_functions, create_kafka_producer
\ No newline at end of file
+# Public names are imported on first access (PEP 562), so `import team6_package`
+# and the CLI only load the modules (and NumPy, Faker, kafka) a run actually uses
+_exports = {
+    'generate_data': 'core',
+    'save_to_csv': 'core',
+    'load_schema': 'core',
+    'generate_single_record': 'core',
+    'fake_functions': 'core',
+    'create_kafka_producer': 'core',
+    'compile_schema': 'core',
+    'run_plan': 'core',
+    'generate_columns': 'columnar',
+    'iter_column_batches': 'columnar',
+    'columns_to_records': 'columnar',
+    'register_table': 'dependencies',
+}
+
+__all__ = list(_exports)
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{_exports[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,228 @@
+"""
+Columnar generation engine.
+
+Fields whose generators are simple random draws are produced N values at a time
+with a single NumPy call. Any other field type falls back to its Faker function
+from `fake_functions`, one value per row, so every schema is still supported.
+Fields given by directives (see team6_package.dependencies) are evaluated on
+the whole batch of the columns they read.
+"""
+import time
+
+import numpy as np
+
+from . import metrics
+from .core import ROW, Plan, compile_schema
+
+APPLICATION_TYPES = [
+    "Streaming", "Gaming", "Browsing",
+    "Social Media", "Video Call",
+    "Email", "E-commerce"
+]
+
+def _randint(low, high):
+    """Integers in [low, high], matching random.randint."""
+    return lambda n, rng: rng.integers(low, high + 1, size=n)
+
+def _uniform(low, high, digits):
+    return lambda n, rng: np.round(rng.uniform(low, high, size=n), digits)
+
+def _scaled(scale, low, high, divisor=1):
+    """int(scale * random.uniform(low, high) / divisor)"""
+    return lambda n, rng: (scale * rng.uniform(low, high, size=n) / divisor).astype(np.int64)
+
+def _choice(values):
+    values = np.array(values, dtype=object)
+    return lambda n, rng: values[rng.integers(0, len(values), size=n)]
+
+def _constant(value):
+    return lambda n, rng: np.full(n, value)
+
+def _boolean(n, rng):
+    return rng.random(n) < 0.5
+
+def _sent_bytes(n, rng):
+    return (rng.uniform(0.1, 0.4, size=n) * (1073741824 / rng.integers(23, 26, size=n))).astype(np.int64)
+
+# Vectorized equivalents of the scalar entries in fake_functions.
+# Each generator takes (n, rng) and returns an array of n values.
+column_functions = {
+    'boolean': _boolean,
+    'integer': _randint(1, 999999),
+    'float': _uniform(-180.0, 180.0, 6),
+    'status': _choice(["active", "inactive", "pending"]),
+    'application_type': _choice(APPLICATION_TYPES),
+    'signal_strength': _randint(-120, -40),
+    'latency': _randint(10, 1000),
+    'resource_allocation': _randint(1, 100),
+    'user_role': _choice(["tenant", "admin", "operator"]),
+    'action_type': _choice(["DELETE", "CREATE", "UPDATE", "READ"]),
+    'object_type': _choice(["radio", "gateway"]),
+    'object_model': _choice(["Indoor", "Outdoor"]),
+    'object_status': _choice(["MARKED_FOR_DELETE", "ACTIVE", "INACTIVE"]),
+    'carrier_name': _choice(["T-Mobile", "AT&T", "Verizon", "Cricket", "Sprint", "Mint"]),
+    'edge_type': _choice(["PRIVATE_CELLULAR", "CARRIER_GATEWAY"]),
+    'edge_ipsec_mode': _choice(["CERTIFICATE", "PSK"]),
+    'cbsd_category': _choice(["A", "B"]),
+    'runtime_status': _choice(["INACTIVE", "ACTIVE", "REBOOTING"]),
+    'tac': _randint(1, 999),
+    'max_ue': _randint(1, 9999),
+    'aes_integrity_level': _randint(1, 3),
+    'null_ciphering_level': _randint(0, 2),
+    'security_for_ciphering': _choice(["Optional", "Mandatory"]),
+    'security_for_integrity': _choice(["Optional", "Mandatory"]),
+    'snow3g_integrity_level': _randint(1, 3),
+    'assembly_revision': _choice(["A0", "B0", "C1"]),
+    'a1': _randint(30, 70),
+    'a2': _randint(30, 70),
+    'a5_t1': _randint(30, 70),
+    'a5_t2': _randint(30, 70),
+    'hysteresis': _randint(1, 10),
+    'time_to_trigger': _randint(100, 1000),
+    'request_status': _choice(["ACCEPTED", "REJECTED", "PENDING"]),
+    'eci_auto_assign': _boolean,
+    'subframe_assignment': _randint(0, 10),
+    'special_subframe_pattern': _randint(0, 10),
+    'location_zoom': _randint(1, 20),
+    'location_type': _choice(["PRIVATE_CLOUD", "PUBLIC_CLOUD"]),
+    'is_managed': _boolean,
+    'location_latitude': _uniform(-90.0, 90.0, 6),
+    'location_longitude': _uniform(-180.0, 180.0, 6),
+    'health': _choice(["GOOD", "BAD", "MARGINAL"]),
+
+    # Team 9 stuff
+    'sent_bytes': _sent_bytes,
+    'received_bytes': _scaled(1073741824, 0.1, 0.4),
+    'cpu_percent': _uniform(0.6, 0.9, 2),
+    'mem_used_bytes': _scaled(536870912, 0.7, 0.99),
+    'mem_total': _constant(536870912),
+    'disk_percent': _uniform(0.6, 0.9, 2),
+    'disk_total': _constant(536870912),
+    'machine_sent_bytes': _scaled(536870912, 0.1, 0.7, 15),
+    'machine_received_bytes': _scaled(536870912, 0.1, 0.7),
+    'radio_connected': _randint(50, 100),
+    'devices_registered': _randint(500, 700),
+    'devices_connected': _randint(400, 800),
+    'ue_pdn_connections_success': _randint(100, 300),
+    'ue_pdn_connections_released': _randint(100, 300),
+    'link_success_rate_5g': _uniform(0.8, 1, 2),
+    'allocate_ip_success_5g': _randint(100, 300),
+    'release_ip_success_5g': _randint(100, 300),
+}
+
+def required_bandwidth_column(app_types, n, rng):
+    """Vectorized required_bandwidth: the range is picked per row from application_type."""
+    low = np.full(n, 50)
+    high = np.full(n, 200)
+    if app_types is not None:
+        app_types = np.asarray(app_types, dtype=object)
+        small = np.isin(app_types, ["Browsing", "Email"])
+        medium = np.isin(app_types, ["Social Media", "E-commerce"])
+        low[small], high[small] = 5, 20
+        low[medium], high[medium] = 20, 50
+    return low + np.floor(rng.random(n) * (high - low + 1)).astype(np.int64)
+
+def allocated_bandwidth_column(required, n, rng):
+    """Vectorized allocated_bandwidth: an integer between half of and all of required."""
+    required = np.asarray(required, dtype=np.int64)
+    low = (required * 0.5).astype(np.int64)
+    return low + np.floor(rng.random(n) * (required - low + 1)).astype(np.int64)
+
+def compile_columns(schema, pools=None, overrides=None):
+    """
+    Compile a schema into a columnar plan.
+
+    The plan is a list of (column, generator, source) tuples, like
+    `compile_schema`, but every generator takes (n, rng, source_values) and
+    returns n values; field specs get the whole column batch so far. Fields
+    without a vectorized generator wrap their row-wise Faker function, unless
+    `pools` (a pools.ValuePools) samples them instead. `overrides` maps
+    columns to (n, rng) generators used instead of their field type.
+    """
+    vectorized_functions = column_functions
+    if pools is not None:
+        vectorized_functions = {**column_functions, **pools.column_functions()}
+    row_plan = compile_schema(schema)
+    plan = Plan()
+    plan.columns = row_plan.columns
+    context = None
+    for column, generator, source in row_plan:
+        if overrides and column in overrides:
+            plan.append((column, lambda n, rng, _, f=overrides[column]: f(n, rng), None))
+            continue
+        if source is ROW:
+            from .dependencies import compile_field, flat_context
+            if context is None:
+                context = flat_context(schema, column_functions=vectorized_functions)
+            field = compile_field(column, schema[column], context)
+            plan.append((column, lambda n, rng, columns, f=field: f.column(columns, n, rng), ROW))
+            continue
+        field_type = schema[column].lower()
+
+        if field_type == 'required_bandwidth':
+            plan.append((column, _with_source(required_bandwidth_column), source))
+        elif field_type == 'allocated_bandwidth':
+            if source is None:
+                plan.append((column, lambda n, rng, _: allocated_bandwidth_column(np.full(n, 50), n, rng), None))
+            else:
+                plan.append((column, _with_source(allocated_bandwidth_column), source))
+        elif field_type in vectorized_functions:
+            vectorized = vectorized_functions[field_type]
+            plan.append((column, lambda n, rng, _, f=vectorized: f(n, rng), None))
+        else:
+            plan.append((column, lambda n, rng, _, f=generator: [f() for _ in range(n)], None))
+    return plan
+
+def _with_source(function):
+    return lambda n, rng, source_values: function(source_values, n, rng)
+
+def is_fully_vectorized(schema):
+    """Return True if every field in the schema has a vectorized generator."""
+    dependent = ('required_bandwidth', 'allocated_bandwidth')
+    return all(not isinstance(t, str) or t.lower() in column_functions or t.lower() in dependent
+               for t in schema.values())
+
+def run_column_plan(plan, num_records, rng, to_python=True):
+    """
+    Generate one batch of columns from a columnar plan.
+
+    With `to_python` the columns are plain Python lists, so CSV, JSON and Kafka
+    output match the row engine; otherwise vectorized columns stay NumPy arrays.
+    """
+    arrays = {}
+    registry = metrics.active()
+    if registry is None:
+        for column, generator, source in plan:
+            arrays[column] = generator(num_records, rng, arrays if source is ROW else arrays.get(source))
+    else:
+        for column, generator, source in plan:
+            start = time.perf_counter()
+            arrays[column] = generator(num_records, rng, arrays if source is ROW else arrays.get(source))
+            registry.histogram('field_generation_seconds', metrics.FIELD_SECONDS_HELP,
+                               field=column).observe(time.perf_counter() - start)
+    order = getattr(plan, 'columns', None)
+    if order is not None:
+        arrays = {column: arrays[column] for column in order}
+    if not to_python:
+        return arrays
+    return {column: values.tolist() if isinstance(values, np.ndarray) else values
+            for column, values in arrays.items()}
+
+def generate_columns(schema, num_records, rng=None, pools=None):
+    """Generate `num_records` rows as a dict mapping each column to a list of values."""
+    if rng is None:
+        rng = np.random.default_rng()
+    return run_column_plan(compile_columns(schema, pools), num_records, rng)
+
+def iter_column_batches(schema, num_records, batch_size=10000, rng=None, pools=None):
+    """Yield column batches of at most `batch_size` rows until `num_records` rows are produced."""
+    if rng is None:
+        rng = np.random.default_rng()
+    plan = compile_columns(schema, pools)
+    for start in range(0, num_records, batch_size):
+        yield run_column_plan(plan, min(batch_size, num_records - start), rng)
+
+def columns_to_records(columns):
+    """Turn a column batch into a list of row dictionaries."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
@@ -0,0 +1,261 @@
+"""
+Batched Kafka consumption.
+
+consume_batches drains a consumer with poll(), hands every batch of records to
+a handler (optionally on a thread or process pool), writes the handler's
+results to a sink in order, and commits offsets only after a batch has been
+handled and written. At most `max_in_flight` batches are held at any time, so
+memory stays bounded whatever the size of the topic.
+
+    consumer = create_kafka_consumer('team6_topic', 'localhost:29092', group_id='loader')
+    with CsvSink('consumed.csv') as sink:
+        consume_batches(consumer, sink=sink)
+
+InMemoryConsumer stands in for KafkaConsumer in-process, e.g. to read back what
+an InMemoryProducer sent.
+"""
+import csv
+import os
+import time
+from collections import deque, namedtuple
+
+from . import core, metrics
+
+DEFAULT_MAX_RECORDS = 500
+
+# The fields of kafka-python's ConsumerRecord that the engine uses
+Record = namedtuple('Record', ['topic', 'partition', 'offset', 'key', 'value'])
+Partition = namedtuple('Partition', ['topic', 'partition'])
+
+ConsumeStats = namedtuple('ConsumeStats', ['messages', 'batches', 'seconds'])
+
+def create_kafka_consumer(topic, bootstrap_servers, group_id=None, auto_offset_reset='earliest',
+                          serializer='json', schema=None, value_deserializer=None,
+                          max_poll_records=DEFAULT_MAX_RECORDS, enable_auto_commit=False, **config):
+    """
+    Create a KafkaConsumer subscribed to `topic`. Auto-commit is off by default:
+    consume_batches commits after each batch is handled. Committing needs a `group_id`.
+
+    Values are decoded with `value_deserializer`, or the decoder of `serializer`
+    (see team6_package.serializers). Extra keyword arguments go to KafkaConsumer.
+    """
+    from kafka import KafkaConsumer
+    from .serializers import get_serializer
+    if value_deserializer is None:
+        value_deserializer = get_serializer(serializer, schema).decode
+    return KafkaConsumer(
+        topic,
+        bootstrap_servers=bootstrap_servers,
+        group_id=group_id,
+        auto_offset_reset=auto_offset_reset,
+        enable_auto_commit=enable_auto_commit,
+        value_deserializer=value_deserializer,
+        max_poll_records=max_poll_records,
+        **config
+    )
+
+class InMemoryConsumer:
+    """
+    In-process stand-in for KafkaConsumer with a single partition.
+
+    `messages` is a list of raw values, decoded with `value_deserializer` as
+    they are polled. Commits are recorded in `committed` (the next offset to read).
+    """
+
+    def __init__(self, messages, topic='team6_topic', value_deserializer=None,
+                 max_poll_records=DEFAULT_MAX_RECORDS):
+        self.messages = messages
+        self.topic = topic
+        self.value_deserializer = value_deserializer
+        self.max_poll_records = max_poll_records
+        self.position = 0
+        self.committed = 0
+        self.closed = False
+
+    @classmethod
+    def from_producer(cls, producer, topic, value_deserializer=None, **options):
+        """Consume what an InMemoryProducer (created with keep=True) sent to `topic`."""
+        messages = [value for sent_topic, _, value in producer.messages if sent_topic == topic]
+        return cls(messages, topic, value_deserializer, **options)
+
+    def poll(self, timeout_ms=0, max_records=None):
+        count = min(max_records or self.max_poll_records, self.max_poll_records)
+        values = self.messages[self.position:self.position + count]
+        if not values:
+            time.sleep(timeout_ms / 1000)  # like KafkaConsumer, wait out the timeout when there is nothing to read
+            return {}
+        partition = Partition(self.topic, 0)
+        decode = self.value_deserializer or (lambda value: value)
+        records = [Record(self.topic, 0, self.position + i, None, decode(value))
+                   for i, value in enumerate(values)]
+        self.position += len(values)
+        return {partition: records}
+
+    def commit(self, offsets=None):
+        if offsets is None:
+            self.committed = self.position
+        else:
+            self.committed = max(offset_and_metadata.offset for offset_and_metadata in offsets.values())
+
+    def close(self, autocommit=False):
+        self.closed = True
+
+def _commit_offsets(consumer, offsets):
+    """Commit {partition: last offset handled} as the next offsets to read."""
+    from kafka.structs import OffsetAndMetadata, TopicPartition
+    consumer.commit({TopicPartition(partition.topic, partition.partition): OffsetAndMetadata(offset + 1, '', -1)
+                     for partition, offset in offsets.items()})
+
+def _handle(handler, values):
+    """Run the handler on a batch; a None result means the batch itself goes to the sink."""
+    result = handler(values) if handler is not None else None
+    return values if result is None else result
+
+def consume_batches(consumer, on_batch=None, sink=None, workers=0, executor='thread',
+                    max_records=DEFAULT_MAX_RECORDS, poll_timeout_ms=1000, idle_timeout_ms=5000,
+                    max_in_flight=None, commit=True, max_messages=None):
+    """
+    Drain a consumer batch by batch.
+
+    Parameters:
+    - consumer: A KafkaConsumer (see create_kafka_consumer) or InMemoryConsumer.
+    - on_batch (callable): Called with each batch as a list of message values. It may
+      return a list of records to write instead of the batch.
+    - sink (callable): Called with the records of each batch, in order; e.g. CsvSink or ColumnarSink.
+    - workers (int): Size of the pool running on_batch. 0 runs it in this thread.
+    - executor (str): 'thread', or 'process' for CPU-heavy handlers (on_batch must then be picklable).
+    - max_records (int): Most records per poll().
+    - poll_timeout_ms (int): How long one poll() waits for records.
+    - idle_timeout_ms (int): Stop after no records arrive for this long. None keeps polling.
+    - max_in_flight (int): Most batches polled but not yet written and committed. Defaults to 2 * workers.
+    - commit (bool): Commit offsets after each batch is handled and written.
+    - max_messages (int): Stop after roughly this many messages.
+
+    Offsets of a batch are committed only after its handler and sink succeeded
+    (and all batches before it), so a failure re-delivers it: at-least-once.
+    Returns ConsumeStats(messages, batches, seconds).
+    """
+    if max_in_flight is None:
+        max_in_flight = max(1, 2 * workers)
+    pool = None
+    if workers > 0:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        pool = (ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor)(max_workers=workers)
+
+    registry = metrics.active()
+    consumed = registry.counter('messages_consumed_total', 'Messages read from Kafka') if registry is not None else None
+    pending = deque()  # (result or future, {partition: last offset}) in poll order
+    messages = batches = 0
+    start = last_records = time.monotonic()
+
+    def finish_oldest():
+        nonlocal batches
+        result, offsets = pending.popleft()
+        records = result.result() if pool is not None else result
+        if sink is not None:
+            sink(records)
+        if commit:
+            _commit_offsets(consumer, offsets)
+        batches += 1
+
+    try:
+        while max_messages is None or messages < max_messages:
+            polled = consumer.poll(timeout_ms=poll_timeout_ms, max_records=max_records)
+            if not polled:
+                if idle_timeout_ms is not None and (time.monotonic() - last_records) * 1000 >= idle_timeout_ms:
+                    break
+                continue
+            last_records = time.monotonic()
+
+            values = []
+            offsets = {}
+            for partition, records in polled.items():
+                values.extend(record.value for record in records)
+                offsets[partition] = records[-1].offset
+            messages += len(values)
+            if consumed is not None:
+                consumed.inc(len(values))
+
+            if pool is not None:
+                pending.append((pool.submit(_handle, on_batch, values), offsets))
+            else:
+                pending.append((_handle(on_batch, values), offsets))
+            while len(pending) >= max_in_flight:
+                finish_oldest()
+        while pending:
+            finish_oldest()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return ConsumeStats(messages, batches, time.monotonic() - start)
+
+class CsvSink:
+    """Appends batches of records to a CSV file, writing the header when the file is new."""
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='', buffering=core.WRITE_BUFFER_SIZE)
+        self.writer = None
+        self.write_header = new_file
+
+    def __call__(self, records):
+        if not records:
+            return
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(records[0].keys()))
+            if self.write_header:
+                self.writer.writeheader()
+        self.writer.writerows(records)
+        metrics.record_rows('consume', len(records))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ColumnarSink:
+    """
+    Writes batches of records to a Parquet or Arrow IPC file, one row group /
+    record batch per consumed batch.
+
+    Column types are inferred from the first batch unless `arrow_schema` is given.
+    """
+
+    def __init__(self, path, format='parquet', compression=None, arrow_schema=None):
+        self.path = path
+        self.format = format
+        self.compression = compression
+        self.arrow_schema = arrow_schema
+        self.writer = None
+
+    def __call__(self, records):
+        if not records:
+            return
+        from .formats import ColumnarWriter, _pyarrow
+        pa = _pyarrow()
+        batch = pa.RecordBatch.from_pylist(records, schema=self.arrow_schema)
+        if self.writer is None:
+            self.arrow_schema = batch.schema
+            self.writer = ColumnarWriter(self.path, self.format, self.arrow_schema, self.compression)
+        self.writer.write_batch(batch)
+        metrics.record_rows('consume', len(records))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_sink(path, format='csv', compression=None):
+    """Return the sink for an output file: CsvSink for 'csv', ColumnarSink for 'parquet' and 'arrow'."""
+    if format == 'csv':
+        return CsvSink(path)
+    return ColumnarSink(path, format, compression)
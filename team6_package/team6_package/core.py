@@ -1,32 +1,128 @@
-from faker import Faker
 import random
 import csv
 import json
 import argparse
 import io  # For in-memory CSV handling
+from itertools import islice
 import time
 from datetime import datetime, timedelta
-from kafka import KafkaProducer
-from kafka import KafkaConsumer
 import logging
+import heapq
+import threading
+from contextlib import contextmanager
 
-logging.basicConfig(level=logging.INFO)
-fake = Faker()
+class LazyFaker:
+    """
+    Stand-in for a Faker instance that imports Faker and loads its locale and
+    providers on first use, so runs whose fields never call Faker skip that cost.
+    A seed set before then is applied when the instance is created.
+    """
+
+    def __init__(self, locale=None):
+        self._locale = locale
+        self._faker = None
+        self._seed = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._faker is None:
+                from faker import Faker
+                faker = Faker(self._locale)
+                if self._seed is not None:
+                    faker.seed_instance(self._seed)
+                self._faker = faker
+        return self._faker
+
+    def seed_instance(self, seed=None):
+        if self._faker is None:
+            self._seed = seed
+        else:
+            self._faker.seed_instance(seed)
+
+    def __getattr__(self, name):
+        faker = self._faker
+        if faker is None:
+            faker = self._load()
+        return getattr(faker, name)
+
+    def get_state(self):
+        """Return the state of the instance's random stream, for set_state."""
+        stream = self._load().random
+        return stream, stream.getstate()
+
+    def set_state(self, state):
+        stream, stream_state = state
+        stream.setstate(stream_state)
+        self._load().random = stream
+
+fake = LazyFaker()
+
+@contextmanager
+def isolated_seed(seed):
+    """
+    Seed `random` and `fake` for the duration of the block, then restore the
+    streams as they were, so the draws made inside do not change what any
+    other generation (seeded or not) draws afterwards.
+    """
+    random_state = random.getstate()
+    faker_state = fake.get_state()
+    random.seed(seed)
+    fake.seed_instance(seed)
+    try:
+        yield
+    finally:
+        random.setstate(random_state)
+        fake.set_state(faker_state)
+
+WRITE_BUFFER_SIZE = 1 << 20  # Bytes buffered by CSV file handles
+
+# "Now" of the time-relative types (datetime, iso8601, manufacturing_date, ...). None follows the
+# wall clock; runs pin it with pinned_time so their records do not depend on when they are generated
+_reference_time = None
+
+# Reference time of seeded runs that do not give one, so a seed gives the same records on any day
+SEEDED_REFERENCE_TIME = datetime(2025, 1, 1)
+
+def current_time():
+    """Return the reference "now" of the time-relative types."""
+    return _reference_time if _reference_time is not None else datetime.now()
+
+def parse_reference_time(reference_time):
+    """Return a reference time as a datetime; strings are ISO 8601 ('2025-01-01 00:00:00')."""
+    if isinstance(reference_time, str):
+        return datetime.fromisoformat(reference_time)
+    return reference_time
+
+@contextmanager
+def pinned_time(reference_time):
+    """Generate the time-relative types relative to `reference_time` (a datetime or ISO string) in the block."""
+    global _reference_time
+    previous = _reference_time
+    _reference_time = parse_reference_time(reference_time)
+    try:
+        yield
+    finally:
+        _reference_time = previous
 
 # Mapping field types to Faker functions
 fake_functions = {
     'uuid': lambda: fake.uuid4(),  # UUID
     'boolean': lambda: random.choice([True, False]),
     'integer': lambda: random.randint(1, 999999),  # General integer
-    'iso8601': lambda: fake.iso8601(),  # ISO8601 timestamp
+    'int': lambda: random.randint(1000, 9999),  # Four-digit integer
+    'version': lambda: random.randint(1, 100),
+    'iso8601': lambda: fake.iso8601(end_datetime=current_time()),  # ISO8601 timestamp
     'float': lambda: round(random.uniform(-180.0, 180.0), 6),  # General float
-    'datetime': lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-    'nullable_datetime': lambda: fake.date_time_between(start_date='-2y', end_date='now') if random.choice([True, False]) else None,
+    'datetime': lambda: current_time().strftime('%Y-%m-%d %H:%M:%S'),
+    'nullable_datetime': lambda: fake.date_time_between(start_date=current_time() - timedelta(days=730), end_date=current_time()) if random.choice([True, False]) else None,
+    'past_datetime': lambda: fake.date_time_between(start_date=current_time() - timedelta(days=730), end_date=current_time()),  # Within the last two years
     'status': lambda: fake.word(ext_word_list=["active", "inactive", "pending"]),
     'name': lambda: fake.name(),
     'email': lambda: fake.email(),
     'word': lambda: fake.word(),
     'address': lambda: fake.address(),
+    'phone': lambda: fake.phone_number(),
     'id': lambda: fake.uuid4(),
     'application_type': lambda: random.choice([
         "Streaming", "Gaming", "Browsing",
@@ -35,7 +131,7 @@ fake_functions = {
     ]),
     'signal_strength': lambda: random.randint(-120, -40),
     'latency': lambda: random.randint(10, 1000),
-    'required_bandwidth': None,  # Handled in generate_data
+    'required_bandwidth': None,  # Handled in compile_schema
     'allocated_bandwidth': lambda required: random.randint(int(required * 0.5), required),
     'resource_allocation': lambda: random.randint(1, 100),  # Percentage
 
@@ -86,7 +182,7 @@ fake_functions = {
     'board_number': lambda: f"{random.randint(100, 999)}-{random.randint(10, 99)}-{random.randint(100, 999)}",
     'assembly_number': lambda: f"{random.randint(900, 999)}-{random.randint(10, 99)}-{random.randint(400, 499)}",
     'assembly_revision': lambda: random.choice(["A0", "B0", "C1"]),
-    'manufacturing_date': lambda: fake.date_between(start_date='-5y', end_date='today'),  
+    'manufacturing_date': lambda: fake.date_between(start_date=current_time().date() - timedelta(days=1826), end_date=current_time().date()),  
 
     # Mobility parameters
     'a1': lambda: random.randint(30, 70),
@@ -103,7 +199,7 @@ fake_functions = {
     'subframe_assignment': lambda: random.randint(0, 10),
     'special_subframe_pattern': lambda: random.randint(0, 10),
     'status_message': lambda: fake.sentence(),
-    'install_certification_time': lambda: fake.iso8601(),
+    'install_certification_time': lambda: fake.iso8601(end_datetime=current_time()),
 
     # Location-related data
     'location_name': lambda: fake.city(),
@@ -111,8 +207,8 @@ fake_functions = {
     'location_zoom': lambda: random.randint(1, 20),
     'location_type': lambda: fake.word(ext_word_list=["PRIVATE_CLOUD", "PUBLIC_CLOUD"]),
     'is_managed': lambda: random.choice([True, False]),
-    'location_latitude': lambda: round(fake.latitude(), 6),
-    'location_longitude': lambda: round(fake.longitude(), 6),
+    'location_latitude': lambda: round(float(fake.latitude()), 6),
+    'location_longitude': lambda: round(float(fake.longitude()), 6),
     'uptime': lambda: f"{random.randint(0, 99)}d {random.randint(0, 23)}h {random.randint(0, 59)}m {random.randint(0, 59)}s",
     'health': lambda: fake.word(ext_word_list=["GOOD", "BAD", "MARGINAL"]),
 
@@ -137,65 +233,264 @@ fake_functions = {
     'release_ip_success_5g': lambda: random.randint(100, 300)
 }
 
-def generate_data(schema, num_records):
-    """Generate a list of dictionaries based on the JSON schema."""
-    data = []
-    for _ in range(num_records):
-        row = generate_single_record(schema)
-        data.append(row)
-    return data
+def generate_data(schema, num_records, workers=1, seed=None, pools=None, start_index=0, reference_time=None):
+    """
+    Generate a list of dictionaries based on the JSON schema.
+
+    With `workers` > 1 or a `seed`, the records are generated in seeded blocks
+    (see team6_package.parallel): record i depends only on the seed, the schema
+    and i, so the same seed always gives the same records and `start_index`
+    returns the records of a run from that index on. Slow Faker types are
+    sampled from `pools` (a pools.ValuePools) when given. Time-relative types
+    (datetime, iso8601, ...) are relative to `reference_time`, by default a
+    fixed time for seeded runs and the start of the run otherwise.
+    """
+    if start_index and seed is None:
+        raise ValueError("start_index needs a seed.")
+    if workers > 1 or seed is not None:
+        from .parallel import generate_records_parallel
+        return generate_records_parallel(schema, num_records, workers=workers, seed=seed, pools=pools,
+                                         start_index=start_index, reference_time=reference_time)
+    with pinned_time(reference_time if reference_time is not None else datetime.now().replace(microsecond=0)):
+        return list(iter_records(schema, num_records, pools))
+
+def iter_records(schema, num_records, pools=None):
+    """
+    Lazily yield `num_records` records based on the JSON schema.
+
+    Nested schemas (see team6_package.nested) yield flat records keyed by
+    dotted column names.
+    """
+    from . import metrics
+    from .nested import compile_nested, is_nested, iter_nested_records
+    functions = pools.row_functions() if pools is not None else None
+    if is_nested(schema):
+        yield from iter_nested_records(compile_nested(schema, functions), num_records)
+        return
+
+    plan = compile_schema(schema, functions)
+    registry = metrics.active()
+    if registry is None:
+        for _ in range(num_records):
+            yield run_plan(plan)
+        return
+    timer = metrics.FieldTimer(registry, [column for column, _, _ in plan])
+    try:
+        for _ in range(num_records):
+            yield run_plan(plan, timer)
+    finally:
+        timer.flush()
 
 def generate_single_record(schema):
     """Generate a single data record based on the JSON schema."""
-    row = {}
+    return next(iter_records(schema, 1))
+
+def required_bandwidth(app_type):
+    """Pick a required bandwidth in the range typical for the application type."""
+    if app_type in ["Browsing", "Email"]:
+        return random.randint(5, 20)
+    elif app_type in ["Social Media", "E-commerce"]:
+        return random.randint(20, 50)
+    else:  # Streaming, Gaming, Video Call
+        return random.randint(50, 200)
+
+# Built-in types that read another column of the same record, by column name
+SOURCE_COLUMNS = {'required_bandwidth': 'application_type', 'allocated_bandwidth': 'required_bandwidth'}
+
+# Plan source of fields that read the whole record generated so far (see team6_package.dependencies)
+ROW = '$row'
+
+# Directives that make a schema entry a field spec rather than a nested record
+SOURCE_DIRECTIVES = ('$type', '$value', '$expr', '$given', '$ref')
+
+def is_field_spec(node):
+    """Whether a schema entry is a field given by directives, e.g. {"$expr": "..."}."""
+    return isinstance(node, dict) and any(key in node for key in SOURCE_DIRECTIVES)
+
+def resolve_field(field_type, seen, functions=None, strict=False):
+    """
+    Resolve a field type to (generator, source).
+
+    `seen` holds the columns of the record, which required_bandwidth and
+    allocated_bandwidth read from; generation_order puts their sources first.
+    `functions` defaults to fake_functions. Unknown types generate a word, or
+    raise ValueError when `strict` is set.
+    """
+    functions = fake_functions if functions is None else functions
+    field_type_lower = field_type.lower()
+
+    if field_type_lower == 'required_bandwidth':
+        # Depends on the application_type column if the record has one
+        if 'application_type' in seen:
+            return required_bandwidth, 'application_type'
+        return lambda: required_bandwidth(None), None
+
+    if field_type_lower == 'allocated_bandwidth':
+        # Use the value of required_bandwidth to generate allocated_bandwidth
+        allocated = functions['allocated_bandwidth']
+        if 'required_bandwidth' in seen:
+            return allocated, 'required_bandwidth'
+        return lambda: allocated(50), None
+
+    if field_type_lower in functions:
+        return functions[field_type_lower], None
+
+    if strict:
+        raise ValueError(f"Unknown field type '{field_type}'")
+    # Default to generating a word if the type is unknown
+    return functions['word'], None
+
+def generation_order(columns, dependencies):
+    """
+    Order `columns` so every column comes after the columns it depends on,
+    keeping schema order otherwise.
+
+    `dependencies` maps a column to the columns it reads. Raises ValueError
+    naming the columns of a dependency cycle.
+    """
+    position = {column: i for i, column in enumerate(columns)}
+    waiting = {column: len(dependencies.get(column, ())) for column in columns}
+    dependents = {column: [] for column in columns}
+    for column in columns:
+        for dependency in dependencies.get(column, ()):
+            dependents[dependency].append(column)
+    ready = [position[column] for column in columns if not waiting[column]]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        column = columns[heapq.heappop(ready)]
+        order.append(column)
+        for dependent in dependents[column]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                heapq.heappush(ready, position[dependent])
+    if len(order) < len(columns):
+        cycle = [column for column in columns if waiting[column]]
+        raise ValueError(f"Circular dependency between columns: {', '.join(cycle)}")
+    return order
+
+class Plan(list):
+    """A compiled plan in generation order; `columns` is the record's column order when it differs."""
+    columns = None
+
+def compile_schema(schema, functions=None, strict=False, table_files=True):
+    """
+    Compile a schema into a reusable generation plan.
+
+    The plan is a list of (column, generator, source) tuples. Field types are
+    resolved to their generator functions once, so generating a row is a plain
+    walk over the list. `source` names the column whose value is passed to the
+    generator, is ROW for fields given by directives (see
+    team6_package.dependencies), which get the record so far, or is None for
+    independent fields. Columns are generated after the columns they read;
+    `table_files` lets $ref read tables from files.
+    """
+    dependencies = {}
+    specs = False
     for column, field_type in schema.items():
-        field_type_lower = field_type.lower()
-
-        if field_type_lower == 'required_bandwidth':
-            # Custom logic for required_bandwidth
-            app_type = row.get('application_type', None)
-            if app_type in ["Browsing", "Email"]:
-                row[column] = random.randint(5, 20)
-            elif app_type in ["Social Media", "E-commerce"]:
-                row[column] = random.randint(20, 50)
-            else:  # Streaming, Gaming, Video Call
-                row[column] = random.randint(50, 200)
-
-        elif field_type_lower == 'allocated_bandwidth':
-            # Use the value of required_bandwidth to generate allocated_bandwidth
-            required_bw = row.get('required_bandwidth', 50)
-            row[column] = fake_functions['allocated_bandwidth'](required_bw)
-
-        elif field_type_lower in fake_functions:
-            # Use the corresponding Faker function
-            row[column] = fake_functions[field_type_lower]()
+        if isinstance(field_type, str):
+            source = SOURCE_COLUMNS.get(field_type.lower())
+            dependencies[column] = [source] if source in schema else []
+        elif is_field_spec(field_type):
+            from .dependencies import spec_names
+            dependencies[column] = spec_names(field_type)
+            unknown = [name for name in dependencies[column] if name not in schema]
+            if unknown:
+                raise ValueError(f"Column '{column}' references unknown column '{unknown[0]}'")
+            specs = True
+        else:
+            raise ValueError(f"Column '{column}' is nested; use team6_package.nested for nested schemas")
+
+    order = generation_order(list(schema), dependencies)
+    plan = Plan()
+    if order != list(schema):
+        plan.columns = list(schema)
+    context = None
+    if specs:
+        from .dependencies import compile_field, flat_context
+        context = flat_context(schema, functions, strict=strict, table_files=table_files)
+    for column in order:
+        field_type = schema[column]
+        if isinstance(field_type, str):
+            generator, source = resolve_field(field_type, schema, functions, strict)
+        else:
+            generator, source = compile_field(column, field_type, context).row, ROW
+        plan.append((column, generator, source))
+    return plan
 
+def run_plan(plan, timer=None):
+    """
+    Generate a single data record from a compiled plan. With `timer` (a
+    metrics.FieldTimer over the plan's columns) the time of each field is added up.
+    """
+    columns = getattr(plan, 'columns', None)
+    row = dict.fromkeys(columns) if columns is not None else {}
+    if timer is not None:
+        return _run_plan_timed(plan, row, timer)
+    for column, generator, source in plan:
+        if source is None:
+            row[column] = generator()
+        elif source is ROW:
+            row[column] = generator(row)
         else:
-            # Default to generating a word if the type is unknown
-            row[column] = fake_functions['word']()
+            row[column] = generator(row[source])
+    return row
 
+def _run_plan_timed(plan, row, timer):
+    seconds = timer.seconds
+    for index, (column, generator, source) in enumerate(plan):
+        start = time.perf_counter()
+        if source is None:
+            row[column] = generator()
+        elif source is ROW:
+            row[column] = generator(row)
+        else:
+            row[column] = generator(row[source])
+        seconds[index] += time.perf_counter() - start
+    timer.row_done()
     return row
 
-def save_to_csv(data, output_file=None):
+def write_records(file, records, chunk_size=10000):
     """
-    Save data to a CSV file. 
-    If `output_file` is None, return the CSV content as a StringIO object.
+    Write records (any iterable of dicts) to an open file as CSV.
+
+    The header comes from the first record. Rows are written and flushed
+    `chunk_size` at a time, so only one chunk is held in memory.
     """
-    if not data:
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
         raise ValueError("No data to save.")
 
-    fieldnames = data[0].keys()
-    csv_buffer = io.StringIO()  # Create an in-memory string buffer
-
-    writer = csv.DictWriter(csv_buffer, fieldnames=fieldnames)
+    writer = csv.DictWriter(file, fieldnames=first.keys())
     writer.writeheader()
-    writer.writerows(data)
+    writer.writerow(first)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        writer.writerows(chunk)
+        file.flush()
+
+def write_csv(records, output_file, chunk_size=10000):
+    """Stream records (any iterable of dicts) to a CSV file through a buffered handle."""
+    with open(output_file, 'w', newline='', buffering=WRITE_BUFFER_SIZE) as file:
+        write_records(file, records, chunk_size)
+
+def save_to_csv(data, output_file=None, chunk_size=10000):
+    """
+    Save data to a CSV file. 
+    If `output_file` is None, return the CSV content as a StringIO object.
 
+    `data` can be a list or any iterable of records, such as `iter_records`.
+    Files are written in chunks, so generators are never fully materialized.
+    """
     if output_file:
-        with open(output_file, 'w', newline='') as file:
-            file.write(csv_buffer.getvalue())
+        write_csv(data, output_file, chunk_size)
         print(f"Data saved to {output_file}")
     else:
+        csv_buffer = io.StringIO()  # Create an in-memory string buffer
+        write_records(csv_buffer, data, chunk_size)
         csv_buffer.seek(0)  # Reset buffer position to the beginning
         return csv_buffer  # Return the in-memory CSV object
 
@@ -204,111 +499,324 @@ def load_schema(schema_path):
     with open(schema_path, 'r') as file:
         return json.load(file)
 
-def create_kafka_producer(bootstrap_servers):
-    """Create and return a Kafka producer."""
+def create_kafka_producer(bootstrap_servers, linger_ms=0, batch_size=16384, compression_type=None,
+                          serializer='json', schema=None, partitioner=None):
+    """
+    Create and return a Kafka producer.
+
+    `linger_ms`, `batch_size` and `compression_type` are passed to KafkaProducer;
+    raising linger_ms and batch_size lets the producer send fewer, larger requests.
+    `serializer` names the payload format (see team6_package.serializers); the
+    'schema' format also needs the loaded `schema`. With serializer=None values
+    must already be bytes. `partitioner` replaces the producer's key-hash
+    partitioner: partitioner(key_bytes, all_partitions, available_partitions).
+    """
+    from . import metrics
+    from .serializers import get_serializer
+    encode = get_serializer(serializer, schema).encode if serializer is not None else None
+    registry = metrics.active()
+    if registry is not None and encode is not None:
+        encode = metrics.timed_serializer(registry, serializer, encode)
+    from kafka import KafkaProducer
+    config = {'partitioner': partitioner} if partitioner is not None else {}
     producer = KafkaProducer(
         bootstrap_servers=bootstrap_servers,
-        value_serializer=lambda v: json.dumps(v).encode('utf-8')
+        value_serializer=encode,
+        linger_ms=linger_ms,
+        batch_size=batch_size,
+        compression_type=compression_type,
+        **config
     )
     return producer
 
+def add_pool_arguments(parser):
+    parser.add_argument('--pool-size', type=int, default=0, help='Sample slow Faker types (names, addresses, ...) from pools of this many values (0 disables pools)')
+    parser.add_argument('--pool-dir', type=str, default=None, help='Directory where pools are saved and memory-mapped from on later runs')
+    parser.add_argument('--pool-settings', type=str, default=None, help='JSON file with per-type pool settings, e.g. {"name": {"size": 50000}, "uuid": {"mode": "unique"}}')
+
+def pools_from_args(args):
+    """Build the ValuePools for the --pool-* options, or None when pools are disabled."""
+    if args.pool_size <= 0:
+        return None
+    from .pools import ValuePools
+    settings = load_schema(args.pool_settings) if args.pool_settings else None
+    return ValuePools(size=args.pool_size, settings=settings, directory=args.pool_dir,
+                      seed=getattr(args, 'seed', None))
+
+def add_metrics_arguments(parser):
+    parser.add_argument('--metrics-interval', type=float, default=0, help='Log a metrics summary (rows, bytes, per-field and send timings) every this many seconds (0 disables metrics)')
+
+def metrics_from_args(args):
+    """Enable metrics and start logging summaries for --metrics-interval; returns the reporter or None."""
+    if args.metrics_interval <= 0:
+        return None
+    from . import metrics
+    return metrics.PeriodicReporter(metrics.enable(), [metrics.LogSink()], args.metrics_interval).start()
+
 def run_batch_mode(schema):
     parser = argparse.ArgumentParser(description="Batch mode arguments")
+    parser.add_argument('schema', type=str, help='Path to the JSON schema file')
     parser.add_argument('output', type=str, help='The output CSV file name')
     parser.add_argument('-n', '--num-records', type=int, default=100, help='Number of records to generate')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('-s', '--seed', type=int, default=None, help='Seed for reproducible output')
+    parser.add_argument('--start-index', type=int, default=0, help='Index of the first record to generate; with --seed, any range of a run can be regenerated')
+    parser.add_argument('--resume', action='store_true', help='Save progress to OUTPUT.checkpoint and, when it exists, continue an interrupted CSV run after its last written row')
+    parser.add_argument('--reference-time', type=str, default=None, help='"Now" for time-relative types (datetime, iso8601, ...), e.g. "2025-01-01 00:00:00"; defaults to a fixed time with --seed and the start of the run otherwise')
+    parser.add_argument('--shard-size', type=int, default=100000, help='Records generated per shard')
+    parser.add_argument('--part-files', action='store_true', help='Write one part file per shard instead of a single file')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Records generated and flushed per chunk')
+    parser.add_argument('-f', '--format', type=str, default='csv', choices=['csv', 'parquet', 'arrow'], help='Output file format')
+    parser.add_argument('--compression', type=str, default=None, help='Parquet/Arrow compression codec (parquet: snappy, gzip, brotli, lz4, zstd, none; arrow: lz4, zstd, none)')
+    parser.add_argument('--start-time', type=str, default=None, help='Time-series mode: timestamp of the first record, e.g. "2024-01-01 00:00:00"')
+    parser.add_argument('--interval', type=float, default=None, help='Time-series mode: seconds between records (default 1)')
+    parser.add_argument('--jitter', type=float, default=0, help='Time-series mode: move each timestamp by up to this many seconds either way')
+    parser.add_argument('--irregular', action='store_true', help='Time-series mode: exponentially distributed gaps with --interval as the mean')
+    parser.add_argument('--devices', type=int, default=1, help='Time-series mode: records per timestamp, one per device ID (device_id column)')
+    add_pool_arguments(parser)
+    add_metrics_arguments(parser)
     batch_args, _ = parser.parse_known_args()
 
-    data = generate_data(schema, batch_args.num_records)
-    save_to_csv(data, batch_args.output)
-    print(f"Data successfully saved to {batch_args.output}")
+    reporter = metrics_from_args(batch_args)
+    try:
+        if batch_args.start_time is not None or batch_args.interval is not None:
+            # Time-series mode: datetime fields follow a simulated clock, written in one process chunk by chunk
+            if batch_args.start_index or batch_args.resume:
+                parser.error('--start-index and --resume are not supported in time-series mode (--start-time/--interval)')
+            from .timeseries import write_time_series
+            files = write_time_series(
+                schema, batch_args.num_records, batch_args.output,
+                format=batch_args.format, compression=batch_args.compression,
+                start_time=batch_args.start_time,
+                interval_seconds=batch_args.interval if batch_args.interval is not None else 1,
+                jitter_seconds=batch_args.jitter, irregular=batch_args.irregular, devices=batch_args.devices,
+                batch_size=batch_args.chunk_size, seed=batch_args.seed, pools=pools_from_args(batch_args),
+                reference_time=batch_args.reference_time
+            )
+        else:
+            # Vectorized columns where possible, Faker per column for everything else,
+            # generated in seeded blocks and shards across the worker processes
+            if batch_args.start_index and batch_args.seed is None:
+                parser.error('--start-index needs --seed')
+            options = dict(
+                workers=batch_args.workers, seed=batch_args.seed,
+                shard_size=batch_args.shard_size, part_files=batch_args.part_files,
+                chunk_size=batch_args.chunk_size, pools=pools_from_args(batch_args),
+                start_index=batch_args.start_index, reference_time=batch_args.reference_time
+            )
+            if batch_args.format == 'csv':
+                from .parallel import write_csv_parallel
+                files = write_csv_parallel(schema, batch_args.num_records, batch_args.output,
+                                           resume=batch_args.resume, **options)
+            elif batch_args.resume:
+                parser.error('--resume is only supported for CSV output')
+            else:
+                from .formats import write_columnar_parallel
+                files = write_columnar_parallel(
+                    schema, batch_args.num_records, batch_args.output,
+                    format=batch_args.format, compression=batch_args.compression, **options
+                )
+    finally:
+        if reporter is not None:
+            reporter.stop()
+    print(f"Data successfully saved to {', '.join(files)}")
 
 def run_streaming_mode(schema):
     parser = argparse.ArgumentParser(description="Streaming mode arguments")
+    parser.add_argument('schema', type=str, help='Path to the JSON schema file')
     parser.add_argument('topic', type=str, help='Kafka topic to send data to')
     parser.add_argument('-b', '--bootstrap-servers', type=str, default='localhost:9092', help='Kafka bootstrap servers')
-    parser.add_argument('-i', '--interval', type=float, default=1.0, help='Time interval between data points in seconds')
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help='Time interval between data points in seconds (used when --rate is not given; 0 sends as fast as possible)')
+    parser.add_argument('-r', '--rate', type=float, default=None, help='Target messages per second')
     parser.add_argument('-d', '--duration', type=float, default=60.0, help='Total duration to send data in seconds')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Records pre-generated per batch')
+    parser.add_argument('--linger-ms', type=int, default=5, help='Producer linger.ms')
+    parser.add_argument('--producer-batch-size', type=int, default=65536, help='Producer batch.size in bytes')
+    parser.add_argument('--compression-type', type=str, default=None, choices=['gzip', 'snappy', 'lz4', 'zstd'], help='Producer compression codec')
+    parser.add_argument('--serializer', type=str, default='json', choices=['json', 'msgpack', 'schema'], help='Message payload format')
+    parser.add_argument('--stats-interval', type=float, default=5.0, help='Seconds between stats lines (0 disables them)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print every sent record')
+    add_pool_arguments(parser)
+    add_metrics_arguments(parser)
     stream_args, _ = parser.parse_known_args()
 
-    producer = create_kafka_producer(stream_args.bootstrap_servers)
-    end_time = time.time() + stream_args.duration
+    from .streaming import stream_records
+    reporter = metrics_from_args(stream_args)
+    producer = create_kafka_producer(
+        stream_args.bootstrap_servers,
+        linger_ms=stream_args.linger_ms,
+        batch_size=stream_args.producer_batch_size,
+        compression_type=stream_args.compression_type,
+        serializer=stream_args.serializer,
+        schema=schema
+    )
+    if stream_args.interval < 0:
+        parser.error('--interval must not be negative')
+    # --interval 0 (without --rate) sends as fast as possible
+    rate = stream_args.rate if stream_args.rate else (1.0 / stream_args.interval if stream_args.interval else None)
 
-    print(f"Starting data stream to Kafka topic '{stream_args.topic}'...")
+    pace = f"at {rate:,.0f} msgs/sec" if rate else "as fast as possible"
+    print(f"Starting data stream to Kafka topic '{stream_args.topic}' {pace}...")
 
     try:
-        while time.time() < end_time:
-            data = generate_single_record(schema)
-            producer.send(stream_args.topic, value=data)
-            print(f"Sent data: {data}")
-            time.sleep(stream_args.interval)
-
-        producer.flush()
+        stream_records(
+            producer, stream_args.topic, schema,
+            rate=rate,
+            duration=stream_args.duration,
+            batch_size=stream_args.batch_size,
+            verbose=stream_args.verbose,
+            stats_interval=stream_args.stats_interval,
+            pools=pools_from_args(stream_args)
+        )
         print("Data streaming completed.")
 
     except KeyboardInterrupt:
         print("Data streaming interrupted by user.")
     finally:
         producer.close()
+        if reporter is not None:
+            reporter.stop()
+
+def run_consume_mode(schema):
+    parser = argparse.ArgumentParser(description="Consume mode arguments")
+    parser.add_argument('schema', type=str, help='Path to the JSON schema file')
+    parser.add_argument('topic', type=str, help='Kafka topic to read')
+    parser.add_argument('output', type=str, help='File the consumed messages are appended to')
+    parser.add_argument('-b', '--bootstrap-servers', type=str, default='localhost:9092', help='Kafka bootstrap servers')
+    parser.add_argument('-g', '--group-id', type=str, default=None, help='Consumer group; offsets are committed after each batch is written')
+    parser.add_argument('-f', '--format', type=str, default='csv', choices=['csv', 'parquet', 'arrow'], help='Output file format')
+    parser.add_argument('--compression', type=str, default=None, help='Parquet/Arrow compression codec')
+    parser.add_argument('--serializer', type=str, default='json', choices=['json', 'msgpack', 'schema'], help='Message payload format')
+    parser.add_argument('--max-records', type=int, default=500, help='Most messages fetched per poll')
+    parser.add_argument('--idle-timeout-ms', type=int, default=5000, help='Stop after no messages arrive for this long')
+    parser.add_argument('--max-messages', type=int, default=None, help='Stop after about this many messages')
+    add_metrics_arguments(parser)
+    consume_args, _ = parser.parse_known_args()
+
+    from .consumer import consume_batches, create_kafka_consumer, open_sink
+    reporter = metrics_from_args(consume_args)
+    consumer = create_kafka_consumer(
+        consume_args.topic, consume_args.bootstrap_servers, group_id=consume_args.group_id,
+        serializer=consume_args.serializer, schema=schema, max_poll_records=consume_args.max_records
+    )
+    try:
+        with open_sink(consume_args.output, consume_args.format, consume_args.compression) as sink:
+            stats = consume_batches(
+                consumer, sink=sink, max_records=consume_args.max_records,
+                idle_timeout_ms=consume_args.idle_timeout_ms, max_messages=consume_args.max_messages,
+                commit=consume_args.group_id is not None
+            )
+        print(f"Consumed {stats.messages} messages in {stats.batches} batches into {consume_args.output}")
+    except KeyboardInterrupt:
+        print("Consuming interrupted by user.")
+    finally:
+        consumer.close()
+        if reporter is not None:
+            reporter.stop()
+
+def send_dataframe_to_kafka(df, producer, topic='team6_topic', key_column=None, **options):
+    """
+    Send data from a DataFrame to a Kafka topic.
+
+    Rows are converted and sent in bulk (see team6_package.export.send_dataframe,
+    which takes the remaining options); delivery failures are logged once, in
+    aggregate. Returns an ExportReport.
+    """
+    from .export import send_dataframe
+    return send_dataframe(df, producer, topic=topic, key_column=key_column, **options)
 
-def send_dataframe_to_kafka(df, producer):
-    """Send data from a DataFrame to a Kafka topic."""
-    for _, row in df.iterrows():
-        data = row.to_dict()
-        try:
-            producer.send("team6_topic", value=data)
-            print(f"Sent data to Kafka: {data}")
-        except Exception as e:
-            print(f"Error sending data to Kafka: {e}")
-    producer.flush()
-
-def export_dataframe_to_kafka(df):
-    """Create a Kafka producer and send data from a DataFrame to a Kafka topic."""
-    producer = create_kafka_producer("kafka:9092")
-    send_dataframe_to_kafka(df, producer)
-    producer.close()
+def export_dataframe_to_kafka(df, bootstrap_servers="kafka:9092", topic='team6_topic', key_column=None,
+                              serializer=None, schema=None, partitioner=None, **options):
+    """
+    Create a Kafka producer and send data from a DataFrame to a Kafka topic.
+
+    Rows are serialized to JSON by pandas a chunk at a time and sent as bytes,
+    or, with a `serializer` (and `schema`, see create_kafka_producer), sent as
+    records for the producer to encode. `partitioner` is the producer's, as in
+    create_kafka_producer. The other options go to send_dataframe_to_kafka;
+    payloads follows from `serializer` and cannot be passed. Returns an ExportReport.
+    """
+    if 'payloads' in options:
+        raise ValueError("export_dataframe_to_kafka picks payloads from serializer; pass serializer instead")
+    producer = create_kafka_producer(bootstrap_servers, linger_ms=5, batch_size=65536, serializer=serializer,
+                                     schema=schema, partitioner=partitioner)
+    try:
+        return send_dataframe_to_kafka(df, producer, topic=topic, key_column=key_column,
+                                       payloads='json' if serializer is None else 'records', **options)
+    finally:
+        producer.close()
 
 def consume_messages_from_kafka(
     auto_offset_reset='earliest',
     enable_auto_commit=True,
-    value_deserializer=lambda v: json.loads(v.decode('utf-8')),
+    value_deserializer=None,
     on_message=None,
-    consumer_timeout_ms=1000
+    consumer_timeout_ms=1000,
+    serializer='json',
+    schema=None,
+    topic='team6_topic',
+    bootstrap_servers='localhost:29092',
+    group_id=None,
+    max_records=500
 ):
     """
     Consumes messages from a Kafka topic and processes them using a callback function.
 
     Parameters:
     - auto_offset_reset (str): Where to start reading messages if no offset is committed.
-    - enable_auto_commit (bool): Whether to auto-commit offsets.
-    - value_deserializer (callable): Function to deserialize message values.
+    - enable_auto_commit (bool): Whether to auto-commit offsets. When False (and a group_id is given),
+      offsets are committed after each batch has been processed.
+    - value_deserializer (callable): Function to deserialize message values. Defaults to the decoder of `serializer`.
     - on_message (callable): Function to process each message. It should accept one argument (the message value).
     - consumer_timeout_ms (int): Stop iteration if no message is received for this number of milliseconds.
+    - serializer (str): Payload format the producer used: 'json', 'msgpack' or 'schema'.
+    - schema (dict): The JSON schema of the messages, required by the 'schema' format.
+    - topic (str): Kafka topic to read.
+    - bootstrap_servers (str): Kafka brokers.
+    - group_id (str): Consumer group; needed for committed offsets.
+    - max_records (int): Most messages fetched per poll.
 
     Returns:
     - messages (list): A list of messages consumed from the topic if no callback is provided.
+
+    Messages are fetched in batches with poll(). For large topics, use
+    team6_package.consumer.consume_batches with a sink instead of collecting a list.
     """
-    logging.info(f"Connecting to Kafka broker at localhost:29092...")
+    from .consumer import consume_batches, create_kafka_consumer
+
+    logging.info(f"Connecting to Kafka broker at {bootstrap_servers}...")
 
-    consumer = KafkaConsumer(
-        'team6_topic',
-        bootstrap_servers='localhost:29092',
+    consumer = create_kafka_consumer(
+        topic,
+        bootstrap_servers,
+        group_id=group_id,
         auto_offset_reset=auto_offset_reset,
         enable_auto_commit=enable_auto_commit,
+        serializer=serializer,
+        schema=schema,
         value_deserializer=value_deserializer,
-        consumer_timeout_ms=consumer_timeout_ms
+        max_poll_records=max_records
     )
 
-    logging.info(f"Connected to Kafka topic team6_topic. Listening for messages...")
+    logging.info(f"Connected to Kafka topic {topic}. Listening for messages...")
 
     messages = []
-    try:
-        for message in consumer:
-            data = message.value
+
+    def handle_batch(values):
+        for data in values:
             if on_message:
                 on_message(data)
             else:
                 messages.append(data)
-            logging.info(f"Received message: {data}")
+            logging.debug("Received message: %s", data)
+        return []
+
+    try:
+        consume_batches(
+            consumer, on_batch=handle_batch, max_records=max_records,
+            poll_timeout_ms=min(consumer_timeout_ms, 1000), idle_timeout_ms=consumer_timeout_ms,
+            commit=not enable_auto_commit and group_id is not None
+        )
     except Exception as e:
         logging.error(f"Error consuming messages: {e}")
     finally:
@@ -323,39 +831,25 @@ def generate_batch_with_time_intervals(schema, num_records, start_time=None, int
     Parameters:
     - schema (dict): The JSON schema defining the data fields and types.
     - num_records (int): Number of records to generate.
-    - start_time (datetime): The starting datetime for the first record. If None, uses current time.
+    - start_time (datetime or str): The starting datetime for the first record. If None, uses current time.
     - interval_seconds (int or float): Number of seconds between each record's datetime.
 
     Returns:
     - data (list): List of generated records with adjusted datetime fields.
-    """
-    data = []
-    if start_time is None:
-        start_time = datetime.now()
-    else:
-        # Ensure start_time is a datetime object
-        if isinstance(start_time, str):
-            start_time = datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
 
-    for i in range(num_records):
-        record = generate_single_record(schema)
-        # Adjust the datetime field
-        adjusted_time = start_time + timedelta(seconds=interval_seconds * i)
-        # Format the datetime as per your requirements
-        formatted_time = adjusted_time.strftime('%Y-%m-%d %H:%M:%S')
-
-        # Find the datetime field in the record and update it
-        for key, value in record.items():
-            if schema[key].lower() == 'datetime':
-                record[key] = formatted_time
-        data.append(record)
-    return data
+    For large series, or jitter, irregular intervals and multiple devices, use
+    team6_package.timeseries.iter_time_series_records, which yields records chunk by chunk.
+    """
+    from .timeseries import iter_time_series_records
+    return list(iter_time_series_records(schema, num_records, start_time=start_time,
+                                         interval_seconds=interval_seconds))
 
 
 def main():
+    logging.basicConfig(level=logging.INFO)
     parser = argparse.ArgumentParser(description="Generate fake data from a JSON schema.")
     parser.add_argument('schema', type=str, help='Path to the JSON schema file')
-    parser.add_argument('-m', '--mode', type=str, choices=['batch', 'stream'], default='batch', help='Mode of operation: batch or stream')
+    parser.add_argument('-m', '--mode', type=str, choices=['batch', 'stream', 'consume'], default='batch', help='Mode of operation: batch, stream or consume')
     args, unknown = parser.parse_known_args()
 
     try:
@@ -365,6 +859,8 @@ def main():
             run_batch_mode(schema)
         elif args.mode == 'stream':
             run_streaming_mode(schema)
+        elif args.mode == 'consume':
+            run_consume_mode(schema)
         else:
             print(f"Unknown mode: {args.mode}")
 
@@ -0,0 +1,865 @@
+"""
+Declarative dependencies between fields.
+
+A field can be an object of `$` directives instead of a type name, so its
+values follow other columns of the same record:
+
+    {"$type": "devices_connected", "$max": "devices_registered"}          a type, bounded by another column
+    {"$expr": "int(mem_total * uniform(0.7, 0.99))", "$lt": "mem_total"}  a derived expression
+    {"$given": "application_type",                                         a conditional distribution
+     "$cases": {"Gaming": {"$expr": "randint(50, 200)"}, "Email": "integer"},
+     "$default": {"$value": 0}}
+    {"$ref": "devices.csv", "$column": "id"}                              a foreign key into another table
+    {"$ref": "devices.csv", "$column": "model", "$by": "device_id"}       more columns of the same parent row
+    {"$value": "v1"}                                                      a constant
+
+Every field takes exactly one of $type, $value, $expr, $given or $ref. $cases
+values are field types or directive objects; case keys are matched against
+str(value). $ref reads a table registered with register_table, or a CSV,
+Parquet or Arrow file (CSV values are strings); $by picks the row whose $key
+column (by default the $column of the $by field's own $ref) holds this
+record's $by value.
+
+Bounds ($min, $max inclusive; $lt, $gt strict) take a number or an expression
+and apply to any field. Values out of bounds are clipped to them, or drawn
+again with "$on_violation": "resample" (at most MAX_RESAMPLES times, then
+clipped). Missing values (None), and bounds that are missing for a row,
+are left alone. $dtype ('int', 'float', 'bool' or 'string') sets the Parquet/Arrow
+column type where it cannot be told from the directives.
+
+Expressions are a small subset of Python: numbers, strings, column names
+(dotted for nested columns, or col("name") for any name), arithmetic,
+comparisons, `x in ("a", "b")`, and/or/not, `a if test else b` and the
+functions in EXPRESSION_FUNCTIONS. Integer powers and repeated strings are
+capped (MAX_INTEGER_BITS, MAX_STRING_LENGTH) and raise ValueError beyond that.
+
+Columns are generated in dependency order (see core.generation_order), and
+every field compiles once into a row-wise generator for the row and nested
+engines and a vectorized one that works on a whole column batch with NumPy.
+"""
+import ast
+import csv
+import math
+import operator
+import os
+import random
+from collections import namedtuple
+from functools import reduce
+
+import numpy as np
+
+from .core import SOURCE_DIRECTIVES, resolve_field
+
+BOUNDS = {'$min': 'min', '$max': 'max', '$lt': 'lt', '$gt': 'gt'}
+DIRECTIVES = set(SOURCE_DIRECTIVES) | set(BOUNDS) | {
+    '$cases', '$default', '$column', '$by', '$key', '$on_violation', '$dtype'}
+MAX_RESAMPLES = 10
+
+# $dtype -> field type with that storage kind (see formats.field_kinds)
+DTYPES = {'int': 'integer', 'float': 'float', 'bool': 'boolean', 'string': 'string'}
+
+# How a field spec resolves the names it references:
+# - resolve(name) -> column, raising ValueError for unknown names
+# - raw(column) -> the schema entry of a column
+# - functions / column_functions: row-wise and vectorized generators for $type
+FieldContext = namedtuple('FieldContext', ['resolve', 'raw', 'functions', 'column_functions', 'strict', 'table_files'])
+
+def _scalar_randint(low, high):
+    return random.randint(int(low), int(high))
+
+def _vector_randint(n, rng, low, high):
+    return rng.integers(np.asarray(low, dtype=np.int64), np.asarray(high, dtype=np.int64) + 1, size=n)
+
+def _scalar_round(value, digits=None):
+    return round(value) if digits is None else round(value, int(digits))
+
+def _vector_round(n, rng, values, digits=None):
+    return np.round(values).astype(np.int64) if digits is None else np.round(values, int(digits))
+
+def _vector_choice(n, rng, *options):
+    picks = rng.integers(0, len(options), size=n)
+    if all(np.ndim(option) == 0 for option in options):
+        return np.array(options)[picks]
+    return np.stack([np.broadcast_to(option, n) for option in options])[picks, np.arange(n)]
+
+# name -> (min args, max args or None, row-wise function, vectorized function(n, rng, *args))
+EXPRESSION_FUNCTIONS = {
+    'uniform': (2, 2, random.uniform, lambda n, rng, low, high: rng.uniform(low, high, size=n)),
+    'randint': (2, 2, _scalar_randint, _vector_randint),  # inclusive, like random.randint
+    'normal': (2, 2, random.gauss, lambda n, rng, mean, sd: rng.normal(mean, sd, size=n)),
+    'chance': (1, 1, lambda p: random.random() < p, lambda n, rng, p: rng.random(n) < p),
+    'choice': (1, None, lambda *options: random.choice(options), _vector_choice),
+    'min': (2, None, min, lambda n, rng, *values: reduce(np.minimum, values)),
+    'max': (2, None, max, lambda n, rng, *values: reduce(np.maximum, values)),
+    'clip': (3, 3, lambda value, low, high: min(max(value, low), high),
+             lambda n, rng, values, low, high: np.clip(values, low, high)),
+    'round': (1, 2, _scalar_round, _vector_round),
+    'int': (1, 1, int, lambda n, rng, values: np.asarray(values).astype(np.int64)),
+    'float': (1, 1, float, lambda n, rng, values: np.asarray(values, dtype=np.float64)),
+    'abs': (1, 1, abs, lambda n, rng, values: np.abs(values)),
+}
+
+# Limits on values an expression builds, so one expression cannot stall generation
+MAX_INTEGER_BITS = 4096  # integer results of **
+MAX_STRING_LENGTH = 65536  # strings repeated with *
+
+def _power(base, exponent):
+    if isinstance(base, np.ndarray) or isinstance(exponent, np.ndarray):
+        base, exponent = np.asarray(base), np.asarray(exponent)
+        if base.dtype.kind in 'iub' and exponent.dtype.kind in 'iub':
+            if np.any(exponent < 0):
+                base = base.astype(np.float64)  # integers to negative powers are floats, as in Python
+            elif np.any(np.abs(base.astype(np.float64)) ** exponent >= 2 ** 63):
+                # Beyond int64: Python ints, with the same limit as the row engine
+                return np.frompyfunc(_power, 2, 1)(base.astype(object), exponent.astype(object))
+        return np.power(base, exponent)
+    if _is_int(base) and _is_int(exponent):
+        base, exponent = int(base), int(exponent)
+        if exponent > 0 and abs(base).bit_length() * exponent > MAX_INTEGER_BITS:
+            raise ValueError(f"Expression result too large: {base} ** {exponent} has more than {MAX_INTEGER_BITS} bits")
+    return operator.pow(base, exponent)
+
+def _multiply(left, right):
+    text, count = (left, right) if isinstance(left, str) else (right, left)
+    if isinstance(text, str) and _is_int(count) and len(text) * int(count) > MAX_STRING_LENGTH:
+        raise ValueError(f"Expression result too large: a string repeated {count} times is longer than "
+                         f"{MAX_STRING_LENGTH} characters")
+    return operator.mul(left, right)
+
+def _divisor_zero(left, right, result):
+    return np.asarray(right) == 0
+
+def _power_undefined(base, exponent, result):
+    # 0 ** -1, and float powers Python cannot represent (OverflowError in the row engine)
+    result = np.asarray(result)
+    undefined = (np.asarray(base) == 0) & (np.asarray(exponent) < 0)
+    if result.dtype.kind == 'f':
+        undefined = undefined | ~np.isfinite(result) & np.isfinite(base) & np.isfinite(exponent)
+    return undefined
+
+def _missing(value, n):
+    """Rows of a scalar or column operand that are missing (None)."""
+    if value is None:
+        return np.ones(n, dtype=bool)
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return ~_present(value)
+    return np.zeros(n, dtype=bool)
+
+def _take(value, keep):
+    """The rows `keep` of a column operand, as a NumPy array of their values; scalars stay as they are."""
+    return _array(value[keep].tolist()) if isinstance(value, np.ndarray) else value
+
+def _generic(value):
+    return isinstance(value, str) or value is None or isinstance(value, np.ndarray) and value.dtype == object
+
+def _operator(function, undefined=None):
+    """
+    A binary operator with the same results in both engines. A missing
+    operand (None) or an undefined result gives None: ZeroDivisionError or
+    OverflowError for Python values, the rows flagged by
+    `undefined(left, right, result)` for NumPy columns. Object arrays (Python
+    ints and strings) and strings with columns are computed value by value,
+    so the limits of _power and _multiply hold for each value.
+    """
+    def scalar(left, right):
+        if left is None or right is None:
+            return None
+        try:
+            return function(left, right)
+        except (ZeroDivisionError, OverflowError):
+            return None
+
+    elementwise = np.frompyfunc(scalar, 2, 1)
+
+    def apply(left, right):
+        if not isinstance(left, np.ndarray) and not isinstance(right, np.ndarray):
+            return scalar(left, right)
+        if _generic(left) or _generic(right):
+            return elementwise(left, right)
+        if undefined is None:
+            return function(left, right)
+        with np.errstate(all='ignore'):
+            result = function(left, right)
+        flagged = np.broadcast_to(undefined(left, right, result), np.shape(result))
+        if not flagged.any():
+            return result
+        result = np.asarray(result).astype(object)
+        result[flagged] = None
+        return result
+
+    return apply
+
+def _ordered(function):
+    """An ordering comparison where a missing value (None) compares False, in both engines."""
+    def scalar(left, right):
+        return False if left is None or right is None else function(left, right)
+
+    elementwise = np.frompyfunc(scalar, 2, 1)
+
+    def apply(left, right):
+        if not isinstance(left, np.ndarray) and not isinstance(right, np.ndarray):
+            return scalar(left, right)
+        if left is None or right is None or any(
+                isinstance(value, np.ndarray) and value.dtype == object for value in (left, right)):
+            return elementwise(left, right).astype(bool)
+        return function(left, right)
+
+    return apply
+
+def _negate(value):
+    if value is None:
+        return None
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        return np.array([None if item is None else -item for item in value], dtype=object)
+    return -value
+
+_BINARY = {
+    ast.Add: _operator(operator.add), ast.Sub: _operator(operator.sub), ast.Mult: _operator(_multiply),
+    ast.Div: _operator(operator.truediv, _divisor_zero), ast.FloorDiv: _operator(operator.floordiv, _divisor_zero),
+    ast.Mod: _operator(operator.mod, _divisor_zero), ast.Pow: _operator(_power, _power_undefined),
+}
+_COMPARE = {
+    ast.Lt: _ordered(operator.lt), ast.LtE: _ordered(operator.le), ast.Gt: _ordered(operator.gt),
+    ast.GtE: _ordered(operator.ge),
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+def _array(values):
+    """A column (list or array) as a NumPy array."""
+    if isinstance(values, np.ndarray):
+        return values
+    array = np.asarray(values)
+    return array if array.dtype.kind != 'U' or len(values) == 0 else np.asarray(values, dtype=object)
+
+def _full(value, n):
+    """An expression result as an array of n values."""
+    if np.ndim(value) == 0:
+        return np.full(n, value, dtype=object if value is None or isinstance(value, str) else None)
+    return _array(value)
+
+def _column_name(node):
+    """The column a Name, dotted Attribute chain or col("...") call refers to, else None."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        parent = _column_name(node.value)
+        return f"{parent}.{node.attr}" if parent is not None and not isinstance(node.value, ast.Call) else None
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'col'
+            and len(node.args) == 1 and not node.keywords
+            and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+        return node.args[0].value
+    return None
+
+def _parse(text):
+    if isinstance(text, bool) or not isinstance(text, (str, int, float)):
+        raise ValueError(f"Expression must be a string or a number, not {text!r}")
+    try:
+        return ast.parse(str(text).strip(), mode='eval').body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression '{text}': {e.msg}") from None
+
+def expression_names(text):
+    """Return the column names an expression reads, in order."""
+    names = []
+
+    def visit(node):
+        name = _column_name(node)
+        if name is not None:
+            names.append(name)
+            return
+        if isinstance(node, ast.Call):
+            # The function name is not a column
+            for child in node.args:
+                visit(child)
+            return
+        for child in ast.iter_child_nodes(node):
+            visit(child)
+
+    visit(_parse(text))
+    return names
+
+class Expression:
+    """
+    A compiled expression. row(record) evaluates it for one record;
+    column(columns, n, rng) evaluates it for a batch of n rows with NumPy.
+    """
+
+    def __init__(self, text, resolve):
+        self.text = str(text)
+        self.columns = []
+        self._resolve = resolve
+        self._evaluate = self._compile(_parse(text))
+        del self._resolve
+
+    def row(self, record):
+        return self._evaluate(record, None)
+
+    def column(self, columns, n, rng):
+        return _full(self._evaluate(columns, (n, rng)), n)
+
+    def _unsupported(self, node):
+        return ValueError(f"Unsupported syntax in expression '{self.text}': {ast.unparse(node)}")
+
+    def _compile(self, node):
+        # Every node compiles to evaluate(env, ctx): ctx is None for one record,
+        # or (n, rng) for a column batch, where env maps columns to arrays
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if not isinstance(value, (int, float, str, bool, type(None))):
+                raise self._unsupported(node)
+            return lambda env, ctx: value
+
+        name = _column_name(node)
+        if name is not None:
+            column = self._resolve(name)
+            self.columns.append(column)
+            return lambda env, ctx: env[column] if ctx is None else _array(env[column])
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+            function = _BINARY[type(node.op)]
+            left, right = self._compile(node.left), self._compile(node.right)
+            return lambda env, ctx: function(left(env, ctx), right(env, ctx))
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self._compile(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda env, ctx: _negate(operand(env, ctx))
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if isinstance(node.op, ast.Not):
+                return lambda env, ctx: (not operand(env, ctx)) if ctx is None else np.logical_not(operand(env, ctx))
+
+        if isinstance(node, ast.BoolOp):
+            values = [self._compile(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            test = all if isinstance(node.op, ast.And) else any
+            # Booleans in both engines, whatever the operands are
+            return lambda env, ctx: (test(value(env, ctx) for value in values) if ctx is None
+                                     else reduce(combine, [np.asarray(value(env, ctx)).astype(bool)
+                                                           for value in values]))
+
+        if isinstance(node, ast.Compare):
+            return self._compile_compare(node)
+
+        if isinstance(node, ast.IfExp):
+            test, body, orelse = self._compile(node.test), self._compile(node.body), self._compile(node.orelse)
+
+            def choose(env, ctx):
+                if ctx is None:
+                    return body(env, ctx) if test(env, ctx) else orelse(env, ctx)
+                return np.where(test(env, ctx), body(env, ctx), orelse(env, ctx))
+            return choose
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            if node.func.id not in EXPRESSION_FUNCTIONS:
+                raise ValueError(f"Unknown function '{node.func.id}' in expression '{self.text}'")
+            least, most, scalar, vector = EXPRESSION_FUNCTIONS[node.func.id]
+            if len(node.args) < least or (most is not None and len(node.args) > most):
+                raise ValueError(f"Wrong number of arguments to {node.func.id}() in expression '{self.text}'")
+            arguments = [self._compile(argument) for argument in node.args]
+
+            def call(env, ctx):
+                # A missing argument (None) gives None, on the rows where it is missing
+                values = [argument(env, ctx) for argument in arguments]
+                if ctx is None:
+                    return None if any(value is None for value in values) else scalar(*values)
+                n, rng = ctx
+                missing = reduce(np.logical_or, [_missing(value, n) for value in values])
+                if not missing.any():
+                    return vector(n, rng, *values)
+                keep = ~missing
+                count = int(keep.sum())
+                result = np.full(n, None, dtype=object)
+                if count:
+                    result[keep] = _full(vector(count, rng, *[_take(value, keep) for value in values]), count).tolist()
+                return result
+            return call
+
+        raise self._unsupported(node)
+
+    def _compile_compare(self, node):
+        left = self._compile(node.left)
+        steps = []
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(comparator, (ast.Tuple, ast.List, ast.Set)) or not all(
+                        isinstance(element, ast.Constant) for element in comparator.elts):
+                    raise ValueError(f"'in' needs a list of constants in expression '{self.text}'")
+                options = [element.value for element in comparator.elts]
+                steps.append((op, options, None))
+            elif type(op) in _COMPARE:
+                steps.append((op, None, self._compile(comparator)))
+            else:
+                raise self._unsupported(node)
+
+        def compare(env, ctx):
+            value = left(env, ctx)
+            result = None
+            for op, options, right in steps:
+                if options is not None:
+                    if ctx is None:
+                        outcome = value in options
+                    else:
+                        outcome = np.isin(value, np.array(options, dtype=object))
+                    outcome = (not outcome if ctx is None else ~outcome) if isinstance(op, ast.NotIn) else outcome
+                    following = value
+                else:
+                    following = right(env, ctx)
+                    outcome = _COMPARE[type(op)](value, following)
+                if result is None:
+                    result = outcome
+                else:
+                    result = (result and outcome) if ctx is None else np.logical_and(result, outcome)
+                value = following
+            return result
+        return compare
+
+class _Masked:
+    """A column batch restricted to the rows selected by `mask`; columns are sliced on first use."""
+
+    def __init__(self, columns, mask):
+        self.columns = columns
+        self.mask = mask
+        self.sliced = {}
+
+    def __getitem__(self, column):
+        if column not in self.sliced:
+            self.sliced[column] = _array(self.columns[column])[self.mask]
+        return self.sliced[column]
+
+def _merge(parts, n):
+    """Combine (mask, values) parts covering all n rows into one array."""
+    arrays = [_array(values) for _, values in parts]
+    try:
+        dtype = np.result_type(*arrays)
+    except TypeError:
+        dtype = object
+    if dtype.kind == 'U':
+        dtype = object
+    result = np.empty(n, dtype=dtype)
+    for (mask, _), values in zip(parts, arrays):
+        result[mask] = values
+    return result
+
+class _Value:
+    def __init__(self, value):
+        if not isinstance(value, (int, float, str, bool, type(None))):
+            raise ValueError(f"$value must be a number, string, boolean or null, not {value!r}")
+        self.value = value
+
+    def row(self, record):
+        return self.value
+
+    def column(self, columns, n, rng):
+        return _full(self.value, n)
+
+class _Type:
+    def __init__(self, column, field_type, context):
+        if not isinstance(field_type, str):
+            raise ValueError(f"$type for column '{column}' must be a field type name")
+        try:
+            self.generator, _ = resolve_field(field_type, (), context.functions, context.strict)
+        except ValueError:
+            raise ValueError(f"Unknown field type '{field_type}' in schema for column '{column}'") from None
+        self.vectorized = (context.column_functions or {}).get(field_type.lower())
+
+    def row(self, record):
+        return self.generator()
+
+    def column(self, columns, n, rng):
+        if self.vectorized is not None:
+            return self.vectorized(n, rng)
+        return [self.generator() for _ in range(n)]
+
+class _Derived:
+    def __init__(self, text, context):
+        self.expression = Expression(text, context.resolve)
+
+    def row(self, record):
+        return self.expression.row(record)
+
+    def column(self, columns, n, rng):
+        return self.expression.column(columns, n, rng)
+
+class _Cases:
+    def __init__(self, column, spec, context):
+        cases = spec.get('$cases')
+        if not isinstance(cases, dict) or not cases:
+            raise ValueError(f"$given for column '{column}' needs a non-empty $cases object")
+        self.given = context.resolve(spec['$given'])
+        self.cases = {str(key): compile_field(f"{column}[{key}]", case, context) for key, case in cases.items()}
+        self.default = compile_field(f"{column}[$default]", spec['$default'], context) if '$default' in spec else None
+
+    def row(self, record):
+        field = self.cases.get(str(record[self.given]), self.default)
+        return None if field is None else field.row(record)
+
+    def column(self, columns, n, rng):
+        keys = _array(columns[self.given])
+        if keys.dtype.kind != 'O':
+            keys = keys.astype(str).astype(object)
+        parts = []
+        covered = np.zeros(n, dtype=bool)
+        for key, field in self.cases.items():
+            mask = keys == key
+            count = int(mask.sum())
+            if count:
+                parts.append((mask, field.column(_Masked(columns, mask), count, rng)))
+                covered |= mask
+        rest = ~covered
+        count = int(rest.sum())
+        if count:
+            if self.default is None:
+                parts.append((rest, np.full(count, None, dtype=object)))
+            else:
+                parts.append((rest, self.default.column(_Masked(columns, rest), count, rng)))
+        return _merge(parts, n)
+
+# $ref tables, {column: list of values}: registered by name, and read from files by path
+_tables = {}
+_files = {}
+
+def register_table(name, table):
+    """
+    Make a table available to $ref under `name`: a dict of column -> values,
+    a list of records, or a pandas DataFrame.
+    """
+    if hasattr(table, 'to_dict') and hasattr(table, 'columns'):
+        table = table.to_dict('list')
+    elif isinstance(table, list):
+        table = {column: [record.get(column) for record in table] for column in (table[0] if table else {})}
+    _tables[name] = {column: list(values) for column, values in table.items()}
+
+def load_table(source, files=True):
+    """Return a $ref table: a registered one, else (when `files` is True) read from a CSV, Parquet or Arrow file."""
+    table = _tables.get(source)
+    if table is None and files:
+        table = _files.get(source)
+    if table is not None:
+        return table
+    if not files or not isinstance(source, str) or not os.path.isfile(source):
+        raise ValueError(f"$ref table '{source}' is not registered" + (" or a readable file" if files else ""))
+    extension = os.path.splitext(source)[1].lower()
+    if extension in ('.parquet', '.arrow', '.feather', '.ipc'):
+        from .formats import _pyarrow
+        _pyarrow()
+        if extension == '.parquet':
+            import pyarrow.parquet as pq
+            table = pq.read_table(source).to_pydict()
+        else:
+            import pyarrow.feather as feather
+            table = feather.read_table(source).to_pydict()
+    else:
+        with open(source, newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                raise ValueError(f"$ref table '{source}' is empty")
+            rows = list(reader)
+        table = {column: [row[index] for row in rows] for index, column in enumerate(header)}
+    _files[source] = table
+    return table
+
+class _Reference:
+    def __init__(self, column, spec, context):
+        source = spec['$ref']
+        table = load_table(source, context.table_files)
+        name = spec.get('$column')
+        if name not in table:
+            raise ValueError(f"$ref for column '{column}' needs a $column of '{source}': {', '.join(table)}")
+        self.values = table[name]
+        if not self.values:
+            raise ValueError(f"$ref table '{source}' has no rows")
+        self.array = _array(self.values)
+        self.by = None
+        if '$by' in spec:
+            self.by = context.resolve(spec['$by'])
+            key = spec.get('$key')
+            if key is None:
+                parent = context.raw(self.by)
+                if isinstance(parent, dict) and parent.get('$ref') == source:
+                    key = parent.get('$column')
+            if key not in table:
+                raise ValueError(f"$by for column '{column}' needs a $key column of '{source}'")
+            self.index = {}
+            for position, value in enumerate(table[key]):
+                self.index.setdefault(value, position)
+
+    def row(self, record):
+        if self.by is None:
+            return self.values[random.randrange(len(self.values))]
+        position = self.index.get(record[self.by])
+        return None if position is None else self.values[position]
+
+    def column(self, columns, n, rng):
+        if self.by is None:
+            return self.array[rng.integers(0, len(self.values), size=n)]
+        keys = columns[self.by]
+        keys = keys.tolist() if isinstance(keys, np.ndarray) else keys
+        positions = np.fromiter((self.index.get(key, -1) for key in keys), dtype=np.int64, count=n)
+        values = self.array[positions]
+        missing = positions < 0
+        if missing.any():
+            values = values.astype(object)
+            values[missing] = None
+        return values
+
+def _is_int(value):
+    return isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_))
+
+def _clip_value(value, limits):
+    """Clip one value to its bounds; integers stay integers."""
+    for kind, bound in limits:
+        if kind == 'min' and value < bound:
+            value = math.ceil(bound) if _is_int(value) else bound
+        elif kind == 'max' and value > bound:
+            value = math.floor(bound) if _is_int(value) else bound
+        elif kind == 'lt' and value >= bound:
+            value = math.ceil(bound) - 1 if _is_int(value) else math.nextafter(bound, -math.inf)
+        elif kind == 'gt' and value <= bound:
+            value = math.floor(bound) + 1 if _is_int(value) else math.nextafter(bound, math.inf)
+    return value
+
+_CHECKS = {'min': operator.ge, 'max': operator.le, 'lt': operator.lt, 'gt': operator.gt}
+
+def _present(values):
+    """Mask of the entries of an object array that are not None."""
+    return np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+
+def _has_missing(values, limits):
+    """True when a column or one of its bounds is an object array, which may hold None."""
+    return values.dtype == object or any(np.asarray(bound).dtype == object for _, bound in limits)
+
+def _within(values, limits):
+    """Rows of a column within its bounds; a missing value or bound (None) counts as within."""
+    inside = np.ones(len(values), dtype=bool)
+    for kind, bound in limits:
+        if _has_missing(values, [(kind, bound)]):
+            bound = np.broadcast_to(np.asarray(bound, dtype=object), values.shape)
+            present = _present(values) & _present(bound)
+            check = np.ones(len(values), dtype=bool)
+            check[present] = _CHECKS[kind](values[present], bound[present]).astype(bool)
+        else:
+            check = _CHECKS[kind](values, bound)
+        inside &= check
+    return inside
+
+def _clip_column(values, limits):
+    """Clip a column to its bounds; integer columns stay integer and missing values (None) are left alone."""
+    if _has_missing(values, limits):
+        result = values.astype(object)
+        for kind, bound in limits:
+            bound = np.broadcast_to(np.asarray(bound, dtype=object), values.shape)
+            present = _present(result) & _present(bound)
+            if present.any():
+                clipped = _clip_column(np.array(result[present].tolist()), [(kind, np.array(bound[present].tolist()))])
+                result[present] = clipped.tolist()
+        return result
+    integer = values.dtype.kind in 'iu'
+    for kind, bound in limits:
+        bound = np.asarray(bound)
+        if kind == 'min':
+            values = np.maximum(values, np.ceil(bound) if integer else bound)
+        elif kind == 'max':
+            values = np.minimum(values, np.floor(bound) if integer else bound)
+        elif kind == 'lt':
+            values = np.minimum(values, np.ceil(bound) - 1 if integer else np.nextafter(bound, -np.inf))
+        else:
+            values = np.maximum(values, np.floor(bound) + 1 if integer else np.nextafter(bound, np.inf))
+    return values.astype(np.int64) if integer else values
+
+class _Bounded:
+    """A field whose values are kept within $min/$max/$lt/$gt bounds; missing values (None) are left alone."""
+
+    def __init__(self, field, bounds, resample):
+        self.field = field
+        self.bounds = bounds  # [(kind, Expression)]
+        self.resample = resample
+
+    def row(self, record):
+        value = self.field.row(record)
+        if value is None:
+            return None
+        limits = [(kind, bound) for kind, bound in ((kind, bound.row(record)) for kind, bound in self.bounds)
+                  if bound is not None]
+        if self.resample:
+            for _ in range(MAX_RESAMPLES):
+                if value is None or all(_CHECKS[kind](value, bound) for kind, bound in limits):
+                    return value
+                value = self.field.row(record)
+        return _clip_value(value, limits) if value is not None else None
+
+    def column(self, columns, n, rng):
+        values = _array(self.field.column(columns, n, rng))
+        limits = [(kind, bound.column(columns, n, rng)) for kind, bound in self.bounds]
+        if self.resample:
+            values = values.copy()
+            for _ in range(MAX_RESAMPLES):
+                outside = ~_within(values, limits)
+                count = int(outside.sum())
+                if not count:
+                    break
+                redrawn = _array(self.field.column(_Masked(columns, outside), count, rng))
+                if redrawn.dtype == object and values.dtype != object:
+                    values = values.astype(object)
+                values[outside] = redrawn
+        return _clip_column(values, limits)
+
+def _check_directives(column, spec):
+    unknown = set(spec) - DIRECTIVES
+    if unknown:
+        raise ValueError(f"Unknown directives {sorted(unknown)} for column '{column}'")
+    sources = [key for key in SOURCE_DIRECTIVES if key in spec]
+    if len(sources) != 1:
+        raise ValueError(f"Column '{column}' needs exactly one of {', '.join(SOURCE_DIRECTIVES)}")
+    if '$cases' in spec and '$given' not in spec or '$default' in spec and '$given' not in spec:
+        raise ValueError(f"$cases and $default for column '{column}' need $given")
+    if any(key in spec for key in ('$column', '$by', '$key')) and '$ref' not in spec:
+        raise ValueError(f"$column, $by and $key for column '{column}' need $ref")
+    if spec.get('$on_violation', 'clip') not in ('clip', 'resample'):
+        raise ValueError(f"$on_violation for column '{column}' must be 'clip' or 'resample'")
+    if '$dtype' in spec and spec['$dtype'] not in DTYPES:
+        raise ValueError(f"$dtype for column '{column}' must be one of {', '.join(DTYPES)}")
+
+def compile_field(column, spec, context):
+    """
+    Compile a field type name or directive object into an object with
+    row(record) -> value and column(columns, n, rng) -> n values.
+    """
+    if isinstance(spec, str):
+        return _Type(column, spec, context)
+    if not isinstance(spec, dict):
+        raise ValueError(f"Unsupported field type for column '{column}': {spec!r}")
+    _check_directives(column, spec)
+    if '$type' in spec:
+        field = _Type(column, spec['$type'], context)
+    elif '$value' in spec:
+        field = _Value(spec['$value'])
+    elif '$expr' in spec:
+        field = _Derived(spec['$expr'], context)
+    elif '$given' in spec:
+        field = _Cases(column, spec, context)
+    else:
+        field = _Reference(column, spec, context)
+    bounds = [(kind, Expression(spec[key], context.resolve)) for key, kind in BOUNDS.items() if key in spec]
+    if bounds:
+        field = _Bounded(field, bounds, spec.get('$on_violation') == 'resample')
+    return field
+
+def spec_names(spec):
+    """Return the column names a field spec reads, as written in the schema."""
+    if not isinstance(spec, dict):
+        return []
+    names = []
+    if '$expr' in spec:
+        names += expression_names(spec['$expr'])
+    if '$given' in spec:
+        if not isinstance(spec['$given'], str):
+            raise ValueError(f"$given must name a column, not {spec['$given']!r}")
+        names.append(spec['$given'])
+    for case in list((spec.get('$cases') or {}).values()) + ([spec['$default']] if '$default' in spec else []):
+        names += spec_names(case)
+    if '$by' in spec:
+        names.append(spec['$by'])
+    for key in BOUNDS:
+        if key in spec:
+            names += expression_names(spec[key])
+    return names
+
+def spec_types(spec):
+    """Return the field type names a field spec generates from ($type and type-name cases)."""
+    if isinstance(spec, str):
+        return [spec]
+    types = [spec['$type']] if isinstance(spec.get('$type'), str) else []
+    for case in list((spec.get('$cases') or {}).values()) + ([spec['$default']] if '$default' in spec else []):
+        types += spec_types(case)
+    return types
+
+def flat_context(schema, functions=None, column_functions=None, strict=False, table_files=True):
+    """The FieldContext of a flat schema, where names are column names."""
+    def resolve(name):
+        if name not in schema:
+            raise ValueError(f"Unknown column '{name}' referenced in schema")
+        return name
+    return FieldContext(resolve, schema.get, functions, column_functions, strict, table_files)
+
+def _expression_type(node, column_type=None):
+    """
+    Best guess at the field type of an expression's values, or None when unknown.
+
+    `column_type(name)` gives the field type of a column the expression reads, or None.
+    """
+    name = _column_name(node)
+    if name is not None:
+        return _kind_type(column_type(name)) if column_type is not None else None
+    if isinstance(node, ast.Constant):
+        return _value_type(node.value)
+    if isinstance(node, (ast.Compare, ast.BoolOp)) or isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return 'boolean'
+    if isinstance(node, ast.UnaryOp):
+        return _expression_type(node.operand, column_type)
+    if isinstance(node, ast.IfExp):
+        return _common_type({_expression_type(node.body, column_type), _expression_type(node.orelse, column_type)})
+    if isinstance(node, ast.BinOp):
+        if isinstance(node.op, ast.Div):
+            return 'float'
+        types = {_expression_type(node.left, column_type), _expression_type(node.right, column_type)}
+        if not types <= {'integer', 'float'}:
+            return None
+        if (isinstance(node.op, ast.Pow) and types == {'integer'}
+                and not (isinstance(node.right, ast.Constant) and node.right.value >= 0)):
+            return 'float'  # a negative exponent gives a float
+        return _common_type(types)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        name = node.func.id
+        if name in ('int', 'randint') or name == 'round' and len(node.args) == 1:
+            return 'integer'
+        if name in ('float', 'uniform', 'normal', 'round'):
+            return 'float'
+        if name == 'chance':
+            return 'boolean'
+        return _common_type({_expression_type(argument, column_type) for argument in node.args})
+    return None
+
+def _common_type(types):
+    """The one field type of a set of expression types (integers widen to floats), or None."""
+    if types == {'integer', 'float'}:
+        return 'float'
+    return types.pop() if len(types) == 1 else None
+
+def _kind_type(field_type):
+    """The expression type (int -> 'integer', ...) of a column's field type, or None unless numeric or boolean."""
+    from .formats import field_kinds
+    kind = field_kinds.get(field_type.lower()) if isinstance(field_type, str) else None
+    return {'int': 'integer', 'float': 'float', 'bool': 'boolean'}.get(kind)
+
+def _value_type(value):
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'float'
+    return 'string'
+
+def storage_type(spec, column_type=None):
+    """
+    The field type that stands for a field spec in flatten_schema, e.g. for Parquet column types.
+
+    `column_type(name)` gives the field type of a column an $expr reads; without
+    it, expressions that read columns are stored as strings.
+    """
+    if isinstance(spec, str):
+        return spec
+    if '$dtype' in spec:
+        return DTYPES[spec['$dtype']]
+    if '$type' in spec:
+        return spec['$type']
+    if '$value' in spec:
+        return _value_type(spec['$value'])
+    if '$expr' in spec:
+        return _expression_type(_parse(spec['$expr']), column_type) or 'string'
+    if '$given' in spec:
+        cases = list(spec.get('$cases', {}).values()) + ([spec['$default']] if '$default' in spec else [])
+        return _common_type({storage_type(case, column_type).lower() for case in cases}) or 'string'
+    return 'string'
@@ -0,0 +1,153 @@
+"""
+Bulk export of pandas DataFrames to Kafka.
+
+Frames are converted a chunk of rows at a time, column-wise by pandas, either
+to records for the producer's value_serializer or straight to JSON payloads
+(DataFrame.to_json, one C pass per chunk) for a producer without one. Sends
+are throttled by a bounded window of in-flight messages, and delivery failures
+are counted by error type and reported once at the end instead of per row.
+"""
+import logging
+import threading
+import time
+from collections import Counter, namedtuple
+
+from . import metrics
+
+DEFAULT_CHUNK_SIZE = 10000
+DEFAULT_MAX_IN_FLIGHT = 10000
+
+ExportReport = namedtuple('ExportReport', ['sent', 'delivered', 'failed', 'errors', 'seconds'])
+ExportReport.__doc__ = "Outcome of an export; errors maps error type names to how many messages failed with them."
+
+class DeliveryWindow:
+    """Caps messages sent but not yet acknowledged at `max_in_flight` and tallies the outcomes."""
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.room = threading.Condition(self.lock)
+        self.waiting = False
+        self.delivered = 0
+        self.errors = Counter()
+        self.first_error = None
+
+    def acquire(self):
+        """Block while the window is full, then take a slot."""
+        with self.lock:
+            while self.in_flight >= self.max_in_flight:
+                self.waiting = True
+                self.room.wait()
+            self.in_flight += 1
+
+    def drain(self, timeout=None):
+        """Wait until every message sent has been acknowledged or failed; False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.lock:
+            while self.in_flight:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.waiting = True
+                self.room.wait(remaining)
+        return True
+
+    def done(self, error):
+        with self.lock:
+            self.in_flight -= 1
+            if error is None:
+                self.delivered += 1
+            else:
+                self.errors[type(error).__name__] += 1
+                if self.first_error is None:
+                    self.first_error = error
+            if self.waiting:
+                self.waiting = False
+                self.room.notify_all()
+
+    def track(self, future):
+        metrics.on_delivery(future, self.done)
+
+def _json_payloads(chunk):
+    """Serialize a chunk of rows to one JSON document (bytes) per row; NaN becomes null."""
+    text = chunk.to_json(orient='records', lines=True, date_format='iso', default_handler=str)
+    return [line.encode('utf-8') for line in text.splitlines()]
+
+def _records(chunk):
+    """Convert a chunk of rows to dictionaries of Python values; NaN becomes None."""
+    if chunk.isna().values.any():
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+    return chunk.to_dict('records')
+
+def _keys(chunk, key_column):
+    if key_column is None:
+        return None
+    return [str(key).encode('utf-8') for key in chunk[key_column].tolist()]
+
+def send_dataframe(df, producer, topic='team6_topic', key_column=None, partitioner=None,
+                   partition_column=None, payloads='records', chunk_size=DEFAULT_CHUNK_SIZE,
+                   max_in_flight=DEFAULT_MAX_IN_FLIGHT, flush=True):
+    """
+    Send every row of a DataFrame to a Kafka topic.
+
+    Parameters:
+    - df (pandas.DataFrame): The rows to send.
+    - producer: A KafkaProducer (see create_kafka_producer) or InMemoryProducer.
+    - topic (str): Kafka topic to send to.
+    - key_column (str): Column whose value (as UTF-8 text) becomes the message key.
+    - partitioner (callable): partitioner(key_bytes, all_partitions, available_partitions) ->
+      partition number, per message; the signature of create_kafka_producer's partitioner, with
+      the topic's partitions from producer.partitions_for. Without it the producer's partitioner
+      (by key hash) is used.
+    - partition_column (str): Column holding the partition number of each row.
+    - payloads (str): 'records' sends dictionaries through the producer's value_serializer;
+      'json' sends pre-serialized JSON bytes, for a producer created with serializer=None.
+    - chunk_size (int): Rows converted at a time.
+    - max_in_flight (int): Most messages sent but not yet acknowledged.
+    - flush (bool): Flush the producer and wait for every acknowledgement before returning.
+
+    Returns:
+    - ExportReport(sent, delivered, failed, errors, seconds). Failures are also logged once, in aggregate.
+    """
+    if payloads not in ('records', 'json'):
+        raise ValueError("payloads must be 'records' or 'json'.")
+    convert = _records if payloads == 'records' else _json_payloads
+    if partitioner is not None and partition_column is None:
+        topic_partitions = sorted(producer.partitions_for(topic))
+    window = DeliveryWindow(max_in_flight)
+    start = time.monotonic()
+    sent = 0
+
+    for offset in range(0, len(df), chunk_size):
+        chunk = df.iloc[offset:offset + chunk_size]
+        values = convert(chunk)
+        keys = _keys(chunk, key_column)
+        partitions = chunk[partition_column].tolist() if partition_column is not None else None
+
+        for i, value in enumerate(values):
+            key = keys[i] if keys is not None else None
+            if partitions is not None:
+                partition = int(partitions[i])
+            elif partitioner is not None:
+                partition = partitioner(key, topic_partitions, topic_partitions)
+            else:
+                partition = None
+            window.acquire()
+            try:
+                future = producer.send(topic, value=value, key=key, partition=partition)
+            except Exception as e:
+                window.done(e)
+            else:
+                window.track(future)
+            sent += 1
+        metrics.record_rows('dataframe_export', len(values))
+
+    if flush:
+        producer.flush()
+        window.drain()
+    failed = sum(window.errors.values())
+    if failed:
+        summary = ', '.join(f"{name}: {count}" for name, count in window.errors.most_common())
+        logging.error(f"{failed} of {sent} messages to '{topic}' failed ({summary}). First error: {window.first_error}")
+    return ExportReport(sent, window.delivered, failed, dict(window.errors), time.monotonic() - start)
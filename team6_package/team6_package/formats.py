@@ -0,0 +1,201 @@
+"""
+Columnar output formats for batch mode: Parquet and Arrow IPC.
+
+Column batches from the columnar engine are converted to Arrow record batches
+and streamed to the file one row group (Parquet) or record batch (Arrow) at a
+time. Column types come from the schema field types. pyarrow is an optional
+dependency: pip install .[parquet]
+"""
+from . import metrics
+from .nested import flatten_schema
+from .parallel import (DEFAULT_CHUNK_SIZE, DEFAULT_SHARD_SIZE, generate_shard_columns, new_seed,
+                       part_file_path, prepare_pools, run_ordered, run_reference_time, shard_ranges)
+
+FORMATS = ['csv', 'parquet', 'arrow']
+COMPRESSION_CODECS = {
+    'parquet': ['none', 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'],
+    'arrow': ['none', 'lz4', 'zstd'],
+}
+DEFAULT_COMPRESSION = {'parquet': 'snappy', 'arrow': 'none'}
+
+# Storage kind of each field type in fake_functions; anything else is stored as a string
+field_kinds = {
+    'boolean': 'bool', 'eci_auto_assign': 'bool', 'is_managed': 'bool',
+
+    'float': 'float', 'cpu_percent': 'float', 'disk_percent': 'float',
+    'link_success_rate_5g': 'float', 'location_latitude': 'float', 'location_longitude': 'float',
+
+    # Generated as formatted strings and parsed to timestamps on write
+    'datetime': 'timestamp_text', 'iso8601': 'timestamp_text', 'install_certification_time': 'timestamp_text',
+    'nullable_datetime': 'timestamp', 'past_datetime': 'timestamp',
+    'manufacturing_date': 'date',
+    'location_tags': 'string_list',
+}
+for _field_type in [
+    'integer', 'int', 'version', 'signal_strength', 'latency', 'required_bandwidth', 'allocated_bandwidth',
+    'resource_allocation', 'tac', 'max_ue', 'aes_integrity_level', 'null_ciphering_level',
+    'snow3g_integrity_level', 'a1', 'a2', 'a5_t1', 'a5_t2', 'hysteresis', 'time_to_trigger',
+    'subframe_assignment', 'special_subframe_pattern', 'location_zoom',
+    'sent_bytes', 'received_bytes', 'mem_used_bytes', 'mem_total', 'disk_total',
+    'machine_sent_bytes', 'machine_received_bytes', 'radio_connected', 'devices_registered',
+    'devices_connected', 'ue_pdn_connections_success', 'ue_pdn_connections_released',
+    'allocate_ip_success_5g', 'release_ip_success_5g',
+]:
+    field_kinds[_field_type] = 'int'
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Arrow output need pyarrow: pip install .[parquet]") from None
+    return pyarrow
+
+def _arrow_types():
+    pa = _pyarrow()
+    return {
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us'),
+        'timestamp_text': pa.timestamp('us'),
+        'date': pa.date32(),
+        'string_list': pa.list_(pa.string()),
+        'string': pa.string(),
+    }
+
+def arrow_schema(schema):
+    """Build the Arrow schema for a JSON schema from its field types."""
+    pa = _pyarrow()
+    types = _arrow_types()
+    return pa.schema([(column, types[field_kinds.get(field_type.lower(), 'string')])
+                      for column, field_type in flatten_schema(schema).items()])
+
+def record_batch_converter(schema):
+    """
+    Return a function converting column batches (lists or NumPy arrays) of
+    `schema` to Arrow record batches.
+    """
+    pa = _pyarrow()
+    target_schema = arrow_schema(schema)
+    text_columns = {column for column, field_type in flatten_schema(schema).items()
+                    if field_kinds.get(field_type.lower()) == 'timestamp_text'}
+
+    def convert(columns):
+        arrays = []
+        for field in target_schema:
+            values = columns[field.name]
+            if field.name in text_columns:
+                arrays.append(pa.array(values, type=pa.string()).cast(field.type))
+            elif field.type == pa.string():
+                try:
+                    arrays.append(pa.array(values, type=field.type))
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # Field specs whose value type is not known up front are written as text
+                    arrays.append(pa.array([None if value is None else str(value) for value in values],
+                                           type=field.type))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=target_schema)
+
+    return convert
+
+class ColumnarWriter:
+    """Write record batches to a Parquet or Arrow IPC file."""
+
+    def __init__(self, output_file, format, target_schema, compression=None):
+        pa = _pyarrow()
+        if format not in COMPRESSION_CODECS:
+            raise ValueError(f"Unknown columnar format '{format}'. Use 'parquet' or 'arrow'.")
+        compression = compression or DEFAULT_COMPRESSION[format]
+        if compression not in COMPRESSION_CODECS[format]:
+            raise ValueError(f"Compression '{compression}' is not supported for {format}. "
+                             f"Choose from: {', '.join(COMPRESSION_CODECS[format])}")
+        codec = None if compression == 'none' else compression
+
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(output_file, target_schema, compression=codec or 'none')
+            self._write = lambda batch: self._writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            import pyarrow.ipc as ipc
+            options = ipc.IpcWriteOptions(compression=codec)
+            self._writer = ipc.new_file(output_file, target_schema, options=options)
+            self._write = self._writer.write_batch
+
+    def write_batch(self, batch):
+        """Write one record batch as a row group (Parquet) or record batch (Arrow)."""
+        self._write(batch)
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _shard_batches(task):
+    """Worker: generate one shard as a list of Arrow record batches."""
+    schema, seed, start, count, chunk_size, pools, reference_time = task
+    convert = record_batch_converter(schema)
+    return [convert(columns)
+            for columns in generate_shard_columns(schema, seed, start, count, chunk_size, False, pools,
+                                                  reference_time)]
+
+def write_shard(writer, schema, seed, start, count, chunk_size=DEFAULT_CHUNK_SIZE, pools=None, reference_time=None):
+    """Write the rows of one shard to a ColumnarWriter, one batch per chunk."""
+    convert = record_batch_converter(schema)
+    for columns in generate_shard_columns(schema, seed, start, count, chunk_size, False, pools, reference_time):
+        writer.write_batch(convert(columns))
+
+def _write_part_file(task):
+    """Worker: generate one shard straight into its own part file."""
+    schema, seed, start, count, chunk_size, pools, reference_time, path, format, compression = task
+    with ColumnarWriter(path, format, arrow_schema(schema), compression) as writer:
+        write_shard(writer, schema, seed, start, count, chunk_size, pools, reference_time)
+    return path
+
+def write_columnar_parallel(schema, num_records, output_file, format='parquet', compression=None,
+                            workers=1, seed=None, shard_size=DEFAULT_SHARD_SIZE, part_files=False,
+                            chunk_size=DEFAULT_CHUNK_SIZE, pools=None, start_index=0, reference_time=None):
+    """
+    Generate `num_records` rows across `workers` processes into a Parquet or Arrow file.
+
+    Each chunk of about `chunk_size` rows becomes one row group / record batch.
+    The seeding matches write_csv_parallel, so both formats hold the same rows
+    for the same seed, `start_index` and `reference_time`. Returns the list of
+    files written.
+    """
+    if num_records <= 0:
+        raise ValueError("No data to save.")
+    reference_time = run_reference_time(seed, reference_time)
+    if seed is None:
+        seed = new_seed()
+    shards = shard_ranges(num_records, shard_size, start_index)
+    prepare_pools(schema, pools, workers)
+
+    if part_files:
+        tasks = [(schema, seed, start, count, chunk_size, pools, reference_time, part_file_path(output_file, index),
+                  format, compression)
+                 for index, start, count in shards]
+        files = []
+        for (_, _, count), path in zip(shards, run_ordered(_write_part_file, tasks, workers)):
+            metrics.record_rows('batch', count)
+            files.append(path)
+        metrics.record_files(format, files)
+        return files
+
+    with ColumnarWriter(output_file, format, arrow_schema(schema), compression) as writer:
+        if workers <= 1:
+            for _, start, count in shards:
+                write_shard(writer, schema, seed, start, count, chunk_size, pools, reference_time)
+                metrics.record_rows('batch', count)
+        else:
+            tasks = [(schema, seed, start, count, chunk_size, pools, reference_time) for _, start, count in shards]
+            for (_, _, count), batches in zip(shards, run_ordered(_shard_batches, tasks, workers)):
+                for batch in batches:
+                    writer.write_batch(batch)
+                metrics.record_rows('batch', count)
+    metrics.record_files(format, [output_file])
+    return [output_file]
@@ -0,0 +1,335 @@
+"""
+Generation metrics: counters, gauges and histograms, with pluggable sinks.
+
+Metrics are off by default. Instrumented code asks for the active registry
+with `active()` once per batch (or once per call) and skips all bookkeeping
+when it is None, so disabled metrics cost one check per batch and no per-record
+work. Turn them on with `enable()`:
+
+    from team6_package import metrics
+
+    registry = metrics.enable()
+    reporter = metrics.PeriodicReporter(registry, [metrics.LogSink()], interval=10)
+    reporter.start()
+    ...
+    reporter.stop()
+    print(metrics.prometheus_text(registry))
+
+Metric names used by the package:
+    rows_generated_total{mode}            rows produced by batch, stream, time-series and backend generation
+    bytes_written_total{sink}             bytes written to CSV/Parquet/Arrow files and download responses
+    field_generation_seconds{field}       time spent generating one batch of one column (any engine)
+    serialize_seconds{format}             time to encode one Kafka message
+    messages_sent_total                   messages handed to the producer
+    send_errors_total                     messages the producer failed to deliver
+    send_latency_seconds                  time from send() until the producer acknowledged the message
+    producer_queue_depth                  messages sent but not yet acknowledged
+    messages_consumed_total               messages read by consume_messages_from_kafka
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+FIELD_SECONDS_HELP = 'Time to generate one batch of one column'
+# Rows the row engines add up before reporting field_generation_seconds, so one
+# observation is one batch of a column, as in the columnar engine
+FIELD_TIMER_ROWS = 1000
+
+_registry = None
+
+def enable(registry=None):
+    """Turn metrics on, using `registry` or a new Registry, and return it."""
+    global _registry
+    _registry = registry if registry is not None else Registry()
+    return _registry
+
+def disable():
+    """Turn metrics off."""
+    global _registry
+    _registry = None
+
+def active():
+    """Return the active Registry, or None when metrics are disabled."""
+    return _registry
+
+def record_rows(mode, count):
+    """Add `count` to rows_generated_total{mode} when metrics are enabled."""
+    if _registry is not None:
+        _registry.counter('rows_generated_total', 'Rows generated', mode=mode).inc(count)
+
+def record_bytes(sink, count):
+    """Add `count` to bytes_written_total{sink} when metrics are enabled."""
+    if _registry is not None:
+        _registry.counter('bytes_written_total', 'Bytes of output written', sink=sink).inc(count)
+
+def record_files(sink, paths):
+    """Add the sizes of the files written to bytes_written_total{sink} when metrics are enabled."""
+    if _registry is not None:
+        record_bytes(sink, sum(os.path.getsize(path) for path in paths))
+
+class Counter:
+    """Value that only goes up."""
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+    kind = 'gauge'
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+class Histogram:
+    """Count and sum of observations, with counts per upper bound bucket."""
+    kind = 'histogram'
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.sum,
+                'buckets': dict(zip([*self.buckets, float('inf')], self.counts))}
+
+class FieldTimer:
+    """
+    Adds up the time the row engines spend on each field and reports it to
+    field_generation_seconds{field} every `rows` rows and on flush().
+    `fields` holds one column name per timed step; None is not reported.
+    """
+
+    def __init__(self, registry, fields, rows=FIELD_TIMER_ROWS):
+        self.histograms = [None if field is None else
+                           registry.histogram('field_generation_seconds', FIELD_SECONDS_HELP, field=field)
+                           for field in fields]
+        self.seconds = [0.0] * len(fields)
+        self.rows = rows
+        self.pending = 0
+
+    def row_done(self):
+        self.pending += 1
+        if self.pending >= self.rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        for histogram, seconds in zip(self.histograms, self.seconds):
+            if histogram is not None:
+                histogram.observe(seconds)
+        self.seconds = [0.0] * len(self.seconds)
+        self.pending = 0
+
+class Registry:
+    """
+    Holds every metric by name and labels.
+
+    registry.counter('rows_generated_total', mode='batch') returns the same
+    Counter for the same name and labels on every call.
+    """
+
+    def __init__(self):
+        self.metrics = {}  # (name, labels) -> metric
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, *args):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(key)
+                if metric is None:
+                    metric = self.metrics[key] = cls(*args)
+                    if help:
+                        self.help.setdefault(name, help)
+        return metric
+
+    def counter(self, name, help='', **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help='', **labels):
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name, help='', buckets=LATENCY_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def snapshot(self):
+        """Return {'name{label="value"}': value or histogram dict} for every metric."""
+        return {format_key(name, labels): metric.snapshot()
+                for (name, labels), metric in list(self.metrics.items())}
+
+def escape_label_value(value):
+    """Escape a label value for the Prometheus text format: backslash, double quote and newline."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{label}="{escape_label_value(value)}"' for label, value in labels) + '}'
+
+def prometheus_text(registry):
+    """Render the registry in the Prometheus text exposition format."""
+    families = {}
+    for (name, labels), metric in sorted(registry.metrics.items(), key=lambda item: item[0]):
+        families.setdefault(name, []).append((labels, metric))
+
+    lines = []
+    for name, members in families.items():
+        if name in registry.help:
+            lines.append(f"# HELP {name} {registry.help[name]}")
+        lines.append(f"# TYPE {name} {members[0][1].kind}")
+        for labels, metric in members:
+            if metric.kind != 'histogram':
+                lines.append(f"{format_key(name, labels)} {metric.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric.buckets, float('inf')], metric.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{format_key(name + '_bucket', labels + (('le', le),))} {cumulative}")
+            lines.append(f"{format_key(name + '_sum', labels)} {metric.sum}")
+            lines.append(f"{format_key(name + '_count', labels)} {metric.count}")
+    return '\n'.join(lines) + '\n'
+
+def on_delivery(future, callback):
+    """Call callback(error) when a producer future completes; error is None on success."""
+    if hasattr(future, 'add_callback'):
+        # kafka-python FutureRecordMetadata
+        future.add_callback(lambda _: callback(None))
+        future.add_errback(callback)
+    else:
+        future.add_done_callback(lambda done: callback(done.exception()))
+
+class SendTracker:
+    """
+    Records messages sent through a producer: messages_sent_total,
+    producer_queue_depth, send_errors_total and send_latency_seconds.
+
+    Call sending(count) once per batch of sends, then track(future, start)
+    for each message, with start = time.perf_counter() taken before send().
+    """
+
+    def __init__(self, registry):
+        self.sent = registry.counter('messages_sent_total', 'Messages handed to the producer')
+        self.depth = registry.gauge('producer_queue_depth', 'Messages sent but not yet acknowledged')
+        self.errors = registry.counter('send_errors_total', 'Messages the producer failed to deliver')
+        self.latency = registry.histogram('send_latency_seconds', 'Time from send() to acknowledgement')
+
+    def sending(self, count):
+        self.sent.inc(count)
+        self.depth.inc(count)
+
+    def track(self, future, start):
+        def delivered(error):
+            self.depth.dec()
+            if error is not None:
+                self.errors.inc()
+            else:
+                self.latency.observe(time.perf_counter() - start)
+        on_delivery(future, delivered)
+
+def timed_serializer(registry, name, encode):
+    """Wrap a serializer's encode function to record serialize_seconds{format=name}."""
+    histogram = registry.histogram('serialize_seconds', 'Time to encode one Kafka message', format=name)
+
+    def encode_timed(value):
+        start = time.perf_counter()
+        payload = encode(value)
+        histogram.observe(time.perf_counter() - start)
+        return payload
+    return encode_timed
+
+class InMemorySink:
+    """Keeps the last `keep` snapshots in `snapshots` as (timestamp, snapshot) pairs."""
+
+    def __init__(self, keep=100):
+        self.keep = keep
+        self.snapshots = []
+
+    def emit(self, snapshot):
+        self.snapshots.append((time.time(), snapshot))
+        del self.snapshots[:-self.keep]
+
+class LogSink:
+    """Logs a one-line summary per metric: counter values with their rate since the last summary, histogram means."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('team6_package.metrics')
+        self.level = level
+        self.previous = {}
+        self.previous_time = time.monotonic()
+
+    def emit(self, snapshot):
+        now = time.monotonic()
+        elapsed = max(now - self.previous_time, 1e-9)
+        parts = []
+        for key, value in sorted(snapshot.items()):
+            if isinstance(value, dict):
+                if value['count']:
+                    parts.append(f"{key} n={value['count']:,} mean={value['sum'] / value['count'] * 1000:.3f}ms")
+            else:
+                rate = (value - self.previous.get(key, 0)) / elapsed
+                parts.append(f"{key}={value:,} ({rate:,.0f}/s)")
+        self.previous = {key: value for key, value in snapshot.items() if not isinstance(value, dict)}
+        self.previous_time = now
+        if parts:
+            self.logger.log(self.level, "metrics: " + ", ".join(parts))
+
+class PeriodicReporter:
+    """Pushes a registry snapshot to every sink each `interval` seconds from a daemon thread, and once on stop()."""
+
+    def __init__(self, registry, sinks, interval=10.0):
+        self.registry = registry
+        self.sinks = sinks
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def report(self):
+        snapshot = self.registry.snapshot()
+        for sink in self.sinks:
+            sink.emit(snapshot)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.report()
@@ -0,0 +1,332 @@
+"""
+Nested schemas: fields can be dicts of fields or lists of items.
+
+    {"employee": {"name": "name", "department": {"name": "word"}}}
+    {"tags": ["word"]}                                  list of 1 to 3 words
+    {"devices": [{"id": "uuid", "model": "object_model"}]}
+    {"devices": {"$list": {"id": "uuid"}, "$length": {"distribution": "poisson", "mean": 2, "max": 5}}}
+
+A nested schema is validated and compiled once into a flat list of operations,
+so generating a record is a single loop with no recursion. Records come out
+flat, keyed by dotted column names ('employee.department.name', 'devices.0.id'),
+with the same columns on every row: lists get a column per item up to their
+maximum length, left empty (None) past the length drawn for the row. That fixed
+header lets nested records stream straight into CSV.
+
+List lengths ($length) can be:
+    {"distribution": "uniform", "min": 1, "max": 3}     (the default)
+    {"distribution": "fixed", "value": 2}
+    {"distribution": "poisson", "mean": 2, "max": 5}    capped at max
+
+Lists get a column per possible item when the schema is compiled, so list
+lengths are capped at MAX_LIST_LENGTH and a flattened schema at MAX_COLUMNS
+columns; larger schemas raise ValueError before any row is generated.
+
+Fields given by directives (see team6_package.dependencies) read their
+siblings by key and other columns by full dotted name. Siblings are generated
+in dependency order; columns elsewhere in the schema must come earlier.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+
+from . import metrics
+from .core import ROW, SOURCE_COLUMNS, generation_order, is_field_spec, resolve_field
+
+DEFAULT_LENGTH = {"distribution": "uniform", "min": 1, "max": 3}
+
+# Limits on the columns a schema expands to, so one schema cannot exhaust memory while compiling
+MAX_LIST_LENGTH = 1000
+MAX_COLUMNS = 100000
+
+# Operation kinds
+VALUE = 0   # generate a value into a column
+LENGTH = 1  # draw the length of a list into a slot
+
+# `reordered` is True when ops generate columns in another order than `columns`
+NestedPlan = namedtuple('NestedPlan', ['columns', 'types', 'ops', 'slots', 'reordered'])
+
+def is_nested(schema):
+    """Return True if any field of the schema is a dict or list rather than a type name or field spec."""
+    return any(not isinstance(field_type, str) and not is_field_spec(field_type) for field_type in schema.values())
+
+def _poisson(mean, cap):
+    """Knuth's method; fine for the small means used for list lengths."""
+    limit = math.exp(-mean)
+    count = 0
+    product = random.random()
+    while product > limit:
+        count += 1
+        product *= random.random()
+    return min(count, cap)
+
+def length_sampler(spec, column):
+    """Return (sampler, max_length) for a $length spec, validating it."""
+    if not isinstance(spec, dict):
+        raise ValueError(f"$length for column '{column}' must be an object")
+    distribution = spec.get("distribution", "uniform")
+
+    def integer(key, default=None):
+        value = spec.get(key, default)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"$length '{key}' for column '{column}' must be a non-negative integer")
+        if value > MAX_LIST_LENGTH:
+            raise ValueError(f"$length '{key}' for column '{column}' must be at most {MAX_LIST_LENGTH}")
+        return value
+
+    if distribution == "fixed":
+        length = integer("value")
+        return (lambda: length), length
+    if distribution == "uniform":
+        low, high = integer("min", 1), integer("max", 3)
+        if low > high:
+            raise ValueError(f"$length min is greater than max for column '{column}'")
+        return (lambda: random.randint(low, high)), high
+    if distribution == "poisson":
+        mean = spec.get("mean")
+        if not isinstance(mean, (int, float)) or mean < 0:
+            raise ValueError(f"$length 'mean' for column '{column}' must be a non-negative number")
+        cap = integer("max")
+        return (lambda: _poisson(mean, cap)), cap
+    raise ValueError(f"Unknown $length distribution '{distribution}' for column '{column}'")
+
+def compile_nested(schema, functions=None, strict=False, table_files=True):
+    """
+    Validate a (possibly nested) schema and compile it into a NestedPlan.
+
+    `functions` and `strict` are passed to resolve_field: with `strict`,
+    unknown field types raise ValueError instead of generating words.
+    `table_files` lets $ref read tables from files. All errors are raised
+    here, never while generating rows.
+    """
+    columns = []
+    types = []
+    ops = []
+    slot_count = 0
+    compiled = {}  # column -> schema entry, for fields that read other columns
+    stored = {}  # column -> field type in flatten_schema, for the storage types of field specs
+    reordered = False
+
+    def add_column(column):
+        if len(columns) >= MAX_COLUMNS:
+            raise ValueError(f"Schema expands to more than {MAX_COLUMNS} columns (at '{column}'); "
+                             f"use shorter lists")
+        columns.append(column)
+
+    def compile_leaf(column, field_type, seen, guard):
+        try:
+            generator, source = resolve_field(field_type, seen, functions, strict)
+        except ValueError:
+            raise ValueError(f"Unknown field type '{field_type}' in schema for column '{column}'") from None
+        ops.append((VALUE, column, generator, guard, seen[source] if source else None))
+        add_column(column)
+        types.append(field_type)
+        compiled[column] = stored[column] = field_type
+
+    def compile_spec(column, spec, prefix, guard):
+        from .dependencies import FieldContext, compile_field, storage_type
+
+        def resolve(name):
+            # A sibling (or a column inside one) first, then a full dotted name
+            for candidate in (f"{prefix}.{name}" if prefix else name, name):
+                if candidate in compiled:
+                    return candidate
+            raise ValueError(f"Column '{column}' references unknown column '{name}'; "
+                             f"columns outside its record must come earlier in the schema")
+
+        context = FieldContext(resolve, compiled.get, functions, None, strict, table_files)
+        ops.append((VALUE, column, compile_field(column, spec, context).row, guard, ROW))
+        add_column(column)
+        types.append(storage_type(spec, lambda name: stored.get(resolve(name))))
+        compiled[column] = spec
+        stored[column] = types[-1]
+
+    def sibling_dependencies(node, siblings):
+        if isinstance(node, str):
+            source = SOURCE_COLUMNS.get(node.lower())
+            return [source] if source in siblings else []
+        if isinstance(node, list) and len(node) == 1:
+            node = node[0]
+        elif isinstance(node, dict) and '$list' in node:
+            node = node['$list']
+        if not is_field_spec(node):
+            return []
+        from .dependencies import spec_names
+        return [key for key in (name.split('.')[0] for name in spec_names(node)) if key in siblings]
+
+    def compile_record(prefix, record, guard):
+        nonlocal reordered
+        siblings = {}  # key -> column, for fields that read a sibling
+        for key in record:
+            if key.startswith('$'):
+                raise ValueError(f"Unknown directive '{key}' in schema at '{prefix or '<root>'}'")
+            siblings[key] = f"{prefix}.{key}" if prefix else key
+        keys = list(record)
+        order = generation_order(keys, {key: sibling_dependencies(record[key], siblings) for key in keys})
+        begin = len(columns)
+        segments = {}
+        for key in order:
+            column, node = siblings[key], record[key]
+            start = len(columns)
+            if isinstance(node, str):
+                compile_leaf(column, node, siblings, guard)
+            elif is_field_spec(node):
+                compile_spec(column, node, prefix, guard)
+            else:
+                compile_node(column, node, guard)
+            segments[key] = (columns[start:], types[start:])
+        if order != keys:
+            # Generated in dependency order, but listed in schema order
+            reordered = True
+            columns[begin:] = [column for key in keys for column in segments[key][0]]
+            types[begin:] = [field_type for key in keys for field_type in segments[key][1]]
+
+    def compile_list(prefix, item, length_spec, guard):
+        nonlocal slot_count
+        sampler, max_length = length_sampler(length_spec, prefix)
+        slot = slot_count
+        slot_count += 1
+        ops.append((LENGTH, slot, sampler, guard, None))
+        for index in range(max_length):
+            compile_node(f"{prefix}.{index}", item, (slot, index))
+
+    def compile_node(column, node, guard):
+        if isinstance(node, str):
+            compile_leaf(column, node, {}, guard)
+        elif is_field_spec(node):
+            # A list item: names are relative to the record holding the list
+            compile_spec(column, node, column.rsplit('.', 2)[0] if column.count('.') > 1 else '', guard)
+        elif isinstance(node, dict) and '$list' in node:
+            extra = set(node) - {'$list', '$length'}
+            if extra:
+                raise ValueError(f"Unexpected keys {sorted(extra)} next to $list for column '{column}'")
+            compile_list(column, node['$list'], node.get('$length', DEFAULT_LENGTH), guard)
+        elif isinstance(node, dict):
+            if not node:
+                raise ValueError(f"Empty nested schema for column '{column}'")
+            compile_record(column, node, guard)
+        elif isinstance(node, list):
+            if len(node) != 1:
+                raise ValueError(f"List schema for column '{column}' must hold exactly one item schema")
+            compile_list(column, node[0], DEFAULT_LENGTH, guard)
+        else:
+            raise ValueError(f"Unsupported field type for column '{column}': {node!r}")
+
+    if not isinstance(schema, dict) or not schema:
+        raise ValueError("Schema must be a non-empty JSON object")
+    compile_record('', schema, None)
+    return NestedPlan(columns, types, ops, slot_count, reordered)
+
+def flatten_schema(schema):
+    """
+    Return the flat {dotted column: field type} mapping of a schema, in column
+    order. Field specs map to the field type of their values (see
+    dependencies.storage_type).
+    """
+    if not is_nested(schema):
+        if all(isinstance(field_type, str) for field_type in schema.values()):
+            return dict(schema)
+        from .dependencies import storage_type
+        types = {}
+
+        def column_type(name):
+            if name not in types and name in schema:
+                types[name] = None  # a reference cycle, which compile_schema rejects, stays unknown
+                types[name] = storage_type(schema[name], column_type)
+            return types.get(name)
+
+        return {column: column_type(column) for column in schema}
+    plan = compile_nested(schema)
+    return dict(zip(plan.columns, plan.types))
+
+def field_types(schema):
+    """Return every field type name a schema uses, including those inside lists and field specs."""
+    types = set()
+
+    def visit(node):
+        if isinstance(node, str):
+            types.add(node.lower())
+        elif is_field_spec(node):
+            from .dependencies import spec_types
+            types.update(field_type.lower() for field_type in spec_types(node))
+        elif isinstance(node, dict):
+            for key, child in node.items():
+                if key != '$length':
+                    visit(child)
+        elif isinstance(node, list):
+            for child in node:
+                visit(child)
+
+    visit(schema)
+    return types
+
+def run_nested_plan(plan, timer=None):
+    """
+    Generate one flat record from a NestedPlan. With `timer` (a
+    metrics.FieldTimer from field_timer) the time of each column is added up.
+    """
+    lengths = [0] * plan.slots
+    row = dict.fromkeys(plan.columns) if plan.reordered else {}
+    if timer is not None:
+        return _run_nested_plan_timed(plan, lengths, row, timer)
+    for kind, target, generator, guard, source in plan.ops:
+        if guard is not None and lengths[guard[0]] <= guard[1]:
+            # Inside a list item past this row's length: the column stays empty
+            if kind == VALUE:
+                row[target] = None
+            continue
+        if kind == VALUE:
+            if source is None:
+                row[target] = generator()
+            elif source is ROW:
+                row[target] = generator(row)
+            else:
+                row[target] = generator(row[source])
+        else:
+            lengths[target] = generator()
+    return row
+
+def _run_nested_plan_timed(plan, lengths, row, timer):
+    seconds = timer.seconds
+    for index, (kind, target, generator, guard, source) in enumerate(plan.ops):
+        if guard is not None and lengths[guard[0]] <= guard[1]:
+            if kind == VALUE:
+                row[target] = None
+            continue
+        if kind == VALUE:
+            start = time.perf_counter()
+            if source is None:
+                row[target] = generator()
+            elif source is ROW:
+                row[target] = generator(row)
+            else:
+                row[target] = generator(row[source])
+            seconds[index] += time.perf_counter() - start
+        else:
+            lengths[target] = generator()
+    timer.row_done()
+    return row
+
+def field_timer(plan, registry):
+    """A metrics.FieldTimer for the value columns of a NestedPlan (list lengths are not reported)."""
+    return metrics.FieldTimer(registry, [target if kind == VALUE else None for kind, target, _, _, _ in plan.ops])
+
+def iter_nested_records(plan, num_records):
+    """Lazily yield `num_records` flat records from a NestedPlan."""
+    registry = metrics.active()
+    if registry is None:
+        for _ in range(num_records):
+            yield run_nested_plan(plan)
+        return
+    timer = field_timer(plan, registry)
+    try:
+        for _ in range(num_records):
+            yield run_nested_plan(plan, timer)
+    finally:
+        timer.flush()
+
+def generate_nested_columns(plan, num_records):
+    """Generate `num_records` flat records as a column batch, like generate_columns."""
+    rows = list(iter_nested_records(plan, num_records))
+    return {column: [row[column] for row in rows] for column in plan.columns}
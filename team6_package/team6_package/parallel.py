@@ -0,0 +1,342 @@
+"""
+Sharded, multi-process batch generation with seekable, seeded output.
+
+Rows are generated in fixed blocks of BLOCK_SIZE rows aligned to the absolute
+row index. Each block seeds its own `random`, Faker and NumPy streams from
+(seed, block index), so record i is a function of (seed, schema, i) alone:
+any range of rows can be regenerated on its own, an interrupted run can be
+resumed at the last row written, and the output for a seed does not depend on
+the number of workers, the shard size or the chunk size. Time-relative types
+(datetime, iso8601, ...) are generated against one reference time per run
+(see run_reference_time), never the wall clock of the moment.
+"""
+import csv
+import io
+import json
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from . import core, metrics
+from .columnar import columns_to_records, compile_columns, run_column_plan
+from .nested import compile_nested, flatten_schema, generate_nested_columns, is_nested
+
+DEFAULT_SHARD_SIZE = 100000
+DEFAULT_CHUNK_SIZE = 10000
+
+# Rows per seeded block. Changing it changes the rows generated for every seed.
+BLOCK_SIZE = 1024
+
+# `random` and Faker are process-wide; blocks are seeded and generated under this
+# lock so that threads generating at the same time do not interleave their streams
+generation_lock = threading.RLock()
+
+def shard_ranges(num_records, shard_size=DEFAULT_SHARD_SIZE, start_index=0):
+    """Return (index, start, count) for each shard covering rows start_index .. start_index + num_records - 1."""
+    return [(index, start_index + start, min(shard_size, num_records - start))
+            for index, start in enumerate(range(0, num_records, shard_size))]
+
+@contextmanager
+def seed_shard(seed, index):
+    """
+    Seed `random` and Faker for stream `index` of `seed` for the duration of
+    the block and yield its NumPy generator. The streams are restored
+    afterwards (see core.isolated_seed), so unseeded generation later in the
+    process does not replay the seeded streams.
+    """
+    sequence = np.random.SeedSequence([seed, index])
+    python_seed = int(sequence.generate_state(1, np.uint64)[0])
+    with core.isolated_seed(python_seed):
+        yield np.random.default_rng(sequence)
+
+def run_reference_time(seed, reference_time=None):
+    """
+    Return the reference time pinned for a whole run: `reference_time` when
+    given, core.SEEDED_REFERENCE_TIME for a seeded run, else the wall clock
+    at the start of the run.
+    """
+    if reference_time is not None:
+        return core.parse_reference_time(reference_time)
+    if seed is not None:
+        return core.SEEDED_REFERENCE_TIME
+    return datetime.now().replace(microsecond=0)
+
+def new_seed():
+    """Draw a fresh seed for runs that did not ask for one."""
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0])
+
+def _concat_columns(batches):
+    """Join column batches row-wise; NumPy columns stay arrays, everything else becomes a list."""
+    if len(batches) == 1:
+        return batches[0]
+    joined = {}
+    for column, first in batches[0].items():
+        parts = [batch[column] for batch in batches]
+        if isinstance(first, np.ndarray):
+            joined[column] = np.concatenate(parts)
+        else:
+            joined[column] = [value for part in parts for value in part]
+    return joined
+
+def generate_range_columns(schema, seed, start_index, count, chunk_size=DEFAULT_CHUNK_SIZE,
+                           to_python=True, pools=None, reference_time=None, overrides=None):
+    """
+    Yield the column batches of rows start_index .. start_index + count - 1 for `seed`.
+
+    Whole blocks are generated and the rows outside the range dropped, so a
+    range costs at most two blocks more than its own rows. Batches hold about
+    `chunk_size` rows, rounded to whole blocks. Time-relative types are
+    generated against `reference_time` (default core.SEEDED_REFERENCE_TIME).
+    `overrides` (flat schemas only) maps columns to (n, rng) generators
+    called once per block, in row order (see columnar.compile_columns).
+    """
+    if count <= 0:
+        return
+    if reference_time is None:
+        reference_time = core.SEEDED_REFERENCE_TIME
+    if pools is not None:
+        # Fill pools before seeding, so rows are the same whichever process filled them
+        pools.fill(schema)
+    if is_nested(schema):
+        # Nested schemas are generated row-wise into flat dotted columns
+        functions = pools.row_functions() if pools is not None else None
+        plan = compile_nested(schema, functions)
+        generate_block = lambda rng: generate_nested_columns(plan, BLOCK_SIZE)
+    else:
+        plan = compile_columns(schema, pools, overrides)
+        generate_block = lambda rng: run_column_plan(plan, BLOCK_SIZE, rng, to_python)
+
+    stop_index = start_index + count
+    pending = []
+    pending_rows = 0
+    for block in range(start_index // BLOCK_SIZE, (stop_index - 1) // BLOCK_SIZE + 1):
+        with generation_lock, core.pinned_time(reference_time), seed_shard(seed, block) as rng:
+            columns = generate_block(rng)
+        offset = block * BLOCK_SIZE
+        low = max(start_index - offset, 0)
+        high = min(stop_index - offset, BLOCK_SIZE)
+        if low or high < BLOCK_SIZE:
+            columns = {column: values[low:high] for column, values in columns.items()}
+        pending.append(columns)
+        pending_rows += high - low
+        if pending_rows >= chunk_size:
+            yield _concat_columns(pending)
+            pending = []
+            pending_rows = 0
+    if pending:
+        yield _concat_columns(pending)
+
+def generate_range(schema, seed, start_index, count, pools=None, reference_time=None):
+    """Return rows start_index .. start_index + count - 1 for `seed` as row dictionaries."""
+    records = []
+    for columns in generate_range_columns(schema, seed, start_index, count, pools=pools,
+                                          reference_time=reference_time):
+        records.extend(columns_to_records(columns))
+    return records
+
+def iter_range_records(schema, seed, start_index, count, chunk_size=DEFAULT_CHUNK_SIZE, pools=None,
+                       reference_time=None):
+    """Lazily yield rows start_index .. start_index + count - 1 for `seed` as row dictionaries."""
+    for columns in generate_range_columns(schema, seed, start_index, count, chunk_size, pools=pools,
+                                          reference_time=reference_time):
+        yield from columns_to_records(columns)
+
+def generate_shard_columns(schema, seed, start, count, chunk_size=DEFAULT_CHUNK_SIZE, to_python=True, pools=None,
+                           reference_time=None):
+    """Yield the column batches of the shard of `count` rows starting at row `start`."""
+    return generate_range_columns(schema, seed, start, count, chunk_size, to_python, pools, reference_time)
+
+def write_shard(file, schema, seed, start, count, chunk_size=DEFAULT_CHUNK_SIZE, pools=None, reference_time=None):
+    """Write the rows of one shard to an open file as CSV, flushing after every chunk."""
+    writer = csv.writer(file)
+    for columns in generate_shard_columns(schema, seed, start, count, chunk_size, pools=pools,
+                                          reference_time=reference_time):
+        writer.writerows(zip(*columns.values()))
+        file.flush()
+
+def render_shard(task):
+    """Worker: generate one shard and return it as CSV text without a header."""
+    schema, seed, start, count, chunk_size, pools, reference_time = task
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for columns in generate_shard_columns(schema, seed, start, count, chunk_size, pools=pools,
+                                          reference_time=reference_time):
+        writer.writerows(zip(*columns.values()))
+    return buffer.getvalue()
+
+def _write_part_file(task):
+    """Worker: generate one shard straight into its own part file with a header."""
+    schema, seed, start, count, chunk_size, pools, reference_time, path = task
+    with open(path, 'w', newline='', buffering=core.WRITE_BUFFER_SIZE) as file:
+        csv.writer(file).writerow(flatten_schema(schema))
+        write_shard(file, schema, seed, start, count, chunk_size, pools, reference_time)
+    return path
+
+def _shard_records(task):
+    """Worker: generate one shard and return it as row dictionaries."""
+    schema, seed, start, count, chunk_size, pools, reference_time = task
+    records = []
+    for columns in generate_shard_columns(schema, seed, start, count, chunk_size, pools=pools,
+                                          reference_time=reference_time):
+        records.extend(columns_to_records(columns))
+    return records
+
+def run_ordered(function, tasks, workers):
+    """
+    Yield function(task) for every task, in task order.
+
+    With one worker the shards run in this process. Otherwise at most
+    2 * workers shards are in flight, which bounds the results waiting
+    to be consumed.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # Only multi-process runs pay for multiprocessing
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(function, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def part_file_path(output_file, index):
+    """Return the part file name for shard `index`, e.g. data.part-00003.csv."""
+    base, extension = os.path.splitext(output_file)
+    return f"{base}.part-{index:05d}{extension or '.csv'}"
+
+def prepare_pools(schema, pools, workers):
+    """Fill pools on disk once before workers start, so each worker maps them instead of refilling."""
+    if pools is not None and pools.directory and workers > 1:
+        pools.fill(schema)
+
+def checkpoint_path(output_file):
+    """Return the file recording the progress of a resumable run, e.g. data.csv.checkpoint."""
+    return f"{output_file}.checkpoint"
+
+def load_checkpoint(output_file):
+    """Return the saved progress of a resumable run into `output_file`, or None when there is none."""
+    path = checkpoint_path(output_file)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+def save_checkpoint(output_file, state):
+    """Atomically replace the progress of a resumable run."""
+    path = checkpoint_path(output_file)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(state, file)
+    os.replace(path + '.tmp', path)
+
+def _resume_state(output_file, seed, start_index, num_records, reference_time):
+    """
+    Return (seed, reference time, rows already written) for a resumable run,
+    truncating `output_file` to the last row the checkpoint recorded as written.
+    """
+    state = load_checkpoint(output_file)
+    if state is None or not os.path.exists(output_file):
+        return seed, reference_time, 0
+    if seed is not None and seed != state['seed']:
+        raise ValueError(f"{output_file} was started with seed {state['seed']}, not {seed}.")
+    recorded_time = core.parse_reference_time(state.get('reference_time', reference_time))
+    if reference_time is not None and core.parse_reference_time(reference_time) != recorded_time:
+        raise ValueError(f"{output_file} was started with reference time {state['reference_time']}.")
+    if state['start_index'] != start_index or state['num_records'] != num_records:
+        raise ValueError(f"{output_file} was started with start_index={state['start_index']}, "
+                         f"num_records={state['num_records']}; resume it with the same values.")
+    with open(output_file, 'r+b') as file:
+        file.truncate(state['bytes'])  # Drop a partly written chunk
+    return state['seed'], recorded_time, state['rows']
+
+def write_csv_parallel(schema, num_records, output_file, workers=1, seed=None,
+                       shard_size=DEFAULT_SHARD_SIZE, part_files=False, chunk_size=DEFAULT_CHUNK_SIZE,
+                       pools=None, start_index=0, resume=False, reference_time=None):
+    """
+    Generate `num_records` rows across `workers` processes and write them as CSV.
+
+    Shards are appended to `output_file` in order, or written to one part file
+    per shard when `part_files` is True. Rows are generated and flushed
+    `chunk_size` at a time. Slow Faker types are sampled from `pools` when
+    given. The rows written are rows start_index .. start_index + num_records - 1
+    of the seed's output. Time-relative types follow `reference_time` (see
+    run_reference_time).
+
+    With `resume`, progress is saved to a checkpoint file after every shard and
+    a run that finds a checkpoint continues after the last row it recorded,
+    with the seed and reference time it recorded; the checkpoint is removed
+    once the file is complete. Returns the list of files written.
+    """
+    if num_records <= 0:
+        raise ValueError("No data to save.")
+    if resume and part_files:
+        raise ValueError("resume is only supported when writing a single file.")
+    done = 0
+    if resume:
+        seed, reference_time, done = _resume_state(output_file, seed, start_index, num_records, reference_time)
+    reference_time = run_reference_time(seed, reference_time)
+    if seed is None:
+        seed = new_seed()
+    shards = shard_ranges(num_records - done, shard_size, start_index + done)
+    prepare_pools(schema, pools, workers)
+
+    if part_files:
+        tasks = [(schema, seed, start, count, chunk_size, pools, reference_time, part_file_path(output_file, index))
+                 for index, start, count in shards]
+        files = []
+        for (_, _, count), path in zip(shards, run_ordered(_write_part_file, tasks, workers)):
+            metrics.record_rows('batch', count)
+            files.append(path)
+        metrics.record_files('csv', files)
+        return files
+
+    def shard_written(file, count):
+        nonlocal done
+        done += count
+        metrics.record_rows('batch', count)
+        if resume:
+            file.flush()
+            save_checkpoint(output_file, {'seed': seed, 'start_index': start_index, 'num_records': num_records,
+                                          'reference_time': reference_time.isoformat(sep=' '),
+                                          'rows': done, 'bytes': os.fstat(file.fileno()).st_size})
+
+    with open(output_file, 'a' if done else 'w', newline='', buffering=core.WRITE_BUFFER_SIZE) as file:
+        if not done:
+            csv.writer(file).writerow(flatten_schema(schema))
+        if workers <= 1:
+            # Single process: stream chunks straight to the file, no shard text in memory
+            for _, start, count in shards:
+                write_shard(file, schema, seed, start, count, chunk_size, pools, reference_time)
+                shard_written(file, count)
+        else:
+            tasks = [(schema, seed, start, count, chunk_size, pools, reference_time) for _, start, count in shards]
+            for (_, _, count), text in zip(shards, run_ordered(render_shard, tasks, workers)):
+                file.write(text)
+                shard_written(file, count)
+    if resume and os.path.exists(checkpoint_path(output_file)):
+        os.remove(checkpoint_path(output_file))
+    metrics.record_files('csv', [output_file])
+    return [output_file]
+
+def generate_records_parallel(schema, num_records, workers=1, seed=None,
+                              shard_size=DEFAULT_SHARD_SIZE, chunk_size=DEFAULT_CHUNK_SIZE, pools=None,
+                              start_index=0, reference_time=None):
+    """Generate rows start_index .. start_index + num_records - 1 of `seed` as dictionaries across `workers` processes."""
+    reference_time = run_reference_time(seed, reference_time)
+    if seed is None:
+        seed = new_seed()
+    prepare_pools(schema, pools, workers)
+    tasks = [(schema, seed, start, count, chunk_size, pools, reference_time)
+             for _, start, count in shard_ranges(num_records, shard_size, start_index)]
+    data = []
+    for records in run_ordered(_shard_records, tasks, workers):
+        data.extend(records)
+    return data
@@ -0,0 +1,181 @@
+"""
+Pre-generated value pools for slow Faker providers.
+
+fake.name(), fake.address(), fake.sentence() and friends are far slower than
+the numeric generators. A ValuePools object fills one pool per field type with
+`size` values, once per process, and generation then samples from it with a
+cheap index draw. Pools can be saved under `directory` as .npy files and are
+memory-mapped from there on later runs (and by other worker processes).
+
+Each pooled field type has a mode:
+- 'pool':   sample from the pool; fast, values repeat across rows
+- 'unique': exact-unique values drawn from os.urandom (uuid and id only, the
+            default for them without a seed); not reproducible
+- 'faker':  call the Faker function for every value, as without pools (the
+            default for uuid and id when the pools are seeded)
+
+Pools are filled from their own seed with the shared `random` and Faker
+streams restored afterwards, so filling a pool (even lazily, mid-run) never
+changes the values of other columns.
+"""
+import os
+import random
+import uuid
+
+import numpy as np
+
+from . import core
+
+DEFAULT_POOL_SIZE = 10000
+
+# Field types that are pooled by default, and their default mode
+pool_modes = {
+    'name': 'pool',
+    'email': 'pool',
+    'address': 'pool',
+    'phone': 'pool',
+    'word': 'pool',
+    'ip': 'pool',
+    'status_message': 'pool',
+    'location_name': 'pool',
+    'object_description': 'pool',
+    'serial_number': 'pool',
+    'signature': 'pool',
+    'cert': 'pool',
+    'ipsec_key': 'pool',
+    'uuid': 'unique',
+    'id': 'unique',
+}
+
+# Default mode of the unique types for seeded pools, so a seeded run repeats exactly
+SEEDED_UNIQUE_MODE = 'faker'
+
+UNIQUE_TYPES = ('uuid', 'id')
+
+# Pools filled or loaded in this process, by (field_type, size, seed)
+_pool_cache = {}
+
+# NumPy dtype of a pool, by the Python type of its values. Pools of other
+# values (None, datetimes, lists, ...) cannot be saved and memory-mapped as .npy
+POOL_DTYPES = {str: str, int: np.int64, float: np.float64, bool: np.bool_}
+
+def pool_array(field_type, values):
+    """Return the values of a pool as a NumPy array of their own kind (see POOL_DTYPES)."""
+    kinds = {type(value) for value in values}
+    if len(kinds) == 1 and next(iter(kinds)) in POOL_DTYPES:
+        return np.array(values, dtype=POOL_DTYPES[next(iter(kinds))])
+    if not kinds:
+        return np.array(values, dtype=str)
+    names = ', '.join(sorted(kind.__name__ for kind in kinds))
+    raise ValueError(f"Cannot pool '{field_type}': pools hold values of one type (str, int, float or bool), "
+                     f"not {names}")
+
+def unique_uuids(n):
+    """n distinct random UUID4 strings from os.urandom."""
+    data = os.urandom(16 * n)
+    return [str(uuid.UUID(bytes=data[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+
+class ValuePools:
+    """
+    Pool settings for a generation run.
+
+    Parameters:
+    - size (int): Default number of values per pool.
+    - settings (dict): Per-type overrides, e.g. {"name": {"size": 50000}, "uuid": {"mode": "pool"}}.
+    - directory (str): Where pools are saved and memory-mapped from. None keeps them in memory only.
+    - seed (int): Seed for filling pools, so the same seed gives the same pools. Pass the
+      seed of the run: with a seed, uuid and id default to 'faker' instead of 'unique'
+      so seeded runs are reproducible. None fills pools from seed 0.
+
+    Only settings are stored on the object, so it can be passed to worker
+    processes; each process fills (or maps) a pool the first time it is used.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, settings=None, directory=None, seed=None):
+        self.size = size
+        self.settings = settings or {}
+        self.directory = directory
+        self.seeded = seed is not None
+        self.seed = seed if seed is not None else 0
+        for field_type, setting in self.settings.items():
+            if setting.get('mode') == 'unique' and field_type not in UNIQUE_TYPES:
+                raise ValueError(f"Only {', '.join(UNIQUE_TYPES)} support mode 'unique', not '{field_type}'")
+
+    def mode(self, field_type):
+        default = pool_modes.get(field_type, 'faker')
+        if default == 'unique' and self.seeded:
+            default = SEEDED_UNIQUE_MODE
+        return self.settings.get(field_type, {}).get('mode', default)
+
+    def pool_size(self, field_type):
+        return self.settings.get(field_type, {}).get('size', self.size)
+
+    def path(self, field_type):
+        return os.path.join(self.directory, f"{field_type}-{self.pool_size(field_type)}-{self.seed}.npy")
+
+    def get(self, field_type):
+        """Return the pool for a field type as a NumPy array, filling or mapping it on first use."""
+        key = (field_type, self.pool_size(field_type), self.seed)
+        if key not in _pool_cache:
+            _pool_cache[key] = self._load_or_fill(field_type)
+        return _pool_cache[key]
+
+    def _load_or_fill(self, field_type):
+        if self.directory and os.path.exists(self.path(field_type)):
+            return np.load(self.path(field_type), mmap_mode='r')
+
+        # Fill from a fixed seed so the pool does not depend on what ran before
+        pool_seed = int(np.random.SeedSequence([self.seed, *field_type.encode()]).generate_state(1)[0])
+        generator = core.fake_functions[field_type]
+        with core.isolated_seed(pool_seed):
+            pool = pool_array(field_type, [generator() for _ in range(self.pool_size(field_type))])
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write then rename, so concurrent processes never map a partial file
+            temporary = f"{self.path(field_type)}.{os.getpid()}.tmp.npy"
+            np.save(temporary, pool)
+            os.replace(temporary, self.path(field_type))
+            return np.load(self.path(field_type), mmap_mode='r')
+        return pool
+
+    def fill(self, schema):
+        """Fill (or map) the pools for every pooled field type of a schema up front."""
+        from .nested import field_types
+        for field_type in field_types(schema):
+            if self.mode(field_type) == 'pool':
+                self.get(field_type)
+
+    def row_functions(self):
+        """Return fake_functions with pooled and unique types replaced by their fast versions."""
+        functions = dict(core.fake_functions)
+        for field_type in pool_modes.keys() | self.settings.keys():
+            mode = self.mode(field_type)
+            if mode == 'unique':
+                functions[field_type] = lambda: unique_uuids(1)[0]
+            elif mode == 'pool':
+                functions[field_type] = self._row_sampler(field_type)
+        return functions
+
+    def _row_sampler(self, field_type):
+        def sample():
+            pool = self.get(field_type)
+            return pool[random.randrange(len(pool))].item()
+        return sample
+
+    def column_functions(self):
+        """Return (n, rng) generators for the pooled and unique types, for the columnar engine."""
+        functions = {}
+        for field_type in pool_modes.keys() | self.settings.keys():
+            mode = self.mode(field_type)
+            if mode == 'unique':
+                functions[field_type] = lambda n, rng: unique_uuids(n)
+            elif mode == 'pool':
+                functions[field_type] = self._column_sampler(field_type)
+        return functions
+
+    def _column_sampler(self, field_type):
+        def sample(n, rng):
+            pool = self.get(field_type)
+            return pool[rng.integers(0, len(pool), size=n)]
+        return sample
@@ -0,0 +1,121 @@
+"""
+Serializers for Kafka message payloads.
+
+Each registered format provides an `encode` (record -> bytes) and a `decode`
+(bytes -> record) function. All of them handle the datetime and date values
+produced by fields such as nullable_datetime and manufacturing_date.
+
+- json:    JSON text, using orjson when it is installed.
+- msgpack: MessagePack, with datetimes and dates as extension types.
+- schema:  MessagePack array with the field order fixed by the schema, so
+           field names are never written into messages.
+"""
+import json
+import struct
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from .nested import flatten_schema
+
+Serializer = namedtuple('Serializer', ['name', 'encode', 'decode'])
+
+EPOCH = datetime(1970, 1, 1)
+
+def _to_microseconds(value):
+    delta = value.replace(tzinfo=None) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+def _from_microseconds(value):
+    return EPOCH + timedelta(microseconds=value)
+
+def _json_default(value):
+    """Encode the values json cannot handle natively."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def json_serializer(schema=None):
+    try:
+        import orjson
+    except ImportError:
+        return Serializer(
+            'json',
+            lambda v: json.dumps(v, default=_json_default).encode('utf-8'),
+            lambda b: json.loads(b.decode('utf-8'))
+        )
+    # orjson encodes datetime and date itself, in the same ISO 8601 form as isoformat()
+    return Serializer(
+        'json',
+        lambda v: orjson.dumps(v, default=_json_default),
+        orjson.loads
+    )
+
+MSGPACK_DATETIME = 1
+MSGPACK_DATE = 2
+
+def msgpack_serializer(schema=None):
+    import msgpack
+
+    def default(value):
+        if isinstance(value, datetime):
+            return msgpack.ExtType(MSGPACK_DATETIME, struct.pack('>q', _to_microseconds(value)))
+        if isinstance(value, date):
+            return msgpack.ExtType(MSGPACK_DATE, struct.pack('>i', value.toordinal()))
+        if isinstance(value, Decimal):
+            return float(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+    def ext_hook(code, data):
+        if code == MSGPACK_DATETIME:
+            return _from_microseconds(struct.unpack('>q', data)[0])
+        if code == MSGPACK_DATE:
+            return date.fromordinal(struct.unpack('>i', data)[0])
+        return msgpack.ExtType(code, data)
+
+    return Serializer(
+        'msgpack',
+        lambda v: msgpack.packb(v, default=default),
+        lambda b: msgpack.unpackb(b, ext_hook=ext_hook)
+    )
+
+def schema_serializer(schema):
+    """
+    Compact encoding for records of `schema`.
+
+    The values are packed as a MessagePack array in schema column order (the
+    dotted columns of flatten_schema for nested schemas), so field names are
+    never written into messages; decoding zips them back with the columns.
+    """
+    if not schema:
+        raise ValueError("The schema serializer needs the schema of the records.")
+    columns = list(flatten_schema(schema))
+    packer = msgpack_serializer()
+
+    def encode(record):
+        get = record.get
+        return packer.encode([get(column) for column in columns])
+
+    def decode(data):
+        return dict(zip(columns, packer.decode(data)))
+
+    return Serializer('schema', encode, decode)
+
+# Serializer factories by name; each takes the loaded schema (or None)
+serializer_factories = {
+    'json': json_serializer,
+    'msgpack': msgpack_serializer,
+    'schema': schema_serializer,
+}
+
+def register_serializer(name, factory):
+    """Register a serializer factory: a function of the schema returning a Serializer."""
+    serializer_factories[name] = factory
+
+def get_serializer(name='json', schema=None):
+    """Return the Serializer registered under `name`, built for `schema`."""
+    if name not in serializer_factories:
+        raise ValueError(f"Unknown serializer '{name}'. Choose from: {', '.join(serializer_factories)}")
+    return serializer_factories[name](schema)
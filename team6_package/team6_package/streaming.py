@@ -0,0 +1,181 @@
+"""
+Rate-controlled streaming of generated records to Kafka.
+
+Records are generated in batches with the columnar engine and sent as fast as
+a token bucket allows, so throughput follows a target rate in msgs/sec instead
+of being capped by a fixed sleep after every message. A batch can take minutes
+to send at a low rate, so datetime fields are stamped with the current time
+when each slice of the batch is sent, not when the batch was generated.
+"""
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from . import core, metrics
+from .columnar import columns_to_records, compile_columns, run_column_plan
+from .nested import compile_nested, is_nested, iter_nested_records
+from .timeseries import time_columns
+
+class TokenBucket:
+    """
+    Token bucket pacing sends to `rate` tokens per second.
+
+    `capacity` bounds the burst after an idle period; by default it holds a
+    tenth of a second worth of tokens.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate / 10)
+        self.tokens = 1.0  # The first send goes out immediately
+        self.clock = clock
+        self.sleep = sleep
+        self.last = clock()
+
+    def take(self, wanted):
+        """Block until at least one token is available, then take up to `wanted` tokens."""
+        while True:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                granted = min(wanted, int(self.tokens))
+                self.tokens -= granted
+                return granted
+            self.sleep((1 - self.tokens) / self.rate)
+
+# Every in-memory send is delivered at once; callbacks added to a completed future run immediately
+_DELIVERED = Future()
+_DELIVERED.set_result(None)
+
+class InMemoryProducer:
+    """
+    In-process stand-in for KafkaProducer, for running the streaming engine without a broker.
+
+    Values go through `value_serializer` like they would with Kafka. Sent
+    messages are kept in `messages` as (topic, key, value) when `keep` is True.
+    Every topic has `partitions` partitions.
+    """
+
+    def __init__(self, value_serializer=None, keep=True, partitions=1):
+        self.value_serializer = value_serializer
+        self.keep = keep
+        self.partitions = partitions
+        self.messages = []
+        self.sent = 0
+        self.bytes_sent = 0
+        self.closed = False
+
+    def send(self, topic, value=None, key=None, partition=None):
+        if self.value_serializer is not None:
+            value = self.value_serializer(value)
+        self.sent += 1
+        if isinstance(value, (bytes, bytearray)):
+            self.bytes_sent += len(value)
+        if self.keep:
+            self.messages.append((topic, key, value))
+        return _DELIVERED
+
+    def partitions_for(self, topic):
+        return set(range(self.partitions))
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        self.closed = True
+
+def stream_records(producer, topic, schema, rate=None, duration=60.0, batch_size=1000,
+                   verbose=False, stats_interval=5.0, pools=None):
+    """
+    Send generated records to `topic` for `duration` seconds.
+
+    Parameters:
+    - producer: A KafkaProducer (or InMemoryProducer).
+    - topic (str): Kafka topic to send data to.
+    - schema (dict): The JSON schema defining the data fields and types.
+    - rate (float): Target messages per second. None sends as fast as possible.
+    - duration (float): Total duration to send data in seconds.
+    - batch_size (int): Records pre-generated per batch.
+    - verbose (bool): Print every sent record.
+    - stats_interval (float): Seconds between stats lines. 0 disables them.
+    - pools (ValuePools): Sample slow Faker types from pre-generated pools.
+
+    Returns:
+    - sent (int): Number of messages sent.
+    """
+    if is_nested(schema):
+        plan = compile_nested(schema, pools.row_functions() if pools is not None else None)
+        generate_batch = lambda: list(iter_nested_records(plan, batch_size))
+    else:
+        plan = compile_columns(schema, pools)
+        rng = np.random.default_rng()
+        generate_batch = lambda: columns_to_records(run_column_plan(plan, batch_size, rng))
+
+    timed = time_columns(schema)
+    bucket = TokenBucket(rate) if rate else None
+    registry = metrics.active()  # None when metrics are disabled; checked once per batch of sends
+    tracker = metrics.SendTracker(registry) if registry is not None else None
+    start = time.monotonic()
+    end_time = start + duration
+    next_stats = start + stats_interval
+    batch = []
+    position = 0
+    sent = 0
+
+    while True:
+        now = time.monotonic()
+        if now >= end_time:
+            break
+        if stats_interval and now >= next_stats:
+            print(format_stats(sent, now - start, rate))
+            next_stats = now + stats_interval
+
+        if position == len(batch):
+            batch = generate_batch()
+            position = 0
+            metrics.record_rows('stream', len(batch))
+
+        count = bucket.take(len(batch) - position) if bucket else len(batch) - position
+        records = batch[position:position + count]
+        if timed:
+            stamp_send_time(records, timed)
+        if registry is None:
+            for record in records:
+                producer.send(topic, value=record)
+                if verbose:
+                    print(f"Sent data: {record}")
+        else:
+            tracker.sending(count)
+            for record in records:
+                start_send = time.perf_counter()
+                tracker.track(producer.send(topic, value=record), start_send)
+                if verbose:
+                    print(f"Sent data: {record}")
+        position += count
+        sent += count
+
+    producer.flush()
+    if stats_interval:
+        print(format_stats(sent, time.monotonic() - start, rate))
+    return sent
+
+def stamp_send_time(records, columns):
+    """Set the datetime `columns` of records about to be sent to the current time; empty (None) values stay empty."""
+    stamp = core.current_time().strftime('%Y-%m-%d %H:%M:%S')
+    for record in records:
+        for column in columns:
+            if record[column] is not None:
+                record[column] = stamp
+
+def format_stats(sent, elapsed, rate):
+    """Format a stats line with the achieved rate and, for a target rate, the backlog."""
+    achieved = sent / elapsed if elapsed > 0 else 0.0
+    line = f"[stream] sent={sent} rate={achieved:,.0f} msgs/sec"
+    if rate:
+        backlog = max(0, int(rate * elapsed) - sent)
+        line += f" target={rate:,.0f} msgs/sec backlog={backlog}"
+    return line
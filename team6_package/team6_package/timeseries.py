@@ -0,0 +1,240 @@
+"""
+Time-series generation: rows whose datetime fields follow a simulated clock.
+
+The datetime columns of the schema are found once. The clock is computed as a
+NumPy datetime64 range per chunk (optionally with irregular, exponentially
+distributed gaps and per-row jitter) and formatted as text in a single
+vectorized pass. The other columns come from the seeded blocks of
+team6_package.parallel, so with a seed neither the timestamps nor the other
+columns depend on the batch size. In a flat schema the clock columns are
+generated with the others, so expressions can read them. With `devices` > 1,
+every clock tick emits one row per device, interleaved; the rows of a tick
+share its timestamp, before jitter, which is drawn for every row.
+"""
+import csv
+from datetime import datetime
+
+import numpy as np
+
+from . import core, metrics
+from .columnar import columns_to_records
+from .nested import flatten_schema, is_nested
+from .parallel import DEFAULT_CHUNK_SIZE, generate_range_columns, new_seed, run_reference_time
+
+TIME_TYPES = ('datetime',)
+TIME_FORMAT_LENGTH = 19  # len('YYYY-MM-DD HH:MM:SS')
+
+def parse_start_time(start_time):
+    """Return start_time as a datetime; None means now, strings are ISO 8601 ('2024-01-01 00:00:00')."""
+    if start_time is None:
+        return datetime.now().replace(microsecond=0)
+    if isinstance(start_time, str):
+        return datetime.fromisoformat(start_time)
+    return start_time
+
+def time_columns(schema):
+    """Return the columns that follow the simulated clock; dotted paths for a nested schema."""
+    if is_nested(schema):
+        schema = flatten_schema(schema)
+    return [column for column, field_type in schema.items() if isinstance(field_type, str) and field_type.lower() in TIME_TYPES]
+
+def format_timestamps(timestamps):
+    """
+    Format a datetime64 array as '%Y-%m-%d %H:%M:%S' strings.
+
+    np.datetime_as_string gives 'YYYY-MM-DDTHH:MM:SS'; the 'T' is replaced in
+    place through a character view instead of formatting every value.
+    """
+    text = np.datetime_as_string(timestamps, unit='s')
+    if text.dtype.itemsize // 4 != TIME_FORMAT_LENGTH:
+        # Years outside 0000-9999: fall back to strftime
+        return np.array([value.strftime('%Y-%m-%d %H:%M:%S') for value in timestamps.astype(datetime)])
+    text.view(np.uint32).reshape(len(text), TIME_FORMAT_LENGTH)[:, 10] = ord(' ')
+    return text
+
+class Clock:
+    """
+    Simulated clock handing out the timestamps of consecutive rows, chunk by chunk.
+
+    Parameters:
+    - start_time (datetime or str): Timestamp of the first tick. None uses the current time.
+    - interval_seconds (float): Seconds between ticks (the mean gap when `irregular`).
+    - jitter_seconds (float): Each row's timestamp is moved by up to this many seconds either way.
+    - irregular (bool): Draw the gaps between ticks from an exponential distribution.
+    - devices (int): Rows per tick; consecutive rows are devices 0..devices-1 at the same tick.
+    - rng (numpy.random.Generator): Source of the gaps and jitter.
+    """
+
+    def __init__(self, start_time=None, interval_seconds=1, jitter_seconds=0, irregular=False,
+                 devices=1, rng=None):
+        if interval_seconds < 0 or jitter_seconds < 0:
+            raise ValueError("interval_seconds and jitter_seconds must not be negative.")
+        if devices < 1:
+            raise ValueError("devices must be at least 1.")
+        self.start = np.datetime64(parse_start_time(start_time), 'us')
+        self.interval = interval_seconds
+        self.jitter = jitter_seconds
+        self.irregular = irregular
+        self.devices = devices
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Jitter has its own stream, so the timestamps do not depend on the chunk sizes asked for
+        self.jitter_rng = np.random.default_rng(self.rng.integers(2 ** 63))
+        self.position = 0  # index of the next row
+        self._tick = -1  # last tick handed out, and its offset in seconds
+        self._offset = 0.0
+
+    def _tick_offsets(self, first, last):
+        """Offsets in seconds of ticks first..last; `first` is the last tick handed out or the next one."""
+        if not self.irregular:
+            return np.arange(first, last + 1) * float(self.interval)
+        gaps = self.rng.exponential(self.interval, size=last - self._tick)
+        if self._tick < 0:
+            gaps[0] = 0.0  # the first tick is at start_time
+        offsets = self._offset + np.cumsum(gaps)
+        if first == self._tick:
+            offsets = np.concatenate([[self._offset], offsets])
+        self._tick, self._offset = last, offsets[-1]
+        return offsets
+
+    def next(self, num_records):
+        """Return (timestamps, device_indexes) for the next `num_records` rows."""
+        rows = self.position + np.arange(num_records)
+        ticks, device_indexes = np.divmod(rows, self.devices)
+        first, last = int(ticks[0]), int(ticks[-1])
+        seconds = self._tick_offsets(first, last)[ticks - first]
+        if self.jitter:
+            seconds = seconds + self.jitter_rng.uniform(-self.jitter, self.jitter, size=num_records)
+        self.position += num_records
+        return self.start + np.round(seconds * 1e6).astype('timedelta64[us]'), device_indexes
+
+def device_ids(device_indexes):
+    """Device ID strings (device-0001, ...) for an array of device indexes."""
+    return np.char.add('device-', np.char.zfill((device_indexes + 1).astype(str), 4))
+
+def clock_generators(clock, columns):
+    """
+    (n, rng) generators for the clock columns of a flat schema, for
+    generate_range_columns. The first of them called for a block takes the
+    block's timestamps from the clock; the others repeat them.
+    """
+    state = {'served': set(columns), 'text': None}
+
+    def generator(column):
+        def clock_column(n, rng):
+            if column in state['served']:
+                timestamps, _ = clock.next(n)
+                state['text'], state['served'] = format_timestamps(timestamps), set()
+            state['served'].add(column)
+            return state['text']
+        return clock_column
+
+    return {column: generator(column) for column in columns}
+
+def _column_batches(schema, num_records, batch_size, seed, pools, to_python, reference_time, overrides=None):
+    """Yield (columns, count) for the rows of a schema in batches of at most `batch_size`, from seeded blocks."""
+    if not schema:
+        for start in range(0, num_records, batch_size):
+            yield {}, min(batch_size, num_records - start)
+        return
+    for columns in generate_range_columns(schema, seed, 0, num_records, batch_size, to_python, pools, reference_time,
+                                          overrides):
+        rows = len(next(iter(columns.values())))
+        for low in range(0, rows, batch_size):
+            yield ({column: values[low:low + batch_size] for column, values in columns.items()},
+                   min(batch_size, rows - low))
+
+def iter_time_series_batches(schema, num_records, start_time=None, interval_seconds=1, jitter_seconds=0,
+                             irregular=False, devices=1, device_column='device_id',
+                             batch_size=DEFAULT_CHUNK_SIZE, seed=None, pools=None, to_python=True,
+                             reference_time=None):
+    """
+    Yield column batches of at most `batch_size` rows whose datetime fields follow a simulated clock.
+
+    See Clock for the timing parameters. With `devices` > 1 a `device_column`
+    (added first unless the schema has it) holds the device ID of every row.
+    A `seed` makes the whole series reproducible, whatever the batch size.
+    Other time-relative types follow `reference_time` (see
+    parallel.run_reference_time), which is also where the clock starts when
+    `start_time` is None.
+    """
+    reference_time = run_reference_time(seed, reference_time)
+    if seed is not None:
+        # Separate stream for the clock, so timestamps do not depend on batch_size
+        clock_rng = np.random.default_rng(np.random.SeedSequence([seed, 0]).spawn(1)[0])
+    else:
+        seed = new_seed()
+        clock_rng = np.random.default_rng()
+    # Without a start time the clock starts at the reference time: the start of the run, or fixed with a seed
+    clock = Clock(start_time if start_time is not None else reference_time, interval_seconds, jitter_seconds,
+                  irregular, devices, clock_rng)
+
+    # Resolved once: which columns follow the clock; the rest come from seeded blocks
+    nested = is_nested(schema)
+    timed = set(time_columns(schema))
+    replaced = timed | ({device_column} if devices > 1 else set())
+    order = list(flatten_schema(schema) if nested else schema)
+    if devices > 1 and device_column not in order:
+        order.insert(0, device_column)
+    if nested:
+        # Nested records are generated whole; their clock columns are overwritten below
+        generated, overrides = schema, None
+    else:
+        # Clock columns are generated with the others, from the clock, so expressions can read them
+        generated = {column: field_type for column, field_type in schema.items()
+                     if column in timed or column not in replaced}
+        overrides = clock_generators(clock, [column for column in order if column in timed])
+    batches = _column_batches(generated, num_records, batch_size, seed, pools, to_python, reference_time, overrides)
+
+    position = 0  # index of the batch's first row
+    for columns, count in batches:
+        if nested:
+            text = format_timestamps(clock.next(count)[0])
+            # Items past the end of a list stay None
+            columns.update({column: np.array([None if value is None else stamp
+                                              for stamp, value in zip(text.tolist(), columns[column])], dtype=object)
+                            for column in timed})
+        if devices > 1:
+            columns[device_column] = device_ids((position + np.arange(count)) % devices)
+        position += count
+        if to_python:
+            for column in replaced:
+                if isinstance(columns[column], np.ndarray):
+                    columns[column] = columns[column].tolist()
+        metrics.record_rows('time_series', count)
+        yield {column: columns[column] for column in order}
+
+def iter_time_series_records(schema, num_records, **options):
+    """Lazily yield records of a time series; takes the options of iter_time_series_batches."""
+    for columns in iter_time_series_batches(schema, num_records, **options):
+        yield from columns_to_records(columns)
+
+def write_time_series(schema, num_records, output_file, format='csv', compression=None, **options):
+    """
+    Write a time series to a CSV, Parquet or Arrow file one chunk at a time.
+
+    Takes the options of iter_time_series_batches. Returns the list of files written.
+    """
+    if num_records <= 0:
+        raise ValueError("No data to save.")
+    if format == 'csv':
+        with open(output_file, 'w', newline='', buffering=core.WRITE_BUFFER_SIZE) as file:
+            writer = None
+            for columns in iter_time_series_batches(schema, num_records, **options):
+                if writer is None:
+                    writer = csv.writer(file)
+                    writer.writerow(columns)
+                writer.writerows(zip(*columns.values()))
+        metrics.record_files('csv', [output_file])
+        return [output_file]
+
+    from .formats import ColumnarWriter, arrow_schema, record_batch_converter
+    series_schema = schema
+    device_column = options.get('device_column', 'device_id')
+    if options.get('devices', 1) > 1 and device_column not in schema and device_column not in flatten_schema(schema):
+        series_schema = {device_column: 'word', **schema}
+    convert = record_batch_converter(series_schema)
+    with ColumnarWriter(output_file, format, arrow_schema(series_schema), compression) as writer:
+        for columns in iter_time_series_batches(schema, num_records, to_python=False, **options):
+            writer.write_batch(convert(columns))
+    metrics.record_files(format, [output_file])
+    return [output_file]
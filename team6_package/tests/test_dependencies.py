@@ -0,0 +1,128 @@
+import math
+import warnings
+
+import numpy as np
+import pytest
+
+from team6_package import core
+from team6_package.columnar import columns_to_records, generate_columns
+from team6_package.dependencies import MAX_INTEGER_BITS, MAX_STRING_LENGTH, Expression, register_table
+
+A = [0, 1, 2, 3, -4, 7]
+B = [0, 2, 0, 3, 1, -2]
+# Missing values (None) in a column, as $given without a $default leaves them
+MISSING = [None, 1, 2, None, -4, 7]
+
+EXPRESSIONS = [
+    'a + b', 'a - b', 'a * b', 'a / b', 'a // b', 'a % b', 'a ** 2', 'a ** b', '2 ** a', '-a',
+    'a < b', 'a <= b', 'a > b', 'a >= b', 'a == b', 'a != b', 'a in (1, 2)', 'a not in (1, 2)',
+    'not a', 'a and b', 'a or b', 'a if a > b else b', '1 < a < 5',
+    'min(a, b)', 'max(a, b, 1)', 'clip(a, 0, 2)', 'abs(a - b)', 'round(a / 3, 2)', 'int(a / 2)', 'float(a)',
+    '"x" * a', 'a / b + 1', 'round(a / b)',
+]
+
+
+def both_engines(text, env):
+    """The results of an expression in the row engine and in the columnar engine, as lists."""
+    expression = Expression(text, lambda name: name)
+    n = len(next(iter(env.values())))
+    rows = [expression.row({column: values[index] for column, values in env.items()}) for index in range(n)]
+    arrays = {column: np.array(values, dtype=object if None in values else None) for column, values in env.items()}
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        columns = expression.column(arrays, n, np.random.default_rng(0)).tolist()
+    return rows, columns
+
+
+def assert_same(rows, columns):
+    assert len(rows) == len(columns)
+    for row, column in zip(rows, columns):
+        if row is None or column is None:
+            assert row is None and column is None, (rows, columns)
+        elif isinstance(row, float) or isinstance(column, float):
+            assert math.isclose(row, column), (rows, columns)
+        else:
+            assert row == column, (rows, columns)
+
+
+@pytest.mark.parametrize('text', EXPRESSIONS)
+def test_row_and_column_engines_agree(text):
+    assert_same(*both_engines(text, {'a': A, 'b': B}))
+
+
+@pytest.mark.parametrize('text', EXPRESSIONS)
+def test_row_and_column_engines_agree_on_missing_values(text):
+    assert_same(*both_engines(text, {'a': MISSING, 'b': B}))
+
+
+@pytest.mark.parametrize('text', ['a / b', 'a // b', 'a % b', 'b ** -1'])
+def test_undefined_results_are_null(text):
+    rows, columns = both_engines(text, {'a': A, 'b': B})
+    assert rows[0] is None and columns[0] is None
+    assert rows[2] is None and columns[2] is None
+
+
+def test_float_overflow_is_null():
+    assert_same(*both_engines('a ** 400', {'a': [10.0, 0.5]}))
+    assert both_engines('a ** 400', {'a': [10.0, 0.5]})[0][0] is None
+
+
+def test_int64_overflow_matches_python_ints():
+    rows, columns = both_engines('a ** 30', {'a': [3, 1000]})
+    assert rows == columns == [3 ** 30, 1000 ** 30]
+
+
+@pytest.mark.parametrize('text, env', [
+    (f'a ** {MAX_INTEGER_BITS}', {'a': [1, 4]}),
+    (f'"ab" * a', {'a': [1, MAX_STRING_LENGTH]}),
+])
+def test_caps_raise_in_both_engines(text, env):
+    expression = Expression(text, lambda name: name)
+    with pytest.raises(ValueError, match='too large'):
+        [expression.row({'a': value}) for value in env['a']]
+    with pytest.raises(ValueError, match='too large'):
+        expression.column({'a': np.array(env['a'])}, 2, np.random.default_rng(0))
+
+
+def row_and_column_records(schema, n=2000):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        return core.generate_data(schema, n), columns_to_records(generate_columns(schema, n))
+
+
+def test_division_by_zero_schema_in_both_engines():
+    schema = {'a': 'latency', 'b': 'subframe_assignment', 'c': {'$expr': 'a / b'}}
+    for records in row_and_column_records(schema):
+        assert any(record['b'] == 0 for record in records)
+        for record in records:
+            if record['b'] == 0:
+                assert record['c'] is None
+            else:
+                assert record['c'] == pytest.approx(record['a'] / record['b'])
+
+
+def test_given_ref_and_bounds_agree():
+    register_table('test_models', {'id': [1, 2, 3], 'model': ['A', 'B', 'C'], 'watts': [0, 5, 10]})
+    schema = {
+        'device': {'$ref': 'test_models', '$column': 'id'},
+        'model': {'$ref': 'test_models', '$column': 'model', '$by': 'device'},
+        'watts': {'$ref': 'test_models', '$column': 'watts', '$by': 'device'},
+        'app': {'$expr': 'choice("Gaming", "Video", "Idle")'},
+        'load': {'$given': 'app', '$cases': {'Gaming': {'$expr': 'randint(50, 200)'},
+                                              'Video': {'$expr': 'randint(10, 40)'}}},
+        'per_watt': {'$expr': 'load / watts', '$max': 30},
+    }
+    models = {1: ('A', 0), 2: ('B', 5), 3: ('C', 10)}
+    for records in row_and_column_records(schema):
+        for record in records:
+            assert (record['model'], record['watts']) == models[record['device']]
+            if record['app'] == 'Idle':
+                assert record['load'] is None and record['per_watt'] is None
+            elif record['app'] == 'Gaming':
+                assert 50 <= record['load'] <= 200
+            else:
+                assert 10 <= record['load'] <= 40
+            if record['load'] is not None and record['watts']:
+                assert record['per_watt'] == pytest.approx(min(record['load'] / record['watts'], 30))
+            if not record['watts']:
+                assert record['per_watt'] is None
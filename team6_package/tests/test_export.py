@@ -0,0 +1,70 @@
+import json
+
+import pandas as pd
+import pytest
+
+from team6_package import core
+from team6_package.export import send_dataframe
+from team6_package.serializers import get_serializer
+from team6_package.streaming import InMemoryProducer
+
+FRAME = pd.DataFrame({'id': [1, 2, 3, 4], 'app': ['Gaming', 'Email', 'Gaming', 'Video'], 'latency': [10, 20, 30, 40]})
+
+
+class PartitionRecordingProducer(InMemoryProducer):
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.partitions_sent = []
+
+    def send(self, topic, value=None, key=None, partition=None):
+        self.partitions_sent.append(partition)
+        return super().send(topic, value=value, key=key, partition=partition)
+
+
+def last_partition_for_gaming(key_bytes, all_partitions, available_partitions):
+    return all_partitions[-1] if key_bytes == b'Gaming' else available_partitions[0]
+
+
+def test_partitioner_has_producer_signature():
+    producer = PartitionRecordingProducer(partitions=3)
+    report = send_dataframe(FRAME, producer, 'events', key_column='app', partitioner=last_partition_for_gaming,
+                            payloads='json')
+    assert report.sent == report.delivered == 4
+    assert producer.partitions_sent == [2, 0, 2, 0]
+
+
+@pytest.fixture
+def created_producers(monkeypatch):
+    created = []
+
+    def create(bootstrap_servers, serializer='json', schema=None, partitioner=None, **options):
+        encode = get_serializer(serializer, schema).encode if serializer is not None else None
+        producer = InMemoryProducer(value_serializer=encode)
+        created.append((producer, serializer, partitioner))
+        return producer
+
+    monkeypatch.setattr(core, 'create_kafka_producer', create)
+    return created
+
+
+def test_export_passes_partitioner_to_producer(created_producers):
+    report = core.export_dataframe_to_kafka(FRAME, topic='events', key_column='app',
+                                            partitioner=last_partition_for_gaming)
+    (producer, serializer, partitioner), = created_producers
+    assert report.sent == 4 and producer.closed
+    assert serializer is None and partitioner is last_partition_for_gaming
+    assert [json.loads(value)['id'] for _, _, value in producer.messages] == [1, 2, 3, 4]
+
+
+def test_export_with_serializer_sends_records(created_producers):
+    report = core.export_dataframe_to_kafka(FRAME, topic='events', serializer='msgpack')
+    (producer, serializer, _), = created_producers
+    assert report.sent == 4 and serializer == 'msgpack'
+    decode = get_serializer('msgpack').decode
+    assert [decode(value)['app'] for _, _, value in producer.messages] == FRAME['app'].tolist()
+
+
+def test_export_rejects_payloads_option(created_producers):
+    with pytest.raises(ValueError, match='payloads'):
+        core.export_dataframe_to_kafka(FRAME, payloads='records')
+    assert created_producers == []
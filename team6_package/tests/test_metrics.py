@@ -0,0 +1,34 @@
+import pytest
+
+from team6_package import core, metrics
+from team6_package.metrics import FIELD_TIMER_ROWS, Registry, prometheus_text
+
+
+@pytest.fixture
+def registry():
+    registry = metrics.enable()
+    yield registry
+    metrics.disable()
+
+
+def field_counts(registry):
+    return {dict(labels)['field']: metric.count for (name, labels), metric in registry.metrics.items()
+            if name == 'field_generation_seconds'}
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter('messages_sent_total', topic='a"b\\c\nd').inc()
+    assert 'messages_sent_total{topic="a\\"b\\\\c\\nd"} 1' in prometheus_text(registry).splitlines()
+
+
+def test_row_engine_records_field_time(registry):
+    core.generate_data({'id': 'uuid', 'latency': 'latency', 'slow': {'$expr': 'latency * 2'}},
+                       FIELD_TIMER_ROWS + 1)
+    # One observation per FIELD_TIMER_ROWS rows, plus the rest when generation ends
+    assert field_counts(registry) == {'id': 2, 'latency': 2, 'slow': 2}
+
+
+def test_nested_row_engine_records_field_time(registry):
+    core.generate_data({'user': {'name': 'name'}, 'tags': {'$list': 'word', '$length': {'distribution': 'fixed', 'value': 1}}}, 10)
+    assert field_counts(registry) == {'user.name': 1, 'tags.0': 1}
@@ -0,0 +1,55 @@
+import pytest
+
+from team6_package.nested import MAX_COLUMNS, MAX_LIST_LENGTH, compile_nested, flatten_schema, iter_nested_records
+from team6_package.serializers import get_serializer
+from team6_package.streaming import InMemoryProducer, stream_records
+
+NESTED_SCHEMA = {'site': 'word', 'device': {'id': 'int', 'model': 'word'}, 'tags': ['word']}
+
+
+def fixed_list(item, length):
+    return {'$list': item, '$length': {'distribution': 'fixed', 'value': length}}
+
+
+def test_flattened_columns():
+    assert list(flatten_schema(NESTED_SCHEMA)) == [
+        'site', 'device.id', 'device.model', 'tags.0', 'tags.1', 'tags.2']
+
+
+def test_items_past_the_length_are_empty():
+    schema = {'tags': {'$list': 'word', '$length': {'distribution': 'uniform', 'min': 0, 'max': 4}}}
+    for record in iter_nested_records(compile_nested(schema), 200):
+        values = [record[f'tags.{index}'] for index in range(4)]
+        length = sum(value is not None for value in values)
+        assert all(value is not None for value in values[:length])
+
+
+@pytest.mark.parametrize('length', [
+    {'distribution': 'fixed', 'value': MAX_LIST_LENGTH + 1},
+    {'distribution': 'uniform', 'min': 1, 'max': 10 ** 9},
+    {'distribution': 'poisson', 'mean': 2, 'max': 10 ** 9},
+])
+def test_list_length_is_capped(length):
+    with pytest.raises(ValueError, match='at most'):
+        compile_nested({'tags': {'$list': 'word', '$length': length}})
+
+
+def test_longest_list_compiles():
+    assert len(compile_nested({'tags': fixed_list('word', MAX_LIST_LENGTH)}).columns) == MAX_LIST_LENGTH
+
+
+def test_nested_lists_are_capped_by_columns():
+    schema = {'grid': fixed_list(fixed_list('word', MAX_LIST_LENGTH), MAX_LIST_LENGTH)}
+    assert MAX_LIST_LENGTH ** 2 > MAX_COLUMNS
+    with pytest.raises(ValueError, match='columns'):
+        compile_nested(schema)
+
+
+def test_stream_records_nested_with_schema_serializer():
+    pytest.importorskip('msgpack')
+    serializer = get_serializer('schema', NESTED_SCHEMA)
+    producer = InMemoryProducer(value_serializer=serializer.encode)
+    stream_records(producer, 'events', NESTED_SCHEMA, duration=0.02, batch_size=10, stats_interval=0)
+    record = serializer.decode(producer.messages[0][2])
+    assert record['site'] is not None and record['device.id'] is not None
+    assert list(record)[:3] == ['site', 'device.id', 'device.model']
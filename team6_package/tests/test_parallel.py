@@ -0,0 +1,44 @@
+import json
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+from team6_package import core
+from team6_package.parallel import generate_range
+
+PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA = {'id': 'uuid', 'name': 'name', 'latency': 'latency'}
+
+# A seeded run followed by an unseeded one, printing the unseeded records
+SEEDED_THEN_UNSEEDED = f"""
+import json
+from team6_package.core import generate_data
+schema = {SCHEMA!r}
+generate_data(schema, 50, seed=7)
+print(json.dumps(generate_data(schema, 50)))
+"""
+
+
+def test_seeded_range_is_reproducible():
+    assert generate_range(SCHEMA, 7, 100, 20) == generate_range(SCHEMA, 7, 100, 20)
+    assert generate_range(SCHEMA, 7, 100, 20) != generate_range(SCHEMA, 8, 100, 20)
+
+
+def test_seeded_generation_restores_random_streams():
+    random_state = random.getstate()
+    faker_state = core.fake.get_state()[1]
+    generate_range(SCHEMA, 7, 0, 10)
+    assert random.getstate() == random_state
+    assert core.fake.get_state()[1] == faker_state
+
+
+def test_unseeded_after_seeded_does_not_repeat():
+    def run():
+        output = subprocess.run([sys.executable, '-c', SEEDED_THEN_UNSEEDED], cwd=PACKAGE_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        return json.loads(output)
+
+    first, second = run(), run()
+    assert [record['id'] for record in first] != [record['id'] for record in second]
+    assert [record['name'] for record in first] != [record['name'] for record in second]
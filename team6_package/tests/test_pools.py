@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from team6_package.columnar import generate_columns
+from team6_package.core import generate_data
+from team6_package.pools import ValuePools
+
+
+@pytest.mark.parametrize('field_type, kind', [('name', str), ('latency', int), ('boolean', bool)])
+def test_pools_keep_value_types(field_type, kind, tmp_path):
+    for directory in (None, tmp_path):
+        pools = ValuePools(size=50, settings={field_type: {'mode': 'pool'}}, directory=directory, seed=1)
+        assert all(type(record['x']) is kind for record in generate_data({'x': field_type}, 20, pools=pools))
+        assert all(type(value) is kind for value in generate_columns({'x': field_type}, 20, pools=pools)['x'])
+
+
+def test_pool_saved_with_its_dtype(tmp_path):
+    pools = ValuePools(size=50, settings={'latency': {'mode': 'pool'}}, directory=tmp_path, seed=2)
+    pools.fill({'x': 'latency'})
+    assert np.load(pools.path('latency')).dtype == np.int64
+
+
+def test_pools_reject_values_of_mixed_types():
+    pools = ValuePools(size=50, settings={'nullable_datetime': {'mode': 'pool'}}, seed=3)
+    with pytest.raises(ValueError, match="Cannot pool 'nullable_datetime'"):
+        pools.fill({'x': 'nullable_datetime'})
@@ -0,0 +1,48 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from team6_package.serializers import get_serializer
+
+
+def test_json_round_trip():
+    serializer = get_serializer('json')
+    record = {'a': 1, 'b': 'x', 'when': datetime(2025, 1, 2, 3, 4, 5), 'day': date(2025, 1, 2), 'none': None}
+    assert serializer.decode(serializer.encode(record)) == {
+        'a': 1, 'b': 'x', 'when': '2025-01-02T03:04:05', 'day': '2025-01-02', 'none': None}
+
+
+def test_msgpack_round_trip():
+    pytest.importorskip('msgpack')
+    serializer = get_serializer('msgpack')
+    record = {'a': 1, 'when': datetime(2025, 1, 2, 3, 4, 5, 678), 'day': date(2025, 1, 2), 'none': None}
+    assert serializer.decode(serializer.encode(record)) == record
+
+
+def test_unknown_serializer():
+    with pytest.raises(ValueError):
+        get_serializer('xml')
+    with pytest.raises(ValueError):
+        get_serializer('schema')
+
+
+def test_schema_round_trip_keeps_schema_order():
+    pytest.importorskip('msgpack')
+    serializer = get_serializer('schema', {'id': 'uuid', 'latency': 'latency', 'seen': 'nullable_datetime'})
+    record = {'latency': 12, 'seen': datetime(2025, 1, 2), 'id': 'a'}
+    assert list(serializer.decode(serializer.encode(record)).items()) == [
+        ('id', 'a'), ('latency', 12), ('seen', datetime(2025, 1, 2))]
+
+
+def test_decimal_values_encode_as_floats():
+    serializer = get_serializer('json')
+    assert serializer.decode(serializer.encode({'x': Decimal('1.5')})) == {'x': 1.5}
+
+
+def test_schema_round_trip_nested():
+    pytest.importorskip('msgpack')
+    schema = {'site': 'word', 'device': {'id': 'int', 'model': 'word'}, 'tags': ['word']}
+    serializer = get_serializer('schema', schema)
+    record = {'site': 's', 'device.id': 7, 'device.model': 'm', 'tags.0': 'a', 'tags.1': None, 'tags.2': None}
+    assert serializer.decode(serializer.encode(record)) == record
@@ -0,0 +1,94 @@
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from team6_package import core
+from team6_package.streaming import InMemoryProducer, TokenBucket, stream_records
+
+FLAT_SCHEMA = {'id': 'uuid', 'latency': 'latency', 'application_type': 'application_type'}
+
+
+class FakeClock:
+    """Clock and sleep for TokenBucket that only move when the bucket sleeps (or the test advances them)."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_paces_to_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(8, clock=clock, sleep=clock.sleep)
+    granted = sum(bucket.take(100) for _ in range(20))
+    assert granted == 20
+    # The first token is free; the other 19 take an eighth of a second each
+    assert clock.now == pytest.approx(19 / 8)
+
+
+def test_token_bucket_caps_burst_after_idle():
+    clock = FakeClock()
+    bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+    bucket.take(1)
+    clock.now += 60
+    assert bucket.take(1000) == 10  # capacity: a tenth of a second worth of tokens
+    assert clock.sleeps == []
+
+
+@pytest.mark.parametrize('rate', [0, -5])
+def test_token_bucket_rejects_non_positive_rate(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate)
+
+
+def test_stream_records_unthrottled():
+    producer = InMemoryProducer()
+    sent = stream_records(producer, 'events', FLAT_SCHEMA, rate=None, duration=0.05, batch_size=50,
+                          stats_interval=0)
+    assert sent > 0
+    assert sent == producer.sent == len(producer.messages)
+    topic, key, record = producer.messages[0]
+    assert topic == 'events' and key is None
+    assert list(record) == list(FLAT_SCHEMA)
+
+
+def test_stream_records_follows_rate():
+    producer = InMemoryProducer(keep=False)
+    sent = stream_records(producer, 'events', FLAT_SCHEMA, rate=200, duration=0.2, batch_size=1000,
+                          stats_interval=0)
+    # 200 msgs/sec for 0.2 s, plus at most the bucket's burst of 20
+    assert 0 < sent <= 61
+
+
+def test_stream_records_stamps_datetime_at_send(monkeypatch):
+    # A clock running 100 times faster than real time, so slices sent 0.1 s apart are 10 s apart
+    started = time.monotonic()
+    monkeypatch.setattr(core, 'current_time',
+                        lambda: datetime(2025, 1, 1) + timedelta(seconds=100 * (time.monotonic() - started)))
+    producer = InMemoryProducer()
+    stream_records(producer, 'events', {'at': 'datetime', 'latency': 'latency'}, rate=100, duration=0.5,
+                   batch_size=1000, stats_interval=0)
+    stamps = [record['at'] for _, _, record in producer.messages]
+    assert stamps == sorted(stamps)
+    first, last = (datetime.fromisoformat(stamp) for stamp in (stamps[0], stamps[-1]))
+    # The whole batch was generated at once; without stamping at send every message would share one time
+    assert last - first >= timedelta(seconds=30)
+
+
+def test_cli_interval_zero_is_unthrottled(monkeypatch, capsys):
+    producer = InMemoryProducer(keep=False)
+    monkeypatch.setattr(core, 'create_kafka_producer', lambda *args, **kwargs: producer)
+    monkeypatch.setattr(sys, 'argv', ['team6_package', 'schema.json', 'events', '--mode', 'stream',
+                                      '--interval', '0', '--duration', '0.05', '--stats-interval', '0'])
+    core.run_streaming_mode(FLAT_SCHEMA)
+    assert 'as fast as possible' in capsys.readouterr().out
+    assert producer.sent > 1
+    assert producer.closed
@@ -0,0 +1,38 @@
+import pytest
+
+from team6_package.timeseries import iter_time_series_records
+
+SCHEMA = {
+    'at': 'datetime',
+    'latency': 'latency',
+    'copy': {'$expr': 'at'},
+    'late': {'$expr': 'at >= "2024-01-01 00:00:05"'},
+}
+
+
+def test_expressions_read_clock_columns():
+    records = list(iter_time_series_records(SCHEMA, 10, start_time='2024-01-01', seed=1))
+    assert [record['at'] for record in records] == [f"2024-01-01 00:00:{second:02d}" for second in range(10)]
+    assert all(record['copy'] == record['at'] for record in records)
+    assert [record['late'] for record in records] == [second >= 5 for second in range(10)]
+
+
+@pytest.mark.parametrize('options', [{}, {'devices': 3, 'jitter_seconds': 2, 'irregular': True}])
+def test_clock_columns_do_not_depend_on_batch_size(options):
+    def run(batch_size):
+        return list(iter_time_series_records(SCHEMA, 3000, start_time='2024-01-01', seed=2, batch_size=batch_size,
+                                             **options))
+
+    assert run(100) == run(5000)
+
+
+def test_devices_share_tick_without_jitter_only():
+    def stamps(jitter):
+        records = iter_time_series_records({'at': 'datetime'}, 40, start_time='2024-01-01', devices=4,
+                                           jitter_seconds=jitter, seed=3)
+        return [record['at'] for record in records]
+
+    still = stamps(0)
+    assert all(len(set(still[tick:tick + 4])) == 1 for tick in range(0, 40, 4))
+    jittered = stamps(3)
+    assert any(len(set(jittered[tick:tick + 4])) > 1 for tick in range(0, 40, 4))